@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Count the Redis commands processed per task, for each Redis storage.
+
+Enqueues a number of tasks, executes them and reads their results, then
+reports the number of commands the server processed for each task, using the
+server's INFO commandstats. Commands issued from within Lua scripts are
+included in the counts.
+
+Requires a Redis server; the stats for the server are reset.
+"""
+
+import optparse
+
+from redis import Redis
+
+from scrooge import RedisExpireScrooge, RedisScrooge
+
+
+def add(a, b):
+    return a + b
+
+
+def run_benchmark(scrooge_class, conn, n):
+    scrooge = scrooge_class("scrooge.benchmark", blocking=False)
+    scrooge.flush()
+    task = scrooge.task()(add)
+    results = task.map([(i, i) for i in range(n)])
+
+    conn.config_resetstat()
+    for _ in range(n):
+        scrooge.execute(scrooge.dequeue())
+    results.get()
+
+    stats = conn.info("commandstats")
+    scrooge.flush()
+    del stats["cmdstat_config"]
+    return dict((k.split("_", 1)[1], v["calls"]) for k, v in stats.items())
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser()
+    parser.add_option("-n", "--tasks", default=1000, type="int")
+    parser.add_option("-H", "--host", default="127.0.0.1")
+    parser.add_option("-p", "--port", default=6379, type="int")
+    options, args = parser.parse_args()
+
+    conn = Redis(host=options.host, port=options.port)
+    for scrooge_class in (RedisScrooge, RedisExpireScrooge):
+        calls = run_benchmark(scrooge_class, conn, options.tasks)
+        total = sum(calls.values())
+        print(
+            "%s: %.2f commands per task"
+            % (scrooge_class.__name__, total / float(options.tasks))
+        )
+        for command, count in sorted(calls.items()):
+            print("  %-10s %.2f" % (command, count / float(options.tasks)))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Measure write-lock contention when several processes dequeue from the same
+Sqlite database.
+
+Enqueues a number of tasks and drains the queue using several processes, each
+calling dequeue() in a loop, then reports the throughput and the latency of
+the dequeue calls. This is run once using DELETE ... RETURNING (Sqlite 3.35
+and newer), and once using the SELECT followed by DELETE inside an exclusive
+transaction, which is used for older versions of Sqlite.
+"""
+
+import multiprocessing
+import optparse
+import os
+import time
+
+from scrooge.storage import SqliteStorage
+
+
+def worker(filename, returning, start, queue):
+    storage = SqliteStorage("benchmark", filename=filename, timeout=60)
+    storage.returning = returning
+    start.wait()
+    timings = []
+    while True:
+        t = time.perf_counter()
+        data = storage.dequeue()
+        timings.append(time.perf_counter() - t)
+        if data is None:
+            break
+    storage.close()
+    queue.put(timings[:-1])
+
+
+def run_benchmark(filename, returning, n, workers):
+    storage = SqliteStorage("benchmark", filename=filename)
+    storage.flush_queue()
+    storage.enqueue_many([(b"x" * 64, None) for _ in range(n)])
+    storage.close()
+
+    start = multiprocessing.Event()
+    queue = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=worker, args=(filename, returning, start, queue))
+        for _ in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+
+    t = time.perf_counter()
+    start.set()
+    timings = []
+    for _ in procs:
+        timings.extend(queue.get())
+    duration = time.perf_counter() - t
+    for proc in procs:
+        proc.join()
+
+    timings.sort()
+    return (
+        len(timings) / duration,
+        timings[len(timings) // 2] * 1000,
+        timings[int(len(timings) * 0.99)] * 1000,
+    )
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser()
+    parser.add_option("-n", "--tasks", default=20000, type="int")
+    parser.add_option("-w", "--workers", default=8, type="int")
+    parser.add_option("-f", "--filename", default="/tmp/scrooge-benchmark.db")
+    options, args = parser.parse_args()
+
+    for returning in (True, False):
+        if returning and not SqliteStorage.returning:
+            print("Sqlite version does not support RETURNING, skipping.")
+            continue
+        tps, p50, p99 = run_benchmark(
+            options.filename, returning, options.tasks, options.workers
+        )
+        print(
+            "%-22s %8.0f dequeues/s  p50 %.3fms  p99 %.3fms"
+            % (
+                "delete ... returning:" if returning else "select + delete:",
+                tps,
+                p50,
+                p99,
+            )
+        )
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(options.filename + suffix):
+            os.unlink(options.filename + suffix)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Compare Sqlite storage connection profiles.
+
+A writer enqueues tasks and stores results while a reader dequeues them,
+each in its own thread and connection, and the throughput and writer latency
+are reported for each profile. The "mmap" profile caches more statements and
+memory-maps the database. The "checkpoint" profile also disables automatic
+WAL checkpoints, which otherwise stall whichever writer crosses the
+threshold, and instead checkpoints in a background thread every
+``checkpoint_interval`` seconds, as the consumer's scheduler would.
+"""
+
+import optparse
+import os
+import threading
+import time
+
+from scrooge.storage import SqliteStorage
+
+PROFILES = {
+    "default": {},
+    "mmap": {
+        "cached_statements": 1024,
+        "mmap_size": 256 * 1024 * 1024,
+    },
+    "checkpoint": {
+        "cached_statements": 1024,
+        "mmap_size": 256 * 1024 * 1024,
+        "wal_autocheckpoint": 0,
+        "checkpoint_interval": 0.1,
+    },
+}
+
+
+def writer(storage, n, payload, timings):
+    for i in range(n):
+        t = time.perf_counter()
+        storage.enqueue(payload)
+        storage.put_data(b"r%d" % i, payload)
+        timings.append(time.perf_counter() - t)
+
+
+def reader(storage, n):
+    read = 0
+    while read < n:
+        if storage.dequeue() is None:
+            time.sleep(0.0001)
+        else:
+            read += 1
+
+
+def checkpointer(storage, stop):
+    while not stop.wait(storage.checkpoint_interval):
+        storage.checkpoint()
+
+
+def run_benchmark(filename, profile, n, size):
+    storage = SqliteStorage("benchmark", filename=filename, **PROFILES[profile])
+    storage.flush_all()
+    payload = os.urandom(size)
+    timings = []
+    stop = threading.Event()
+
+    threads = [
+        threading.Thread(target=writer, args=(storage, n, payload, timings)),
+        threading.Thread(target=reader, args=(storage, n)),
+    ]
+    if storage.checkpoint_interval:
+        threads.append(threading.Thread(target=checkpointer, args=(storage, stop)))
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads[:2]:
+        t.join()
+    duration = time.perf_counter() - start
+    stop.set()
+    for t in threads[2:]:
+        t.join()
+
+    storage.flush_all()
+    storage.close()
+    timings.sort()
+    return (
+        n / duration,
+        timings[len(timings) // 2] * 1000,
+        timings[int(len(timings) * 0.999)] * 1000,
+        timings[-1] * 1000,
+    )
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser()
+    parser.add_option("-n", "--tasks", default=20000, type="int")
+    parser.add_option("-s", "--size", default=1024, type="int")
+    parser.add_option("-f", "--filename", default="/tmp/scrooge-benchmark.db")
+    parser.add_option(
+        "-p",
+        "--profile",
+        action="append",
+        choices=sorted(PROFILES),
+        help="profile(s) to run, default is all",
+    )
+    options, args = parser.parse_args()
+
+    for profile in options.profile or list(PROFILES):
+        tps, p50, p999, worst = run_benchmark(
+            options.filename, profile, options.tasks, options.size
+        )
+        print(
+            "%-8s %8.0f tasks/s  write p50 %.3fms  p99.9 %.3fms  max %.3fms"
+            % (profile, tps, p50, p999, worst)
+        )
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(options.filename + suffix):
+            os.unlink(options.filename + suffix)
@@ -10,8 +10,10 @@ from scrooge.api import (
     PriorityRedisScrooge,
     RedisExpireScrooge,
     RedisScrooge,
+    RedisStreamScrooge,
+    ReliableRedisScrooge,
     Scrooge,
     SqliteScrooge,
     crontab,
 )
-from scrooge.exceptions import CancelExecution, RetryTask
+from scrooge.exceptions import CancelExecution, RetryTask, TaskTimeout
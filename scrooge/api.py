@@ -7,7 +7,7 @@ import time
 import traceback
 import uuid
 import warnings
-from collections import OrderedDict, deque
+from collections import OrderedDict
 from functools import partial, wraps
 
 from scrooge import signals as S
@@ -20,6 +20,7 @@ from scrooge.exceptions import (
     ScroogeException,
     TaskException,
     TaskLockedException,
+    TaskTimeout,
 )
 from scrooge.registry import Registry
 from scrooge.serializer import Serializer
@@ -31,9 +32,12 @@ from scrooge.storage import (
     PriorityRedisStorage,
     RedisExpireStorage,
     RedisStorage,
+    RedisStreamStorage,
+    ReliableRedisStorage,
     SqliteStorage,
 )
 from scrooge.utils import (
+    ClaimCheck,
     Error,
     normalize_expire_time,
     normalize_time,
@@ -61,10 +65,20 @@ class Scrooge(object):
         synchronously in the application.
     :param Serializer serializer: serializer implementation for tasks and
         result data. The default implementation uses pickle.
-    :param bool compression: compress tasks and result data (gzip by default).
+    :param compression: compress tasks and result data (gzip by default), or
+        the name of the codec to use: "gzip", "zlib", "zstd" or "lz4".
     :param bool use_zlib: use zlib for compression instead of gzip.
     :param bool immediate_use_memory: automatically switch to a local in-memory
         storage backend when immediate-mode is enabled.
+    :param revoke_cache_timeout: cache the revocation state of task classes
+        in-process for the given number of seconds, rather than reading it
+        from storage for every task that is executed.
+    :param int blob_threshold: task arguments and results which are larger
+        than the given number of bytes once serialized are written to the
+        ``blob_storage``, and only a reference is enqueued or stored.
+    :param blob_storage: storage instance used for large payloads, e.g. a
+        :py:class:`FileStorage` or :py:class:`RedisExpireStorage`. Defaults to
+        a separate namespace of the queue's storage.
     :param storage_kwargs: arbitrary keyword arguments that will be passed to
         the storage backend for additional configuration.
 
@@ -98,6 +112,9 @@ class Scrooge(object):
         compression=False,
         use_zlib=False,
         immediate_use_memory=True,
+        revoke_cache_timeout=None,
+        blob_threshold=None,
+        blob_storage=None,
         always_eager=None,
         storage_class=None,
         **storage_kwargs
@@ -127,6 +144,11 @@ class Scrooge(object):
         self.utc = utc
         self._immediate = immediate
         self.immediate_use_memory = immediate_use_memory
+        self.revoke_cache_timeout = revoke_cache_timeout
+        self._revoke_cache = {}
+        self.blob_threshold = blob_threshold
+        self._blob_storage = blob_storage
+        self._default_blob_storage = None
         if serializer is None:
             serializer = Serializer(compression, use_zlib=use_zlib)
         self.serializer = serializer
@@ -176,6 +198,14 @@ class Scrooge(object):
             Storage = self.storage_class
         return Storage(self.name, **kwargs)
 
+    @property
+    def blob_storage(self):
+        if self._blob_storage is not None:
+            return self._blob_storage
+        if self._default_blob_storage is None:
+            self._default_blob_storage = self.storage.create_blob_storage()
+        return self._default_blob_storage
+
     @property
     def immediate(self):
         return self._immediate
@@ -188,6 +218,7 @@ class Scrooge(object):
             # versus normal mode, we need to recreate the storage engine.
             if self.immediate_use_memory:
                 self.storage = self.create_storage()
+                self._default_blob_storage = None
 
     def create_consumer(self, **options):
         return Consumer(self, **options)
@@ -200,6 +231,7 @@ class Scrooge(object):
         context=False,
         name=None,
         expires=None,
+        timeout=None,
         **kwargs
     ):
         TaskWrapper = self.task_wrapper_class
@@ -214,6 +246,7 @@ class Scrooge(object):
                 default_retry_delay=retry_delay,
                 default_priority=priority,
                 default_expires=expires,
+                timeout=timeout,
                 **kwargs
             )
 
@@ -228,6 +261,7 @@ class Scrooge(object):
         context=False,
         name=None,
         expires=None,
+        timeout=None,
         **kwargs
     ):
         TaskWrapper = self.task_wrapper_class
@@ -236,6 +270,15 @@ class Scrooge(object):
             def method_validate(self, timestamp):
                 return validate_datetime(timestamp)
 
+            # Schedules created using crontab() can compute when they next run.
+            next_after = getattr(validate_datetime, "next_after", None)
+            if next_after is not None:
+
+                def method_next_after(self, timestamp):
+                    return next_after(timestamp)
+
+                kwargs["next_after"] = method_next_after
+
             return TaskWrapper(
                 self,
                 func.func if isinstance(func, TaskWrapper) else func,
@@ -245,6 +288,7 @@ class Scrooge(object):
                 default_retry_delay=retry_delay,
                 default_priority=priority,
                 default_expires=expires,
+                timeout=timeout,
                 validate_datetime=method_validate,
                 task_base=PeriodicTask,
                 **kwargs
@@ -344,7 +388,50 @@ class Scrooge(object):
 
     def serialize_task(self, task):
         message = self._registry.create_message(task)
-        return self.serializer.serialize(message)
+        data = self.serializer.serialize(message)
+        if self.blob_threshold is not None and len(data) > self.blob_threshold:
+            # Write the arguments to the blob storage and enqueue a reference.
+            # They are read when the task is executed.
+            claim = self._put_blob((message.args, message.kwargs))
+            message = message._replace(args=claim, kwargs=None)
+            data = self.serializer.serialize(message)
+        return data
+
+    def _put_blob(self, value):
+        return self._put_blob_data(self.serializer.serialize(value))
+
+    def _put_blob_data(self, data, is_result=False):
+        # Task arguments must not expire while the task is waiting to run, so
+        # only the blobs holding results are stored with is_result=True.
+        key = "b:%s" % uuid.uuid4()
+        self.blob_storage.put_data(key, data, is_result=is_result)
+        return ClaimCheck(key)
+
+    def _get_blob(self, claim, peek=False):
+        if peek:
+            data = self.blob_storage.peek_data(claim.key)
+        else:
+            data = self.blob_storage.pop_data(claim.key)
+        if data is EmptyData:
+            raise ScroogeException("blob %s not found" % claim.key)
+        return self.serializer.deserialize(data)
+
+    def _load_args(self, task):
+        if isinstance(task.args, ClaimCheck):
+            task._claim = task.args
+            task.args, task.kwargs = self._get_blob(task.args, peek=True)
+            task.kwargs = task.kwargs or {}
+
+    def _release_args(self, task):
+        # Remove the task's arguments from the blob storage, once the task has
+        # finished (or will not be run).
+        if isinstance(task.args, ClaimCheck):
+            claim = task.args
+        else:
+            claim = getattr(task, "_claim", None)
+        if claim is not None:
+            task._claim = None
+            self.blob_storage.delete_data(claim.key)
 
     def deserialize_task(self, data):
         message = self.serializer.deserialize(data)
@@ -360,6 +447,39 @@ class Scrooge(object):
         else:
             self.storage.enqueue(self.serialize_task(task), task.priority)
 
+        return self._task_result(task)
+
+    def enqueue_many(self, tasks, front=False):
+        """
+        Enqueue a list of tasks, writing them to the storage in a single
+        operation when the storage supports it.
+
+        :param tasks: list of :py:class:`Task` instances.
+        :param bool front: add the tasks to the head of the queue, e.g. to
+            return tasks which were read but not executed. Storages which do
+            not support this add the tasks to the end of the queue.
+        :return: list containing the result handle for each task (or ``None``
+            if results are disabled).
+        """
+        if self._immediate:
+            return [self.enqueue(task) for task in tasks]
+
+        items = []
+        for task in tasks:
+            if task.expires:
+                task.resolve_expires(self.utc)
+            items.append((self.serialize_task(task), task.priority))
+
+        if front:
+            try:
+                self.storage.enqueue_front(items)
+            except NotImplementedError:
+                self.storage.enqueue_many(items)
+        else:
+            self.storage.enqueue_many(items)
+        return [self._task_result(task) for task in tasks]
+
+    def _task_result(self, task):
         if not self.results:
             return
 
@@ -376,15 +496,49 @@ class Scrooge(object):
     def dequeue(self):
         data = self.storage.dequeue()
         if data is not None:
-            return self.deserialize_task(data)
+            return self._read_task(data)
+
+    def dequeue_many(self, n):
+        tasks = []
+        for data in self.storage.dequeue_many(n):
+            # A message that cannot be read should not cause the remaining
+            # messages in the batch to be lost.
+            try:
+                tasks.append(self._read_task(data))
+            except Exception:
+                logger.exception("Unable to read task from queue, discarding.")
+        return tasks
+
+    def _read_task(self, data):
+        try:
+            task = self.deserialize_task(data)
+        except Exception:
+            # The message can never be processed, so do not hold on to it.
+            self.storage.acknowledge(data)
+            raise
+        # Keep the message data so the task can be acknowledged once it has
+        # been processed.
+        task._message = data
+        return task
+
+    def acknowledge(self, task):
+        data = getattr(task, "_message", None)
+        if data is not None:
+            task._message = None
+            self.storage.acknowledge(data)
+
+    def requeue_unacknowledged(self):
+        return self.storage.requeue_unacknowledged()
 
     def put(self, key, data):
         return self.storage.put_data(key, self.serializer.serialize(data))
 
     def put_result(self, key, data):
-        return self.storage.put_data(
-            key, self.serializer.serialize(data), is_result=True
-        )
+        data = self.serializer.serialize(data)
+        if self.blob_threshold is not None and len(data) > self.blob_threshold:
+            claim = self._put_blob_data(data, is_result=True)
+            data = self.serializer.serialize(claim)
+        return self.storage.put_data(key, data, is_result=True)
 
     def put_if_empty(self, key, data):
         return self.storage.put_if_empty(key, self.serializer.serialize(data))
@@ -395,10 +549,25 @@ class Scrooge(object):
         else:
             return self.storage.pop_data(key)
 
+    def get_raw_many(self, keys, peek=False):
+        if peek:
+            return self.storage.peek_many(keys)
+        else:
+            return self.storage.pop_many(keys)
+
     def get(self, key, peek=False):
         data = self.get_raw(key, peek)
         if data is not EmptyData:
-            return self.serializer.deserialize(data)
+            value = self.serializer.deserialize(data)
+            if isinstance(value, ClaimCheck):
+                value = self._get_blob(value, peek)
+            return value
+
+    def get_many(self, keys, peek=False):
+        return [
+            self.serializer.deserialize(data) if data is not EmptyData else None
+            for data in self.get_raw_many(keys, peek)
+        ]
 
     def delete(self, key):
         return self.storage.delete_data(key)
@@ -406,30 +575,44 @@ class Scrooge(object):
     def _get_timestamp(self):
         return utcnow() if self.utc else datetime.datetime.now()
 
-    def execute(self, task, timestamp=None):
+    def execute(self, task, timestamp=None, timer=None):
+        """
+        Execute a task, unless it is revoked, has expired or is scheduled to
+        run in the future.
+
+        :param timer: optional callable used to enforce the ``timeout`` of a
+            task. It is called with the timeout in seconds and returns a
+            context manager which raises :py:class:`TaskTimeout` if the task
+            runs for longer. Supplied by the consumer's workers.
+        """
         if timestamp is None:
             timestamp = self._get_timestamp()
 
+        if self._can_execute(task, timestamp):
+            return self._execute(task, timestamp, timer)
+
+    def _can_execute(self, task, timestamp):
         if not self.ready_to_run(task, timestamp):
             self.add_schedule(task)
         elif self.is_revoked(task, timestamp, False):
             logger.warning("Task %s was revoked, not executing", task)
             self._emit(S.SIGNAL_REVOKED, task)
+            self._release_args(task)
         elif task.expires_resolved and task.expires_resolved < timestamp:
             logger.info("Task %s expired, not executing.", task)
             self._emit(S.SIGNAL_EXPIRED, task)
+            self._release_args(task)
         else:
             logger.info("Executing %s", task)
             self._emit(S.SIGNAL_EXECUTING, task)
-            return self._execute(task, timestamp)
+            return True
 
-    def _execute(self, task, timestamp):
-        if self._pre_execute:
-            try:
-                self._run_pre_execute(task)
-            except CancelExecution:
-                self._emit(S.SIGNAL_CANCELED, task)
-                return
+        self.acknowledge(task)
+        return False
+
+    def _execute(self, task, timestamp, timer=None):
+        if not self._prepare_execute(task):
+            return
 
         start = time_clock()
         exception = None
@@ -439,21 +622,75 @@ class Scrooge(object):
         try:
             self._tasks_in_flight.add(task)
             try:
-                task_value = task.execute()
+                if task.timeout and timer is not None:
+                    with timer(task.timeout):
+                        task_value = task.execute()
+                else:
+                    task_value = task.execute()
             finally:
                 self._tasks_in_flight.remove(task)
                 duration = time_clock() - start
-        except TaskLockedException as exc:
+        except TaskTimeout as exc:
+            exception, retry_eta = self._handle_exception(task, exc)
+        except KeyboardInterrupt:
+            logger.warning("Received exit signal, %s did not finish.", task.id)
+            self._emit(S.SIGNAL_INTERRUPTED, task)
+            return
+        except Exception as exc:
+            exception, retry_eta = self._handle_exception(task, exc)
+        else:
+            logger.info("%s executed in %0.3fs", task, duration)
+
+        return self._finish_execute(task, task_value, exception, retry_eta)
+
+    def _prepare_execute(self, task):
+        # Load the task arguments and run the pre-execute hooks, returning
+        # False if one of the hooks cancelled the task.
+        try:
+            self._load_args(task)
+        except Exception as exc:
+            # The arguments are missing, e.g. they were flushed, so the task
+            # fails without being retried.
+            task.retries = 0
+            exception, _ = self._handle_exception(task, exc)
+            self._finish_execute(task, EmptyData, exception, None)
+            return False
+        if self._pre_execute:
+            try:
+                self._run_pre_execute(task)
+            except CancelExecution:
+                self._emit(S.SIGNAL_CANCELED, task)
+                self._release_args(task)
+                self.acknowledge(task)
+                return False
+        return True
+
+    def handle_timeout(self, task):
+        """
+        Fail or retry a task whose worker was killed by the consumer after
+        the task timed out, as if the task had raised :py:class:`TaskTimeout`.
+        """
+        try:
+            # The arguments are enqueued again if the task is retried.
+            self._load_args(task)
+        except Exception:
+            task.retries = 0
+        exception, retry_eta = self._handle_exception(task, TaskTimeout())
+        self._finish_execute(task, EmptyData, exception, retry_eta)
+
+    def _handle_exception(self, task, exc):
+        # Log and signal an exception raised by a task, returning the
+        # exception to record and the eta of the retry, if one was requested.
+        retry_eta = None
+        if isinstance(exc, TaskLockedException):
             logger.warning("Task %s not run, %s.", task.id, exc)
-            exception = exc
             self._emit(S.SIGNAL_LOCKED, task)
-        except RetryTask as exc:
+        elif isinstance(exc, RetryTask):
             logger.info("Task %s raised RetryTask, retrying.", task.id)
             task.retries += 1
             if exc.eta or exc.delay is not None:
                 retry_eta = normalize_time(exc.eta, exc.delay, self.utc)
-            exception = exc
-        except CancelExecution as exc:
+        elif isinstance(exc, CancelExecution):
             if exc.retry or (exc.retry is None and task.retries):
                 task.retries = max(task.retries, 1)
                 msg = "(task will be retried)"
@@ -462,18 +699,15 @@ class Scrooge(object):
                 msg = "(aborted, will not be retried)"
             logger.warning("Task %s raised CancelExecution %s.", task.id, msg)
             self._emit(S.SIGNAL_CANCELED, task)
-            exception = exc
-        except KeyboardInterrupt:
-            logger.warning("Received exit signal, %s did not finish.", task.id)
-            self._emit(S.SIGNAL_INTERRUPTED, task)
-            return
-        except Exception as exc:
+        elif isinstance(exc, TaskTimeout):
+            logger.error("Task %s timed out after %ss.", task.id, task.timeout)
+            self._emit(S.SIGNAL_TIMEOUT, task)
+        else:
             logger.exception("Unhandled exception in task %s.", task.id)
-            exception = exc
             self._emit(S.SIGNAL_ERROR, task, exc)
-        else:
-            logger.info("%s executed in %0.3fs", task, duration)
+        return exc, retry_eta
 
+    def _finish_execute(self, task, task_value, exception, retry_eta):
         # Clear the flag if this instance of the task was revoked after it
         # began executing by destructively reading it's revoke key.
         if not isinstance(task, PeriodicTask):
@@ -506,6 +740,10 @@ class Scrooge(object):
             self._emit(S.SIGNAL_RETRYING, task)
             self._requeue_task(task, self._get_timestamp(), retry_eta)
 
+        # Acknowledge the message last, so that if the consumer is killed
+        # before this point the task is delivered again rather than lost.
+        self._release_args(task)
+        self.acknowledge(task)
         return task_value
 
     def _requeue_task(self, task, timestamp, retry_eta=None):
@@ -574,12 +812,16 @@ class Scrooge(object):
             task_class = task_class.task_class
         if revoke_until is not None:
             revoke_until = normalize_time(revoke_until, utc=self.utc)
-        self.put(self._task_key(task_class, "rt"), (revoke_until, revoke_once))
+        key = self._task_key(task_class, "rt")
+        self._revoke_cache.pop(key, None)
+        self.put(key, (revoke_until, revoke_once))
 
     def restore_all(self, task_class):
         if isinstance(task_class, TaskWrapper):
             task_class = task_class.task_class
-        return self.delete(self._task_key(task_class, "rt"))
+        key = self._task_key(task_class, "rt")
+        self._revoke_cache.pop(key, None)
+        return self.delete(key)
 
     def revoke(self, task, revoke_until=None, revoke_once=False):
         if revoke_until is not None:
@@ -603,7 +845,9 @@ class Scrooge(object):
         1. Is task revoked?
         2. Should task be restored?
         """
-        res = self.get(revoke_id, peek=True)
+        return self._revoke_status(self.get(revoke_id, peek=True), timestamp, peek)
+
+    def _revoke_status(self, res, timestamp=None, peek=True):
         if res is None:
             return False, False
 
@@ -622,6 +866,19 @@ class Scrooge(object):
             # Task is still revoked. Do not restore.
             return True, False
 
+    def _get_cached_revocation(self, key):
+        if self.revoke_cache_timeout:
+            cached = self._revoke_cache.get(key)
+            if cached is not None and cached[0] > time_clock():
+                return cached[1]
+        return _sentinel
+
+    def _cache_revocation(self, key, res):
+        # A revoke-once flag is consumed by the next task that is executed, so
+        # it is not cached.
+        if self.revoke_cache_timeout and (res is None or not res[1]):
+            self._revoke_cache[key] = (time_clock() + self.revoke_cache_timeout, res)
+
     def is_revoked(self, task, timestamp=None, peek=True):
         if isinstance(task, TaskWrapper):
             task = task.task_class
@@ -638,12 +895,24 @@ class Scrooge(object):
             # Assume we've been given a task ID.
             task = Task(id=task)
 
-        key = task.revoke_id
-        is_revoked, can_restore = self._check_revoked(key, timestamp, peek)
+        # Read the task's revoke key and the key for its class in one call,
+        # unless the state of the class is cached.
+        task_class = type(task)
+        class_key = self._task_key(task_class, "rt")
+        class_res = self._get_cached_revocation(class_key)
+        if class_res is _sentinel:
+            res, class_res = self.get_many([task.revoke_id, class_key], peek=True)
+            self._cache_revocation(class_key, class_res)
+        else:
+            res = self.get(task.revoke_id, peek=True)
+
+        is_revoked, can_restore = self._revoke_status(res, timestamp, peek)
         if can_restore:
             self.restore(task)
         if not is_revoked:
-            is_revoked = self.is_revoked(type(task), timestamp, peek)
+            is_revoked, can_restore = self._revoke_status(class_res, timestamp, peek)
+            if can_restore:
+                self.restore_all(task_class)
 
         return is_revoked
 
@@ -654,13 +923,14 @@ class Scrooge(object):
         logger.info("Added task %s to schedule, eta %s", task.id, eta)
         self._emit(S.SIGNAL_SCHEDULED, task)
 
-    def read_schedule(self, timestamp=None):
+    def read_schedule(self, timestamp=None, limit=None):
         if timestamp is None:
             timestamp = self._get_timestamp()
-        return [
-            self.deserialize_task(task)
-            for task in self.storage.read_schedule(timestamp)
-        ]
+        if limit is None:
+            data = self.storage.read_schedule(timestamp)
+        else:
+            data = self.storage.read_schedule(timestamp, limit)
+        return [self.deserialize_task(task) for task in data]
 
     def read_periodic(self, timestamp):
         if timestamp is None:
@@ -703,6 +973,8 @@ class Scrooge(object):
 
     def flush(self):
         self.storage.flush_all()
+        if self._blob_storage is None and self.blob_storage is not self.storage:
+            self.blob_storage.flush_results()
 
     def lock_task(self, lock_name):
         return TaskLock(self, lock_name)
@@ -753,6 +1025,7 @@ class Task(object):
     default_priority = None
     default_retries = 0
     default_retry_delay = 0
+    timeout = None  # Seconds the consumer lets the task run for, if limited.
 
     def __init__(
         self,
@@ -876,6 +1149,13 @@ class PeriodicTask(Task):
     def validate_datetime(self, timestamp):
         return False
 
+    def next_after(self, timestamp):
+        """
+        Return the first minute after the given timestamp at which the task
+        should run, or ``None`` if this cannot be determined.
+        """
+        return None
+
 
 class TaskWrapper(object):
     task_base = Task
@@ -980,8 +1260,14 @@ class TaskWrapper(object):
     def _apply(self, it):
         return [self.s(*(i if isinstance(i, tuple) else (i,))) for i in it]
 
-    def map(self, it):
-        return ResultGroup([self.scrooge.enqueue(t) for t in self._apply(it)])
+    def map(self, it, batch_size=None):
+        tasks = self._apply(it)
+        if not batch_size:
+            batch_size = max(len(tasks), 1)
+        results = []
+        for i in range(0, len(tasks), batch_size):
+            results.extend(self.scrooge.enqueue_many(tasks[i : i + batch_size]))
+        return ResultGroup(results)
 
     def __call__(self, *args, **kwargs):
         return self.scrooge.enqueue(self.s(*args, **kwargs))
@@ -1083,17 +1369,16 @@ class Result(object):
         return self.get(*args, **kwargs)
 
     def _get(self, preserve=False):
-        task_id = self.id
         if self._result is EmptyData:
-            res = self.scrooge.get_raw(task_id, peek=preserve)
+            self._set_raw(self.scrooge.get_raw(self.id, peek=preserve), preserve)
+        return self._result
 
-            if res is not EmptyData:
-                self._result = self.scrooge.serializer.deserialize(res)
-                return self._result
-            else:
-                return res
-        else:
-            return self._result
+    def _set_raw(self, res, preserve=False):
+        if res is not EmptyData:
+            value = self.scrooge.serializer.deserialize(res)
+            if isinstance(value, ClaimCheck):
+                value = self.scrooge._get_blob(value, peek=preserve)
+            self._result = value
 
     def get_raw_result(
         self,
@@ -1111,16 +1396,27 @@ class Result(object):
         else:
             start = time_clock()
             delay = 0.1
+            storage = self.scrooge.storage
             while self._result is EmptyData:
-                if timeout and time_clock() - start >= timeout:
+                elapsed = time_clock() - start
+                if timeout and elapsed >= timeout:
                     if revoke_on_timeout:
                         self.revoke()
                     raise ScroogeException("timed out waiting for result")
                 if delay > max_delay:
                     delay = max_delay
                 if self._get(preserve) is EmptyData:
-                    time.sleep(delay)
-                    delay *= backoff
+                    if storage.result_notifications:
+                        # Block until the result is ready. We still wake up at
+                        # most every max_delay seconds and check for the
+                        # result, in case the notification was missed.
+                        wait = max_delay
+                        if timeout:
+                            wait = min(wait, timeout - elapsed)
+                        storage.wait_for_results([self.id], wait)
+                    else:
+                        time.sleep(delay)
+                        delay *= backoff
 
             return self._result
 
@@ -1186,8 +1482,64 @@ class ResultGroup(object):
     def __init__(self, results):
         self._results = results
 
-    def get(self, *args, **kwargs):
-        return [result.get(*args, **kwargs) for result in self._results]
+    def _fetch(self, results, preserve=False):
+        # Read any results that are not yet available using a single bulk
+        # operation, returning the list of results that are still pending.
+        pending = [r for r in results if r._result is EmptyData]
+        if pending:
+            scrooge = pending[0].scrooge
+            values = scrooge.get_raw_many([r.id for r in pending], peek=preserve)
+            for result, value in zip(pending, values):
+                result._set_raw(value, preserve)
+        return [r for r in pending if r._result is EmptyData]
+
+    def _wait(self, pending, delay, max_delay, remaining=None):
+        # Storages that support result notifications wake us up as soon as any
+        # of the pending results is ready, otherwise we sleep with backoff.
+        storage = pending[0].scrooge.storage
+        notify = storage.result_notifications
+        wait = max_delay if notify else min(delay, max_delay)
+        if remaining is not None:
+            wait = min(wait, remaining)
+        if notify:
+            storage.wait_for_results([r.id for r in pending], wait)
+        else:
+            time.sleep(wait)
+
+    def get(
+        self,
+        blocking=False,
+        timeout=None,
+        backoff=1.15,
+        max_delay=1.0,
+        revoke_on_timeout=False,
+        preserve=False,
+    ):
+        pending = self._fetch(self._results, preserve)
+        if blocking:
+            start = time_clock()
+            delay = 0.1
+            while pending:
+                if timeout:
+                    remaining = timeout - (time_clock() - start)
+                    if remaining <= 0:
+                        if revoke_on_timeout:
+                            for result in pending:
+                                result.revoke()
+                        raise ScroogeException("timed out waiting for result")
+                    self._wait(pending, delay, max_delay, remaining)
+                else:
+                    self._wait(pending, delay, max_delay)
+                delay *= backoff
+                pending = self._fetch(pending, preserve)
+
+        accum = []
+        for result in self._results:
+            value = None if result._result is EmptyData else result._result
+            if isinstance(value, Error):
+                raise TaskException(value.metadata)
+            accum.append(value)
+        return accum
 
     __call__ = get
 
@@ -1201,28 +1553,117 @@ class ResultGroup(object):
         return len(self._results)
 
     def as_completed(self, backoff=1.15, max_delay=1.0):
-        res = deque(self._results)
-        delay = {r.id: 0.0 for r in res}
-        while res:
-            r = res.popleft()
-            if delay[r.id]:
-                time.sleep(delay[r.id])
-            if r._get() is EmptyData:
-                res.append(r)
-                delay[r.id] = min((delay[r.id] or 0.1) * backoff, max_delay)
-            else:
-                yield r.get()
+        pending = list(self._results)
+        delay = 0.1
+        while pending:
+            waiting = self._fetch(pending)
+            for result in pending:
+                if result._result is not EmptyData:
+                    yield result.get()
+            pending = waiting
+            if pending:
+                self._wait(pending, delay, max_delay)
+                delay *= backoff
 
 
 dash_re = re.compile(r"(\d+)-(\d+)")
 every_re = re.compile(r"\*\/(\d+)")
 
 
+def _next_bit(mask, start):
+    # Index of the lowest bit set in mask at or above start, or None.
+    mask >>= start
+    if mask:
+        return start + (mask & -mask).bit_length() - 1
+
+
+class Crontab(object):
+    """
+    Compiled crontab schedule. Each field is an integer bitmask, in which bit
+    ``n`` is set if the value ``n`` is accepted. Calling the object with a
+    datetime returns whether the datetime matches the schedule.
+    """
+
+    # Give up looking for the next matching minute after this many years, e.g.
+    # Feb 29th falling on a given day of the week repeats every 28 years.
+    max_years = 28
+
+    def __init__(self, month, day, day_of_week, hour, minute):
+        self.month = month
+        self.day = day
+        self.day_of_week = day_of_week
+        self.hour = hour
+        self.minute = minute
+
+    def __call__(self, timestamp):
+        _, m, d, H, M, _, w, _, _ = timestamp.timetuple()
+
+        # fix the weekday to be sunday=0
+        w = (w + 1) % 7
+
+        return bool(
+            (self.month >> m)
+            & (self.day >> d)
+            & (self.day_of_week >> w)
+            & (self.hour >> H)
+            & (self.minute >> M)
+            & 1
+        )
+
+    def next_after(self, timestamp):
+        """
+        Return the first minute after the given timestamp which matches the
+        schedule, or ``None`` if there is none.
+        """
+        one_day = datetime.timedelta(days=1)
+        one_hour = datetime.timedelta(hours=1)
+        dt = timestamp.replace(second=0, microsecond=0)
+        dt += datetime.timedelta(minutes=1)
+        end_year = dt.year + self.max_years
+
+        while dt.year <= end_year:
+            if not (self.month >> dt.month) & 1:
+                # Skip to the first day of the next month. The day is reset in
+                # the same call, as the next month may be shorter.
+                if dt.month == 12:
+                    dt = dt.replace(year=dt.year + 1, month=1, day=1)
+                else:
+                    dt = dt.replace(month=dt.month + 1, day=1)
+                dt = dt.replace(hour=0, minute=0)
+            elif (
+                not (self.day >> dt.day)
+                & (self.day_of_week >> (dt.isoweekday() % 7))
+                & 1
+            ):
+                dt = dt.replace(hour=0, minute=0) + one_day
+            else:
+                hour = _next_bit(self.hour, dt.hour)
+                if hour is None:
+                    dt = dt.replace(hour=0, minute=0) + one_day
+                elif hour != dt.hour:
+                    dt = dt.replace(hour=hour, minute=0)
+                else:
+                    minute = _next_bit(self.minute, dt.minute)
+                    if minute is not None:
+                        return dt.replace(minute=minute)
+                    dt = dt.replace(minute=0) + one_hour
+
+    def __repr__(self):
+        return "<Crontab: M=%x H=%x d=%x m=%x w=%x>" % (
+            self.minute,
+            self.hour,
+            self.day,
+            self.month,
+            self.day_of_week,
+        )
+
+
 def crontab(minute="*", hour="*", day="*", month="*", day_of_week="*", strict=False):
     """
     Convert a "crontab"-style set of parameters into a test function that will
     return True when the given datetime matches the parameters set forth in
-    the crontab.
+    the crontab. The returned :py:class:`Crontab` can also compute the next
+    matching minute after a given datetime, using ``next_after()``.
 
     For day-of-week, 0=Sunday and 6=Saturday.
 
@@ -1291,21 +1732,12 @@ def crontab(minute="*", hour="*", day="*", month="*", day_of_week="*", strict=Fa
             if strict:
                 raise ValueError("%s is not a valid input" % piece)
 
-        cron_settings.append(sorted(list(settings)))
-
-    def validate_date(timestamp):
-        _, m, d, H, M, _, w, _, _ = timestamp.timetuple()
-
-        # fix the weekday to be sunday=0
-        w = (w + 1) % 7
-
-        for date_piece, selection in zip((m, d, w, H, M), cron_settings):
-            if date_piece not in selection:
-                return False
-
-        return True
+        mask = 0
+        for n in settings:
+            mask |= 1 << n
+        cron_settings.append(mask)
 
-    return validate_date
+    return Crontab(*cron_settings)
 
 
 def _unsupported(name, library):
@@ -1339,6 +1771,14 @@ class RedisExpireScrooge(RedisScrooge):
     storage_class = RedisExpireStorage
 
 
+class ReliableRedisScrooge(RedisScrooge):
+    storage_class = ReliableRedisStorage
+
+
+class RedisStreamScrooge(RedisScrooge):
+    storage_class = RedisStreamStorage
+
+
 class PriorityRedisScrooge(RedisScrooge):
     storage_class = PriorityRedisStorage
 
@@ -1,7 +1,10 @@
 WORKER_THREAD = "thread"
 WORKER_GREENLET = "greenlet"
 WORKER_PROCESS = "process"
-WORKER_TYPES = (WORKER_THREAD, WORKER_GREENLET, WORKER_PROCESS)
+WORKER_ASYNCIO = "asyncio"
+WORKER_TYPES = (WORKER_THREAD, WORKER_GREENLET, WORKER_PROCESS, WORKER_ASYNCIO)
+
+MIN_SCHEDULER_INTERVAL = 0.01  # Shortest supported scheduler interval, in seconds.
 
 
 class EmptyData(object):
@@ -1,12 +1,24 @@
 import datetime
+import heapq
 import logging
+import math
 import os
 import signal
+import struct
 import sys
 import threading
 import time
+from collections import deque
 from multiprocessing import Event as ProcessEvent
-from multiprocessing import Process
+from multiprocessing import Process, RawArray
+from multiprocessing import Value as ProcessValue
+
+try:
+    import ctypes
+
+    _set_async_exc = ctypes.pythonapi.PyThreadState_SetAsyncExc
+except (AttributeError, ImportError):
+    _set_async_exc = None
 
 try:
     import gevent
@@ -16,13 +28,15 @@ except ImportError:
     Greenlet = GreenEvent = None
 
 from scrooge.constants import (
+    MIN_SCHEDULER_INTERVAL,
+    WORKER_ASYNCIO,
     WORKER_GREENLET,
     WORKER_PROCESS,
     WORKER_THREAD,
     WORKER_TYPES,
 )
-from scrooge.exceptions import ConfigurationError
-from scrooge.utils import time_clock
+from scrooge.exceptions import ConfigurationError, TaskTimeout
+from scrooge.utils import get_rss, is_factor_of_minute, time_clock
 
 
 class ConsumerStopped(Exception):
@@ -31,6 +45,7 @@ class ConsumerStopped(Exception):
 
 class BaseProcess(object):
     process_name = "BaseProcess"
+    finished = False  # Set to exit the process once the current loop is done.
 
     def __init__(self, scrooge):
         self.scrooge = scrooge
@@ -83,14 +98,57 @@ class Worker(BaseProcess):
 
     Will pull tasks from the queue, executing them or adding them to the
     schedule if they are set to run in the future.
+
+    When ``prefetch`` is greater than 1, the worker reads up to that many
+    tasks from the queue at a time and keeps them in a local buffer. Any
+    tasks remaining in the buffer are put back at the head of the queue at
+    shutdown, if the storage supports it, otherwise at the end.
+
+    The worker exits after executing ``max_tasks`` tasks, or after the task
+    which takes the resident memory of the process over ``max_memory`` bytes,
+    so that the consumer can replace it.
+
+    Task timeouts are enforced using the ``timer`` provided by the execution
+    environment. Process workers also record the time at which the current
+    task should have finished in ``deadline``, and the task's message in
+    ``task_buffer``, so that the consumer can kill the process if the task
+    does not respond to the timer, and then fail or retry the task.
+
+    When the consumer scales the number of workers, the worker reports the
+    fraction of its capacity in use in ``busy``, and exits once the consumer
+    sets its ``retire_flag``.
     """
 
     process_name = "Worker"
 
-    def __init__(self, scrooge, default_delay, max_delay, backoff):
+    def __init__(
+        self,
+        scrooge,
+        default_delay,
+        max_delay,
+        backoff,
+        prefetch=1,
+        max_tasks=None,
+        max_memory=None,
+        timer=None,
+        deadline=None,
+        task_buffer=None,
+        busy=None,
+        retire_flag=None,
+    ):
         self.delay = self.default_delay = default_delay
         self.max_delay = max_delay
         self.backoff = backoff
+        self.prefetch = prefetch
+        self.max_tasks = max_tasks
+        self.max_memory = max_memory
+        self.timer = timer
+        self.deadline = deadline
+        self.task_buffer = task_buffer
+        self.busy = busy
+        self.retire_flag = retire_flag
+        self._buffer = deque()
+        self._tasks_executed = 0
         super(Worker, self).__init__(scrooge)
 
     def initialize(self):
@@ -102,6 +160,7 @@ class Worker(BaseProcess):
                 self._logger.exception('startup hook "%s" failed', name)
 
     def shutdown(self):
+        self.requeue_buffered()
         for name, shutdown_hook in self.scrooge._shutdown.items():
             self._logger.debug('calling shutdown hook "%s"', name)
             try:
@@ -109,25 +168,108 @@ class Worker(BaseProcess):
             except Exception as exc:
                 self._logger.exception('shutdown hook "%s" failed', name)
 
+    def requeue_buffered(self):
+        if not self._buffer:
+            return
+        tasks, self._buffer = list(self._buffer), deque()
+        self._logger.info("Returning %d prefetched task(s) to queue", len(tasks))
+        try:
+            self.scrooge.enqueue_many(tasks, front=True)
+        except Exception:
+            self._logger.exception(
+                "Unable to return prefetched tasks to queue: %s",
+                ", ".join(task.id for task in tasks),
+            )
+        else:
+            for task in tasks:
+                self.scrooge.acknowledge(task)
+
+    def dequeue(self):
+        if self.prefetch <= 1:
+            return self.scrooge.dequeue()
+        if not self._buffer:
+            self._buffer.extend(self.scrooge.dequeue_many(self.prefetch))
+        if self._buffer:
+            return self._buffer.popleft()
+
     def loop(self, now=None):
+        if self.check_retired():
+            return
+
         task = None
         try:
-            task = self.scrooge.dequeue()
+            task = self.dequeue()
         except Exception:
             self._logger.exception("Error reading from queue")
             self.sleep()
         else:
             if task is not None:
                 self.delay = self.default_delay
+                if self.busy is not None:
+                    self.busy.value = 1
+                if task.timeout and self.deadline is not None:
+                    self.publish_task(task)
+                    self.deadline.value = time.time() + task.timeout
                 try:
-                    self.scrooge.execute(task, now)
+                    self.scrooge.execute(task, now, self.timer)
                 except Exception as exc:
                     self._logger.exception(
                         "Unhandled error during execution " "of task %s.", task.id
                     )
+                finally:
+                    if self.deadline is not None:
+                        self.deadline.value = 0
+                    if self.busy is not None:
+                        self.busy.value = 0
+                self.task_executed()
             elif not self.scrooge.storage.blocking:
                 self.sleep()
 
+    def publish_task(self, task):
+        """
+        Store the message of the task which is about to run in the
+        ``task_buffer``, prefixed with its length. If the message does not
+        fit, only the task's id and name are stored, and it is not retried.
+        """
+        if self.task_buffer is None:
+            return
+        data = getattr(task, "_message", None)
+        if data is None or len(data) + 4 > len(self.task_buffer):
+            message = self.scrooge._registry.create_message(task)
+            message = message._replace(
+                args=(), kwargs=None, retries=0, on_complete=None, on_error=None
+            )
+            data = self.scrooge.serializer.serialize(message)
+        if len(data) + 4 > len(self.task_buffer):
+            data = b""
+        self.task_buffer[: len(data) + 4] = struct.pack(">I", len(data)) + data
+
+    def check_retired(self):
+        """
+        Return whether the worker should exit, which it does when it has been
+        retired by the consumer.
+        """
+        if self.retire_flag is not None and self.retire_flag.is_set():
+            if not self.finished:
+                self._logger.info("Worker retired by the consumer, exiting.")
+                self.finished = True
+        return self.finished
+
+    def task_executed(self):
+        self._tasks_executed += 1
+        if self.max_tasks and self._tasks_executed >= self.max_tasks:
+            self._logger.info(
+                "Worker exiting after executing %s task(s).", self._tasks_executed
+            )
+            self.finished = True
+        elif self.max_memory:
+            rss = get_rss()
+            if rss is not None and rss > self.max_memory:
+                self._logger.info(
+                    "Worker exiting, memory usage is %0.1fMB.", rss / 1048576.0
+                )
+                self.finished = True
+
     def sleep(self):
         if self.delay > self.max_delay:
             self.delay = self.max_delay
@@ -143,48 +285,380 @@ class Scheduler(BaseProcess):
     them so that they can be picked up by the worker processes.
 
     If periodic tasks are enabled, the scheduler will wake up every 60 seconds
-    to enqueue any periodic tasks that should be run.
+    to enqueue any periodic tasks that should be run. Tasks scheduled using
+    :py:func:`crontab` are kept in a heap ordered by the next minute they
+    run, so only the tasks which are due are looked at.
+
+    For storages that provide at-least-once delivery, the scheduler also
+    returns messages held by consumers that are no longer running to the queue
+    every ``requeue_check_seconds``. Storages which set a
+    ``checkpoint_interval`` have their ``checkpoint()`` method called by the
+    scheduler at that interval.
+
+    When ``event_driven`` is set, rather than waking up every ``interval``
+    seconds, the scheduler sleeps until the earliest scheduled task or
+    periodic task is due. Storages that support ``schedule_notifications``
+    wake the scheduler early when a task is added to the schedule, otherwise
+    the scheduler sleeps for at most ``interval`` seconds.
+
+    Storages which implement ``promote_due()`` move due tasks onto the queue
+    themselves, otherwise the scheduler reads and enqueues them. Due tasks
+    are processed in chunks of at most ``chunk_size`` tasks (default
+    ``schedule_chunk_size``), so that a large backlog (e.g. after an outage)
+    does not block the storage. The chunk size shrinks while reading and
+    enqueueing a chunk takes longer than ``chunk_budget`` seconds (default
+    ``schedule_chunk_budget``), and grows back again when there is time to
+    spare.
     """
 
     periodic_task_seconds = 60
+    requeue_check_seconds = 10
+    max_wait_seconds = 5  # Bounds the time taken to notice a shutdown.
+    notify_margin = 1  # Final seconds of a wait use sleep() for precision.
+    schedule_chunk_size = 1000
+    server_side_promote = True  # Use storage.promote_due() if implemented.
+    schedule_chunk_budget = 0.1
     process_name = "Scheduler"
 
-    def __init__(self, scrooge, interval, periodic):
+    def __init__(
+        self,
+        scrooge,
+        interval,
+        periodic,
+        event_driven=False,
+        chunk_size=None,
+        chunk_budget=None,
+    ):
         super(Scheduler, self).__init__(scrooge)
-        self.interval = max(min(interval, 60), 1)
+        self.interval = max(min(interval, 60), MIN_SCHEDULER_INTERVAL)
+        if chunk_size is not None:
+            self.schedule_chunk_size = chunk_size
+        if chunk_budget is not None:
+            self.schedule_chunk_budget = chunk_budget
 
         self.periodic = periodic
+        self.event_driven = event_driven
+        self._chunk_size = self.schedule_chunk_size
+        self._promote = self.server_side_promote
         self._next_loop = time_clock()
         self._next_periodic = time_clock()
+        self._next_requeue_check = time_clock()
+        self._next_checkpoint = time_clock()
+
+        # Heap of (next run, registry index, task) for periodic tasks which
+        # can compute their next run, rebuilt when the registry changes.
+        self._periodic_classes = None
+        self._periodic_heap = []
+        self._periodic_other = []
+        self._periodic_minute = None
 
     def loop(self, now=None):
+        if self.event_driven:
+            self.wait(self.process_events(now))
+            return
+
         current = self._next_loop
         self._next_loop += self.interval
         if self._next_loop < time_clock():
             self._logger.debug("scheduler skipping iteration to avoid race.")
             return
 
+        self.enqueue_scheduled_tasks(now)
+
+        if self.periodic and self._next_periodic <= time_clock():
+            self._next_periodic += self.periodic_task_seconds
+            self.enqueue_periodic_tasks(now)
+
+        if self._next_requeue_check <= time_clock():
+            self._next_requeue_check += self.requeue_check_seconds
+            self.requeue_unacknowledged()
+
+        self.checkpoint()
+
+        self.sleep_for_interval(current, self.interval)
+
+    def process_events(self, now=None):
+        """
+        Enqueue any scheduled or periodic tasks that are due, returning the
+        number of seconds until the next known event.
+        """
+        if now is None:
+            now = self.scrooge._get_timestamp()
+
+        storage = self.scrooge.storage
+        if storage.schedule_notifications:
+            timeout = self.max_wait_seconds
+        else:
+            timeout = self.interval
+
         try:
-            task_list = self.scrooge.read_schedule(now)
+            eta = storage.peek_schedule()
+        except NotImplementedError:
+            # Poll the schedule every interval.
+            self.enqueue_scheduled_tasks(now)
+            eta = None
+            timeout = self.interval
         except Exception:
             self._logger.exception("Error reading schedule.")
+            eta = None
+            timeout = self.interval
         else:
+            if eta is not None and eta <= now:
+                self.enqueue_scheduled_tasks(now)
+                try:
+                    eta = storage.peek_schedule()
+                except Exception:
+                    self._logger.exception("Error reading schedule.")
+                    eta = None
+                    timeout = self.interval
+
+        if eta is not None:
+            timeout = min(timeout, (eta - now).total_seconds())
+
+        if self.periodic:
+            if now.replace(second=0, microsecond=0) != self._periodic_minute:
+                self.enqueue_periodic_tasks(now)
+            next_periodic = self.next_periodic_run()
+            if next_periodic is not None:
+                timeout = min(timeout, (next_periodic - now).total_seconds())
+
+        if self._next_requeue_check <= time_clock():
+            self._next_requeue_check += self.requeue_check_seconds
+            self.requeue_unacknowledged()
+        timeout = min(timeout, self._next_requeue_check - time_clock())
+
+        if storage.checkpoint_interval:
+            self.checkpoint()
+            timeout = min(timeout, self._next_checkpoint - time_clock())
+
+        return max(timeout, 0)
+
+    def wait(self, timeout):
+        """
+        Sleep for the given number of seconds, or until a task is added to the
+        schedule if the storage supports schedule notifications.
+        """
+        if timeout <= 0:
+            return
+        self._logger.debug("Sleeping for %s", timeout)
+        storage = self.scrooge.storage
+
+        # Blocking reads may time out late (e.g. Redis checks timeouts 10
+        # times per second), so the last part of the wait uses sleep().
+        if storage.schedule_notifications and timeout > self.notify_margin:
+            try:
+                if storage.wait_for_schedule(timeout - self.notify_margin):
+                    self._logger.debug("Woken up by newly-scheduled task.")
+                return
+            except Exception:
+                self._logger.exception("Error waiting for schedule.")
+        time.sleep(timeout)
+
+    def enqueue_scheduled_tasks(self, now):
+        if now is None:
+            now = self.scrooge._get_timestamp()
+        while True:
+            limit = self._chunk_size
+            start = time_clock()
+            try:
+                count = self.promote_due(now, limit)
+            except Exception:
+                self._logger.exception("Error enqueueing scheduled tasks.")
+                return
+
+            # Keep each chunk within the latency budget.
+            duration = time_clock() - start
+            if duration > self.schedule_chunk_budget:
+                self._chunk_size = max(limit // 2, 1)
+            elif duration < self.schedule_chunk_budget / 2:
+                self._chunk_size = min(limit * 2, self.schedule_chunk_size)
+
+            if count < limit:
+                break
+
+    def promote_due(self, now, limit):
+        """
+        Move up to ``limit`` due tasks from the schedule to the queue,
+        returning the number of tasks moved.
+        """
+        if self._promote:
+            try:
+                count = self.scrooge.storage.promote_due(now, limit)
+            except NotImplementedError:
+                self._promote = False
+            else:
+                if count:
+                    self._logger.debug("Moved %s scheduled task(s) to queue", count)
+                return count
+
+        task_list = self.scrooge.read_schedule(now, limit)
+        if task_list:
             for task in task_list:
                 self._logger.debug("Enqueueing %s", task)
-                self.scrooge.enqueue(task)
+            self.scrooge.enqueue_many(task_list)
+        return len(task_list)
 
-        if self.periodic and self._next_periodic <= time_clock():
-            self._next_periodic += self.periodic_task_seconds
-            self.enqueue_periodic_tasks(now)
+    def checkpoint(self):
+        interval = self.scrooge.storage.checkpoint_interval
+        if not interval or self._next_checkpoint > time_clock():
+            return
+        self._next_checkpoint = time_clock() + interval
+        try:
+            self.scrooge.storage.checkpoint()
+        except Exception:
+            self._logger.exception("Error performing storage checkpoint.")
 
-        self.sleep_for_interval(current, self.interval)
+    def requeue_unacknowledged(self):
+        try:
+            n = self.scrooge.requeue_unacknowledged()
+        except Exception:
+            self._logger.exception("Error requeueing unacknowledged tasks.")
+        else:
+            if n:
+                self._logger.warning("Requeued %s unacknowledged task(s).", n)
 
     def enqueue_periodic_tasks(self, now):
         self._logger.debug("Checking periodic tasks")
-        for task in self.scrooge.read_periodic(now):
+        for task in self.read_periodic(now):
             self._logger.info("Enqueueing periodic task %s.", task)
             self.scrooge.enqueue(task)
 
+    def next_periodic_run(self):
+        """
+        Return the next minute at which a periodic task may need to run, or
+        ``None`` if there are no periodic tasks.
+        """
+        if self._periodic_minute is None:
+            return
+        elif self._periodic_other:
+            return self._periodic_minute + datetime.timedelta(minutes=1)
+        elif self._periodic_heap:
+            return self._periodic_heap[0][0]
+
+    def _build_periodic_heap(self, task_classes, minute):
+        self._periodic_classes = list(task_classes)
+        self._periodic_heap = []
+        self._periodic_other = []
+        previous = minute - datetime.timedelta(minutes=1)
+        for idx, task_class in enumerate(self._periodic_classes):
+            task = task_class()
+            next_run = task.next_after(previous)
+            if next_run is None:
+                self._periodic_other.append((idx, task))
+            else:
+                self._periodic_heap.append((next_run, idx, task))
+        heapq.heapify(self._periodic_heap)
+
+    def read_periodic(self, now):
+        if now is None:
+            now = self.scrooge._get_timestamp()
+        minute = now.replace(second=0, microsecond=0)
+
+        # Rebuild the heap if tasks were (un-)registered, or if the clock went
+        # backwards.
+        task_classes = self.scrooge._registry._periodic_tasks
+        if (
+            self._periodic_classes != task_classes
+            or self._periodic_minute is None
+            or minute < self._periodic_minute
+        ):
+            self._build_periodic_heap(task_classes, minute)
+        self._periodic_minute = minute
+
+        due = []
+        for idx, task in self._periodic_other:
+            if task.validate_datetime(now):
+                due.append((idx, type(task)()))
+
+        # Runs which were missed, e.g. because the scheduler was not running,
+        # are skipped rather than enqueued late.
+        heap = self._periodic_heap
+        while heap and heap[0][0] <= minute:
+            next_run, idx, task = heapq.heappop(heap)
+            if next_run == minute:
+                due.append((idx, type(task)()))
+            next_run = task.next_after(minute)
+            if next_run is not None:
+                heapq.heappush(heap, (next_run, idx, task))
+
+        due.sort(key=lambda item: item[0])
+        return [task for _, task in due]
+
+
+class ThreadTimeout(object):
+    """
+    Raise :py:class:`TaskTimeout` in the current thread if the block has not
+    finished after the given number of seconds. The exception is delivered
+    the next time the thread runs Python code, so a call which is blocked,
+    e.g. reading from a socket, is interrupted once it returns.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self._lock = threading.Lock()
+        self._ident = None
+        self._fired = False
+
+    def __enter__(self):
+        self._ident = threading.current_thread().ident
+        self._timer = threading.Timer(self.seconds, self._expire)
+        self._timer.daemon = True
+        self._timer.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._timer.cancel()
+        with self._lock:
+            ident, self._ident = self._ident, None
+            if self._fired and exc_type is not TaskTimeout:
+                # Discard the exception if it has not been delivered yet.
+                _set_async_exc(ctypes.c_ulong(ident), None)
+        if self._fired and exc_type is None:
+            raise TaskTimeout()
+
+    def _expire(self):
+        with self._lock:
+            if self._ident is not None:
+                self._fired = True
+                _set_async_exc(
+                    ctypes.c_ulong(self._ident), ctypes.py_object(TaskTimeout)
+                )
+
+
+class AlarmTimeout(object):
+    """
+    Raise :py:class:`TaskTimeout` using ``SIGALRM`` if the block has not
+    finished after the given number of seconds. Only usable from the main
+    thread of a process. The signal interrupts blocking system calls.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __enter__(self):
+        self._handler = signal.signal(signal.SIGALRM, self._expire)
+        signal.setitimer(signal.ITIMER_REAL, self.seconds)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, self._handler)
+
+    def _expire(self, sig_num, frame):
+        raise TaskTimeout()
+
+
+class LocalValue(object):
+    """
+    Counterpart to :py:func:`multiprocessing.Value` for workers running in
+    the consumer's process.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
 
 class Environment(object):
     """
@@ -200,6 +674,36 @@ class Environment(object):
     def is_alive(self, proc):
         raise NotImplementedError
 
+    def get_timer(self):
+        """
+        Return a callable which enforces task timeouts in a worker, see
+        :py:meth:`Scrooge.execute`, or ``None`` if not supported.
+        """
+        return None
+
+    def get_deadline(self):
+        """
+        Return a value shared with a worker in which it stores the time at
+        which its current task times out, if the worker can be killed.
+        """
+        return None
+
+    def get_task_buffer(self):
+        """
+        Return a buffer shared with a worker in which it stores the message
+        of its current task, if the worker can be killed.
+        """
+        return None
+
+    def kill(self, proc):
+        raise NotImplementedError
+
+    def create_value(self, value=0.0):
+        """
+        Return a number which a worker can update and the consumer can read.
+        """
+        return LocalValue(value)
+
 
 class ThreadEnvironment(Environment):
     def get_stop_flag(self):
@@ -213,6 +717,10 @@ class ThreadEnvironment(Environment):
     def is_alive(self, proc):
         return proc.is_alive()
 
+    def get_timer(self):
+        if _set_async_exc is not None:
+            return ThreadTimeout
+
 
 class GreenletEnvironment(Environment):
     def get_stop_flag(self):
@@ -229,8 +737,13 @@ class GreenletEnvironment(Environment):
     def is_alive(self, proc):
         return not proc.dead
 
+    def get_timer(self):
+        return lambda seconds: gevent.Timeout(seconds, TaskTimeout)
+
 
 class ProcessEnvironment(Environment):
+    task_buffer_size = 65536
+
     def get_stop_flag(self):
         return ProcessEvent()
 
@@ -242,11 +755,38 @@ class ProcessEnvironment(Environment):
     def is_alive(self, proc):
         return proc.is_alive()
 
+    def get_timer(self):
+        if hasattr(signal, "setitimer"):
+            return AlarmTimeout
+
+    def get_deadline(self):
+        return self.create_value()
+
+    def get_task_buffer(self):
+        return RawArray("c", self.task_buffer_size)
+
+    def create_value(self, value=0.0):
+        return ProcessValue("d", value, lock=False)
+
+    def kill(self, proc):
+        # Process.kill() was added in Python 3.7.
+        getattr(proc, "kill", proc.terminate)()
+
+
+class AsyncioEnvironment(ThreadEnvironment):
+    """
+    Each worker runs its own asyncio event loop in a separate thread, see
+    :py:class:`scrooge.contrib.asyncio.AsyncioWorker`.
+    """
+
+    pass
+
 
 WORKER_TO_ENVIRONMENT = {
     WORKER_THREAD: ThreadEnvironment,
     WORKER_GREENLET: GreenletEnvironment,
     WORKER_PROCESS: ProcessEnvironment,
+    WORKER_ASYNCIO: AsyncioEnvironment,
 }
 
 
@@ -254,6 +794,13 @@ class Consumer(object):
     """
     Consumer sets up and coordinates the execution of the workers and scheduler
     and registers signal handlers.
+
+    When ``max_workers`` is greater than ``min_workers``, the number of
+    workers is scaled between the two (starting from ``workers``). Workers
+    are added when tasks have been waiting in the queue for
+    ``scale_up_delay`` seconds while the workers were busy, and an idle
+    worker is retired after ``scale_down_delay`` seconds without a backlog.
+    The retired worker exits once it finishes its current task.
     """
 
     # Simplify providing custom implementations. See _create_worker and
@@ -261,6 +808,18 @@ class Consumer(object):
     worker_class = Worker
     scheduler_class = Scheduler
 
+    # Seconds after a task's timeout before the worker process running it is
+    # killed, should the task not respond to the timeout.
+    timeout_kill_grace = 5
+
+    # Autoscaling: seconds between reading the queue size, the average
+    # fraction of the worker capacity in use above which workers are added,
+    # and how long the backlog or idle capacity must last before scaling.
+    scale_interval = 1.0
+    scale_up_utilization = 0.75
+    scale_up_delay = 2.0
+    scale_down_delay = 30.0
+
     def __init__(
         self,
         scrooge,
@@ -275,6 +834,15 @@ class Consumer(object):
         health_check_interval=10,
         flush_locks=False,
         extra_locks=None,
+        prefetch=1,
+        event_scheduler=False,
+        concurrency=100,
+        max_tasks_per_child=None,
+        max_memory_per_child=None,
+        min_workers=None,
+        max_workers=None,
+        schedule_chunk_size=1000,
+        schedule_chunk_budget=0.1,
     ):
 
         self._logger = logging.getLogger("scrooge.consumer")
@@ -286,24 +854,46 @@ class Consumer(object):
                 "be run."
             )
         self.scrooge = scrooge
-        self.workers = workers  # Number of workers.
+        self.min_workers = workers if min_workers is None else min_workers
+        self.max_workers = workers if max_workers is None else max_workers
+        if not (1 <= self.min_workers <= self.max_workers):
+            raise ConfigurationError(
+                "min_workers must be at least 1 and no greater than max_workers."
+            )
+        # Number of workers, at startup if autoscaling.
+        self.workers = min(max(workers, self.min_workers), self.max_workers)
+        self.autoscale = self.max_workers > self.min_workers
         self.periodic = periodic  # Enable periodic task scheduler?
         self.default_delay = initial_delay  # Default queue polling interval.
         self.backoff = backoff  # Exponential backoff factor when queue empty.
         self.max_delay = max_delay  # Maximum interval between polling events.
-
-        # Ensure that the scheduler runs at an interval between 1 and 60s.
-        self.scheduler_interval = max(min(scheduler_interval, 60), 1)
-        if 60 % self.scheduler_interval != 0:
+        self.prefetch = max(prefetch, 1)  # Number of tasks to read at a time.
+        self.event_scheduler = event_scheduler  # Sleep until next task is due?
+        self.schedule_chunk_size = schedule_chunk_size  # Due tasks per read.
+        self.schedule_chunk_budget = schedule_chunk_budget  # Seconds per chunk.
+        if event_scheduler and hasattr(scrooge.storage, "notify_schedule"):
+            # Wake the scheduler when workers schedule tasks, e.g. retries.
+            scrooge.storage.notify_schedule = True
+        self.concurrency = max(concurrency, 1)  # Tasks per asyncio worker.
+        self.max_tasks_per_child = max_tasks_per_child  # Restart worker after.
+        self.max_memory_per_child = max_memory_per_child  # Limit, in MB.
+
+        # Ensure that the scheduler runs at an interval between 10ms and 60s.
+        self.scheduler_interval = max(
+            min(scheduler_interval, 60), MIN_SCHEDULER_INTERVAL
+        )
+        if not is_factor_of_minute(self.scheduler_interval):
             raise ConfigurationError(
                 "Scheduler interval must be a factor "
-                "of 60, e.g. 1, 2, 3, 4, 5, 6, 10, 12..."
+                "of 60, e.g. 0.1, 0.5, 1, 2, 3, 4, 5, 6, 10, 12..."
             )
 
         if worker_type == "gevent":
             worker_type = WORKER_GREENLET
         if worker_type == WORKER_GREENLET and Greenlet is None:
             raise ImportError("Could not import gevent - is it installed?")
+        if worker_type == WORKER_ASYNCIO and sys.version_info < (3, 5):
+            raise ConfigurationError("asyncio workers require Python 3.5 or newer.")
         self.worker_type = worker_type  # What process model are we using?
 
         # Configure health-check and consumer main-loop attributes.
@@ -334,7 +924,7 @@ class Consumer(object):
 
         # Create the worker process(es) (also not started yet).
         self.worker_threads = []
-        for i in range(workers):
+        for i in range(self.workers):
             worker = self._create_worker()
             process = self._create_process(worker, "Worker-%d" % (i + 1))
 
@@ -343,6 +933,13 @@ class Consumer(object):
             # but it is referenced in the test-suite.
             self.worker_threads.append((worker, process))
 
+        # Workers which were retired by the autoscaler, but may still be
+        # finishing their current task.
+        self.retired_workers = []
+        self._next_scale = 0
+        self._busy_total = self._busy_samples = 0
+        self._backlog_since = self._idle_since = None
+
     def flush_locks(self, *names):
         self._logger.debug("Flushing locks before starting up.")
         flushed = self.scrooge.flush_locks(*names)
@@ -356,19 +953,59 @@ class Consumer(object):
             raise ValueError("worker_type must be one of %s." % ", ".join(WORKER_TYPES))
         return WORKER_TO_ENVIRONMENT[worker_type]()
 
+    @property
+    def _max_memory_bytes(self):
+        if self.max_memory_per_child:
+            return int(self.max_memory_per_child * 1024 * 1024)
+
     def _create_worker(self):
+        if self.worker_type == WORKER_ASYNCIO:
+            return self._create_asyncio_worker()
         return self.worker_class(
             scrooge=self.scrooge,
             default_delay=self.default_delay,
             max_delay=self.max_delay,
             backoff=self.backoff,
+            prefetch=self.prefetch,
+            max_tasks=self.max_tasks_per_child,
+            max_memory=self._max_memory_bytes,
+            timer=self.environment.get_timer(),
+            deadline=self.environment.get_deadline(),
+            task_buffer=self.environment.get_task_buffer(),
+            **self._autoscale_worker_kwargs()
+        )
+
+    def _create_asyncio_worker(self):
+        from scrooge.contrib.asyncio import AsyncioWorker
+
+        return AsyncioWorker(
+            scrooge=self.scrooge,
+            default_delay=self.default_delay,
+            max_delay=self.max_delay,
+            backoff=self.backoff,
+            prefetch=self.prefetch,
+            concurrency=self.concurrency,
+            max_tasks=self.max_tasks_per_child,
+            max_memory=self._max_memory_bytes,
+            **self._autoscale_worker_kwargs()
         )
 
+    def _autoscale_worker_kwargs(self):
+        if not self.autoscale:
+            return {}
+        return {
+            "busy": self.environment.create_value(),
+            "retire_flag": self.environment.get_stop_flag(),
+        }
+
     def _create_scheduler(self):
         return self.scheduler_class(
             scrooge=self.scrooge,
             interval=self.scheduler_interval,
             periodic=self.periodic,
+            event_driven=self.event_scheduler,
+            chunk_size=self.schedule_chunk_size,
+            chunk_budget=self.schedule_chunk_budget,
         )
 
     def _create_process(self, process, name):
@@ -382,16 +1019,23 @@ class Consumer(object):
                 self._set_child_signal_handlers()
 
             process.initialize()
+            crashed = False
             try:
-                while not self.stop_flag.is_set():
+                while not self.stop_flag.is_set() and not process.finished:
                     process.loop()
             except KeyboardInterrupt:
                 pass
             except:
                 self._logger.exception("Process %s died!", name)
+                crashed = True
             finally:
                 process.shutdown()
 
+            if crashed and self.worker_type == WORKER_PROCESS:
+                # Exit with a non-zero code, so that the consumer can tell a
+                # crash apart from a worker which reached its limits.
+                sys.exit(1)
+
         return self.environment.create_process(_run, name)
 
     def start(self):
@@ -422,7 +1066,39 @@ class Consumer(object):
             os.getpid(),
             self.scrooge._get_timestamp(),
         )
-        self._logger.info("Scheduler runs every %s second(s).", self.scheduler_interval)
+        if self.prefetch > 1:
+            self._logger.info("Workers prefetch up to %s task(s).", self.prefetch)
+        if self.max_tasks_per_child:
+            self._logger.info(
+                "Workers are replaced after %s task(s).", self.max_tasks_per_child
+            )
+        if self.max_memory_per_child:
+            if get_rss() is None:
+                self._logger.warning(
+                    "Unable to read worker memory usage on this platform, "
+                    "max_memory_per_child will be ignored."
+                )
+            else:
+                self._logger.info(
+                    "Workers are replaced when using over %sMB of memory.",
+                    self.max_memory_per_child,
+                )
+        if self.autoscale:
+            self._logger.info(
+                "Workers are scaled between %s and %s.",
+                self.min_workers,
+                self.max_workers,
+            )
+        if self.worker_type == WORKER_ASYNCIO:
+            self._logger.info(
+                "Each worker runs up to %s task(s) concurrently.", self.concurrency
+            )
+        if self.event_scheduler:
+            self._logger.info("Scheduler sleeps until the next task is due.")
+        else:
+            self._logger.info(
+                "Scheduler runs every %s second(s).", self.scheduler_interval
+            )
         self._logger.info(
             "Periodic tasks are %s.", "enabled" if self.periodic else "disabled"
         )
@@ -454,6 +1130,8 @@ class Consumer(object):
             try:
                 for _, worker_process in self.worker_threads:
                     worker_process.join()
+                for _, worker_process in self.retired_workers:
+                    worker_process.join()
                 self.scheduler.join()
             except KeyboardInterrupt:
                 self._logger.info("Received request to shut down now.")
@@ -501,34 +1179,189 @@ class Consumer(object):
             # Flag to caller that the main consumer loop should shut down.
             raise ConsumerStopped
 
+        recycle = self.max_tasks_per_child or self.max_memory_per_child
         if self._health_check and health_check_ts:
             now = time_clock()
             if now >= health_check_ts + self._health_check_interval:
                 health_check_ts = now
                 self.check_worker_health()
+                recycle = False
+
+        self.kill_timed_out_workers()
+
+        if recycle:
+            # Workers exit by themselves when they reach their limits, so
+            # replace them right away rather than at the next health check.
+            # Workers which crashed are left to the health check.
+            self.restart_workers(crashed=False)
+
+        if self.autoscale:
+            self.scale_workers()
 
         return health_check_ts
 
+    def scale_workers(self):
+        """
+        Add or retire workers depending on the number of tasks waiting in the
+        queue and how busy the workers are. The utilization of the workers is
+        sampled every time this is called, and averaged over each
+        ``scale_interval``. Returns the change in the number of workers.
+        """
+        self._busy_total += sum(w.busy.value for w, _ in self.worker_threads) / len(
+            self.worker_threads
+        )
+        self._busy_samples += 1
+
+        now = time_clock()
+        if now < self._next_scale:
+            return 0
+        self._next_scale = now + self.scale_interval
+        utilization = self._busy_total / self._busy_samples
+        self._busy_total = self._busy_samples = 0
+
+        self.retired_workers = [
+            (worker, worker_t)
+            for worker, worker_t in self.retired_workers
+            if self.environment.is_alive(worker_t)
+        ]
+
+        try:
+            pending = self.scrooge.pending_count()
+        except Exception:
+            self._logger.exception("Unable to read queue size for autoscaling.")
+            return 0
+
+        nworkers = len(self.worker_threads)
+        if pending and utilization >= self.scale_up_utilization:
+            # Tasks are waiting and the workers are busy. If this persists,
+            # add enough workers to run the waiting tasks.
+            self._idle_since = None
+            if self._backlog_since is None:
+                self._backlog_since = now
+            if nworkers < self.max_workers:
+                if now - self._backlog_since >= self.scale_up_delay:
+                    self._backlog_since = None
+                    capacity = (
+                        self.concurrency if self.worker_type == WORKER_ASYNCIO else 1
+                    )
+                    n = min(
+                        self.max_workers - nworkers,
+                        int(math.ceil(pending / float(capacity))),
+                    )
+                    self._logger.info(
+                        "Adding %d worker(s), %d task(s) waiting.", n, pending
+                    )
+                    self.add_workers(n)
+                    return n
+        elif not pending and utilization * nworkers <= nworkers - 1:
+            # At least one worker's worth of capacity is going unused.
+            self._backlog_since = None
+            if self._idle_since is None:
+                self._idle_since = now
+            if nworkers > self.min_workers:
+                if now - self._idle_since >= self.scale_down_delay:
+                    self._idle_since = now
+                    self.retire_worker()
+                    return -1
+        else:
+            self._backlog_since = self._idle_since = None
+        return 0
+
+    def add_workers(self, n):
+        """
+        Start ``n`` additional workers.
+        """
+        for _ in range(n):
+            self.worker_threads.append(self._start_worker(len(self.worker_threads)))
+
+    def _start_worker(self, i):
+        worker = self._create_worker()
+        worker_t = self._create_process(worker, "Worker-%d" % (i + 1))
+        worker_t.start()
+        return worker, worker_t
+
+    def retire_worker(self):
+        """
+        Ask the most recently added idle worker, or the most recently added
+        worker if they are all busy, to exit once it has finished the task it
+        is working on.
+        """
+        idx = len(self.worker_threads) - 1
+        for i in range(idx, -1, -1):
+            if not self.worker_threads[i][0].busy.value:
+                idx = i
+                break
+        worker, worker_t = self.worker_threads.pop(idx)
+        self._logger.info(
+            "Retiring worker %d, %d worker(s) remaining.",
+            idx + 1,
+            len(self.worker_threads),
+        )
+        worker.retire_flag.set()
+        self.retired_workers.append((worker, worker_t))
+
+    def kill_timed_out_workers(self):
+        """
+        Kill worker processes which are still running a task some time after
+        it timed out, and replace them, returning whether any were killed.
+        Retired workers are checked until they exit, but are not replaced.
+        The task is then handled as if it raised :py:class:`TaskTimeout`.
+        """
+        killed = False
+        now = time.time()
+        for i, (worker, worker_t) in enumerate(self.worker_threads):
+            if self._kill_timed_out(worker, worker_t, now, "Worker %d" % (i + 1)):
+                self.worker_threads[i] = self._start_worker(i)
+                killed = True
+
+        for worker, worker_t in self.retired_workers:
+            if self._kill_timed_out(worker, worker_t, now, "Retired worker"):
+                killed = True
+        return killed
+
+    def _kill_timed_out(self, worker, worker_t, now, label):
+        deadline = worker.deadline
+        if deadline is None or not deadline.value:
+            return False
+        if now <= deadline.value + self.timeout_kill_grace:
+            return False
+        deadline.value = 0
+        self.environment.kill(worker_t)
+        worker_t.join()
+
+        task = self._read_published_task(worker)
+        self._logger.error(
+            "%s did not stop after task %s timed out, killed.",
+            label,
+            task.id if task is not None else "(unknown)",
+        )
+        if task is not None:
+            try:
+                self.scrooge.handle_timeout(task)
+            except Exception:
+                self._logger.exception("Error handling timeout of %s.", task.id)
+        return True
+
+    def _read_published_task(self, worker):
+        buf = worker.task_buffer
+        if buf is None:
+            return
+        (length,) = struct.unpack(">I", buf[:4])
+        if not length:
+            return
+        try:
+            return self.scrooge.deserialize_task(buf[4 : 4 + length])
+        except Exception:
+            self._logger.exception("Unable to read task of killed worker.")
+
     def check_worker_health(self):
         """
         Check the health of the worker processes. Workers that have died will
         be replaced with new workers.
         """
         self._logger.debug("Checking worker health.")
-        workers = []
-        restart_occurred = False
-        for i, (worker, worker_t) in enumerate(self.worker_threads):
-            if not self.environment.is_alive(worker_t):
-                self._logger.warning("Worker %d died, restarting.", i + 1)
-                worker = self._create_worker()
-                worker_t = self._create_process(worker, "Worker-%d" % (i + 1))
-                worker_t.start()
-                restart_occurred = True
-            workers.append((worker, worker_t))
-
-        if restart_occurred:
-            self.worker_threads = workers
-        else:
+        restart_occurred = self.restart_workers()
+        if not restart_occurred:
             self._logger.debug("Workers are up and running.")
 
         if not self.environment.is_alive(self.scheduler):
@@ -541,6 +1374,35 @@ class Consumer(object):
 
         return not restart_occurred
 
+    def restart_workers(self, crashed=True):
+        """
+        Replace any workers that are no longer running, returning whether a
+        worker was restarted.
+
+        :param bool crashed: also replace workers which died, rather than only
+            the workers which exited after reaching their limits.
+        """
+        workers = []
+        restart_occurred = False
+        for i, (worker, worker_t) in enumerate(self.worker_threads):
+            if not self.environment.is_alive(worker_t):
+                # The worker object is not updated when running in a separate
+                # process, but a process which exited cleanly has exitcode 0.
+                if worker.finished or getattr(worker_t, "exitcode", None) == 0:
+                    self._logger.info("Worker %d exited, restarting.", i + 1)
+                elif crashed:
+                    self._logger.warning("Worker %d died, restarting.", i + 1)
+                else:
+                    workers.append((worker, worker_t))
+                    continue
+                worker, worker_t = self._start_worker(i)
+                restart_occurred = True
+            workers.append((worker, worker_t))
+
+        if restart_occurred:
+            self.worker_threads = workers
+        return restart_occurred
+
     def _set_signal_handlers(self):
         signal.signal(signal.SIGTERM, self._handle_stop_signal)
         if self.worker_type == WORKER_GREENLET:
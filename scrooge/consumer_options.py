@@ -3,7 +3,8 @@ import optparse
 from collections import namedtuple
 from logging import FileHandler
 
-from scrooge.constants import WORKER_THREAD, WORKER_TYPES
+from scrooge.constants import MIN_SCHEDULER_INTERVAL, WORKER_THREAD, WORKER_TYPES
+from scrooge.utils import is_factor_of_minute
 
 config_defaults = (
     ("workers", 1),
@@ -15,11 +16,20 @@ config_defaults = (
     ("health_check_interval", 10),
     ("scheduler_interval", 1),
     ("periodic", True),
+    ("event_scheduler", False),
+    ("schedule_chunk_size", 1000),
+    ("schedule_chunk_budget", 0.1),
     ("logfile", None),
     ("verbose", None),
     ("simple_log", None),
     ("flush_locks", False),
     ("extra_locks", None),
+    ("prefetch", 1),
+    ("concurrency", 100),
+    ("max_tasks_per_child", None),
+    ("max_memory_per_child", None),
+    ("min_workers", None),
+    ("max_workers", None),
 )
 config_keys = [param for param, _ in config_defaults]
 
@@ -37,7 +47,7 @@ def option(name, **options):
 class OptionParserHandler(object):
     def get_worker_options(self):
         return (
-            # -w, -k, -d, -m, -b, -c, -C, -f
+            # -w, -k, -d, -m, -b, -c, -C, -f, -L, -p, -a, -x, -M, -N, -W
             option(
                 "workers",
                 type="int",
@@ -49,9 +59,9 @@ class OptionParserHandler(object):
                 dest="worker_type",
                 help=(
                     "worker execution model (thread, greenlet, "
-                    "process). Use process for CPU-intensive workloads, "
-                    "and greenlet for IO-heavy workloads. When in doubt, "
-                    "thread is the safest choice."
+                    "process, asyncio). Use process for CPU-intensive "
+                    "workloads, and greenlet or asyncio for IO-heavy "
+                    "workloads. When in doubt, thread is the safest choice."
                 ),
             ),
             option(
@@ -105,15 +115,81 @@ class OptionParserHandler(object):
                 dest="extra_locks",
                 help=("additional locks to flush, separated by comma."),
             ),
+            option(
+                "prefetch",
+                type="int",
+                help=(
+                    "number of tasks each worker reads from the queue at a "
+                    "time (default=1)"
+                ),
+            ),
+            option(
+                ("a", "concurrency"),
+                type="int",
+                dest="concurrency",
+                help=(
+                    "maximum number of tasks each asyncio worker runs "
+                    "concurrently (default=100)"
+                ),
+            ),
+            option(
+                ("x", "max-tasks-per-child"),
+                type="int",
+                dest="max_tasks_per_child",
+                help=(
+                    "replace each worker after it has executed this many "
+                    "tasks (default=no limit)"
+                ),
+            ),
+            option(
+                ("M", "max-memory-per-child"),
+                type="float",
+                dest="max_memory_per_child",
+                metavar="MB",
+                help=(
+                    "replace a worker after a task leaves its process using "
+                    "more than this much resident memory, most useful with "
+                    "process workers (default=no limit)"
+                ),
+            ),
+            option(
+                ("N", "min-workers"),
+                type="int",
+                dest="min_workers",
+                help=(
+                    "fewest workers to scale down to when idle "
+                    "(default=same as --workers)"
+                ),
+            ),
+            option(
+                ("W", "max-workers"),
+                type="int",
+                dest="max_workers",
+                help=(
+                    "most workers to scale up to while tasks are waiting in "
+                    "the queue (default=same as --workers, no autoscaling)"
+                ),
+            ),
         )
 
     def get_scheduler_options(self):
         return (
-            # -s, -n
+            # -s, -n, -e, -z, -B
             option(
                 "scheduler_interval",
-                type="int",
-                help="Granularity of scheduler in seconds.",
+                type="float",
+                help=(
+                    "Granularity of scheduler in seconds, e.g. 0.1 for "
+                    "sub-second scheduling."
+                ),
+            ),
+            option(
+                "event_scheduler",
+                action="store_true",
+                help=(
+                    "sleep until the next scheduled or periodic task is due, "
+                    "rather than waking up every scheduler interval"
+                ),
             ),
             option(
                 "no_periodic",
@@ -121,6 +197,26 @@ class OptionParserHandler(object):
                 dest="periodic",
                 help="do NOT enqueue periodic tasks",
             ),
+            option(
+                ("z", "schedule-chunk-size"),
+                type="int",
+                dest="schedule_chunk_size",
+                help=(
+                    "maximum number of due tasks moved from the schedule to "
+                    "the queue at a time (default=1000)"
+                ),
+            ),
+            option(
+                ("B", "schedule-chunk-budget"),
+                type="float",
+                dest="schedule_chunk_budget",
+                metavar="SECONDS",
+                help=(
+                    "time allowed for moving a chunk of due tasks to the "
+                    "queue, above which the chunk size is reduced "
+                    "(default=0.1)"
+                ),
+            ),
         )
 
     def get_logging_options(self):
@@ -193,16 +289,34 @@ class ConsumerConfig(namedtuple("_ConsumerConfig", config_keys)):
     def validate(self):
         if self.backoff < 1:
             raise ValueError("The backoff must be greater than 1.")
-        if not (0 < self.scheduler_interval <= 60):
+        if self.prefetch < 1:
+            raise ValueError("The prefetch must be at least 1.")
+        if self.concurrency < 1:
+            raise ValueError("The concurrency must be at least 1.")
+        if self.max_tasks_per_child is not None and self.max_tasks_per_child < 1:
+            raise ValueError("The max tasks per child must be at least 1.")
+        if self.max_memory_per_child is not None and self.max_memory_per_child <= 0:
+            raise ValueError("The max memory per child must be greater than 0.")
+        min_workers = self.workers if self.min_workers is None else self.min_workers
+        max_workers = self.workers if self.max_workers is None else self.max_workers
+        if min_workers < 1:
+            raise ValueError("The min workers must be at least 1.")
+        if min_workers > max_workers:
+            raise ValueError("The min workers must not exceed the max workers.")
+        if not (MIN_SCHEDULER_INTERVAL <= self.scheduler_interval <= 60):
             raise ValueError(
                 "The scheduler must run at least once per "
-                "minute, and at most once per second (1-60)."
+                "minute, and at most every 10ms (0.01-60)."
             )
-        if 60 % self.scheduler_interval != 0:
+        if not is_factor_of_minute(self.scheduler_interval):
             raise ValueError(
-                "The scheduler interval must be a factor of 60: "
-                "1, 2, 3, 4, 5, 6, 10, 12, 15, 20, 30, or 60"
+                "The scheduler interval must be a factor of 60, e.g. "
+                "0.1, 0.5, 1, 2, 3, 4, 5, 6, 10, 12, 15, 20, 30, or 60"
             )
+        if self.schedule_chunk_size < 1:
+            raise ValueError("The schedule chunk size must be at least 1.")
+        if self.schedule_chunk_budget <= 0:
+            raise ValueError("The schedule chunk budget must be greater than 0.")
 
     @property
     def loglevel(self):
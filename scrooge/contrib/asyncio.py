@@ -1,6 +1,40 @@
 import asyncio
+import copy
+import inspect
+import logging
+import re
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+try:
+    from redis.asyncio import ConnectionPool as AsyncConnectionPool
+    from redis.asyncio import Redis as AsyncRedis
+    from redis.exceptions import ConnectionError
+    from redis.exceptions import TimeoutError as RedisTimeoutError
+except ImportError:
+    AsyncConnectionPool = AsyncRedis = ConnectionError = RedisTimeoutError = None
+
+from scrooge import signals as S
+from scrooge.api import Task, TaskWrapper
 from scrooge.constants import EmptyData
+from scrooge.consumer import Worker
+from scrooge.exceptions import (
+    ConfigurationError,
+    ScroogeException,
+    TaskException,
+    TaskTimeout,
+)
+from scrooge.storage import (
+    RESULT_POP_LUA,
+    RedisExpireStorage,
+    RedisPriorityQueue,
+    RedisStorage,
+    RedisStreamStorage,
+)
+from scrooge.utils import ClaimCheck, Error, decode, normalize_time, time_clock
+
+logger = logging.getLogger("scrooge")
 
 
 async def aget_result(res, backoff=1.15, max_delay=1.0, preserve=False):
@@ -64,3 +98,719 @@ async def aget_result_group(rg, *args, **kwargs):
         results = await aget_result_group(rg)
     """
     return await asyncio.gather(*[aget_result(r, *args, **kwargs) for r in rg])
+
+
+async def aexecute(scrooge, task, timestamp=None):
+    """
+    Execute a task, awaiting the return value if the task function is a
+    coroutine function. Async counterpart to :py:meth:`Scrooge.execute`.
+
+    NOTE: the storage operations performed before and after running the task
+    (checking revocation, storing the result, etc) are normal blocking calls,
+    as are tasks that are not coroutine functions. The task's timeout, if
+    any, is only enforced for coroutines, which are cancelled when it
+    expires.
+    """
+    if timestamp is None:
+        timestamp = scrooge._get_timestamp()
+
+    if not scrooge._can_execute(task, timestamp):
+        return
+    if not scrooge._prepare_execute(task):
+        return
+
+    start = time_clock()
+    exception = None
+    retry_eta = None
+    task_value = EmptyData
+
+    try:
+        scrooge._tasks_in_flight.add(task)
+        try:
+            task_value = task.execute()
+            if inspect.isawaitable(task_value):
+                if task.timeout:
+                    task_value = await _await_timeout(task_value, task.timeout)
+                else:
+                    task_value = await task_value
+        finally:
+            scrooge._tasks_in_flight.remove(task)
+            duration = time_clock() - start
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        logger.warning("Task %s was interrupted and did not finish.", task.id)
+        scrooge._emit(S.SIGNAL_INTERRUPTED, task)
+        raise
+    except (Exception, TaskTimeout) as exc:
+        exception, retry_eta = scrooge._handle_exception(task, exc)
+    else:
+        logger.info("%s executed in %0.3fs", task, duration)
+
+    return scrooge._finish_execute(task, task_value, exception, retry_eta)
+
+
+async def _await_timeout(awaitable, timeout):
+    future = asyncio.ensure_future(awaitable)
+    try:
+        done, _ = await asyncio.wait([future], timeout=timeout)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    if not done:
+        future.cancel()
+        raise TaskTimeout()
+    return future.result()
+
+
+class AsyncioWorker(Worker):
+    """
+    Worker that runs tasks concurrently on an asyncio event loop.
+
+    Tasks defined with ``async def`` are awaited, so up to ``concurrency``
+    of them run at the same time. Other tasks run to completion on the event
+    loop, blocking it while they do. Reading from the queue is done in a
+    separate thread so the tasks in flight are not held up by a blocking
+    read.
+
+    Example usage:
+
+        @scrooge.task()
+        async def fetch(url):
+            async with session.get(url) as response:
+                return response.status
+
+        $ scrooge_consumer.py app.scrooge -k asyncio -a 500
+    """
+
+    # Seconds to wait for a task to finish when all slots are taken, before
+    # returning to the consumer to check whether we should stop.
+    saturated_wait = 1.0
+
+    def __init__(
+        self,
+        scrooge,
+        default_delay,
+        max_delay,
+        backoff,
+        prefetch=1,
+        concurrency=100,
+        max_tasks=None,
+        max_memory=None,
+        busy=None,
+        retire_flag=None,
+    ):
+        self.concurrency = concurrency
+        self._event_loop = None
+        self._executor = None
+        self._pending = set()
+        self._tasks_started = 0
+        super(AsyncioWorker, self).__init__(
+            scrooge,
+            default_delay,
+            max_delay,
+            backoff,
+            prefetch,
+            max_tasks,
+            max_memory,
+            busy=busy,
+            retire_flag=retire_flag,
+        )
+
+    def initialize(self):
+        self._event_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._event_loop)
+        self._executor = ThreadPoolExecutor(1)
+        super(AsyncioWorker, self).initialize()
+
+    def shutdown(self):
+        if self._pending:
+            self._logger.info(
+                "Waiting for %d running task(s) to finish", len(self._pending)
+            )
+            self._event_loop.run_until_complete(asyncio.wait(self._pending))
+        super(AsyncioWorker, self).shutdown()
+        self._executor.shutdown()
+        self._event_loop.close()
+
+    def loop(self, now=None):
+        self._event_loop.run_until_complete(self.aloop(now))
+
+    async def aloop(self, now=None):
+        if self.check_retired():
+            return
+
+        available = self.concurrency - len(self._pending)
+        if self.max_tasks:
+            # Do not start more tasks than the worker has left to execute.
+            available = min(available, self.max_tasks - self._tasks_started)
+        if available <= 0:
+            if self._pending:
+                await asyncio.wait(
+                    self._pending,
+                    timeout=self.saturated_wait,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+            return
+
+        try:
+            tasks = await self._event_loop.run_in_executor(
+                self._executor, self.dequeue_available, available
+            )
+        except Exception:
+            self._logger.exception("Error reading from queue")
+            await self.asleep()
+            return
+
+        if tasks:
+            self.delay = self.default_delay
+            self._tasks_started += len(tasks)
+            for task in tasks:
+                future = self._event_loop.create_task(self.run_task(task, now))
+                self._pending.add(future)
+                future.add_done_callback(self._task_done)
+            self._update_busy()
+            # Yield to the event loop so the new tasks can start.
+            await asyncio.sleep(0)
+        elif not self.scrooge.storage.blocking:
+            await self.asleep()
+
+    def _task_done(self, future):
+        self._pending.discard(future)
+        self._update_busy()
+
+    def _update_busy(self):
+        if self.busy is not None:
+            self.busy.value = len(self._pending) / float(self.concurrency)
+
+    def dequeue_available(self, available):
+        n = min(self.prefetch, available)
+        if n <= 1:
+            task = self.scrooge.dequeue()
+            return [task] if task is not None else []
+        return self.scrooge.dequeue_many(n)
+
+    async def run_task(self, task, now=None):
+        try:
+            await aexecute(self.scrooge, task, now)
+        except Exception:
+            self._logger.exception(
+                "Unhandled error during execution of task %s.", task.id
+            )
+        self.task_executed()
+
+    async def asleep(self):
+        if self.delay > self.max_delay:
+            self.delay = self.max_delay
+
+        await asyncio.sleep(self.delay)
+        self.delay *= self.backoff
+
+
+class AsyncRedisStorage(object):
+    """
+    Asynchronous counterpart to :py:class:`RedisStorage`, implementing the
+    operations needed by :py:class:`AsyncScrooge` using ``redis.asyncio``. The
+    same keys are used, so tasks enqueued using this storage are processed by
+    a consumer using ``RedisStorage``.
+    """
+
+    priority = False
+    redis_client = AsyncRedis
+    result_notifications = True
+
+    def __init__(self, name="scrooge", connection_pool=None, url=None, **params):
+        if AsyncRedis is None:
+            raise ConfigurationError(
+                '"redis" python module with asyncio support not found, '
+                'cannot use AsyncRedisStorage. Run "pip install redis>=4.2" '
+                "to install."
+            )
+
+        if sum(1 for p in (url, connection_pool, params) if p) > 1:
+            raise ConfigurationError(
+                "The connection configuration is over-determined. "
+                "Please specify only one of the following: "
+                '"url", "connection_pool", or "connection_params"'
+            )
+
+        if url:
+            connection_pool = AsyncConnectionPool.from_url(url)
+        elif connection_pool is None:
+            connection_pool = AsyncConnectionPool(**params)
+
+        self.pool = connection_pool
+        self.conn = self.redis_client(connection_pool=connection_pool)
+        self._pop_result = self.conn.register_script(RESULT_POP_LUA)
+
+        self.name = re.sub("[^a-z0-9]", "", name)
+        self.queue_key = "scrooge.redis.%s" % self.name
+        self.schedule_key = "scrooge.schedule.%s" % self.name
+        self.result_key = "scrooge.results.%s" % self.name
+
+    def create_blob_storage(self):
+        # Counterpart to RedisStorage.create_blob_storage().
+        storage = copy.copy(self)
+        storage.result_key = "scrooge.blobs.%s" % self.name
+        storage.result_notifications = False
+        return storage
+
+    async def close(self):
+        await self.pool.disconnect()
+
+    async def enqueue(self, data, priority=None):
+        if priority:
+            raise NotImplementedError(
+                "Task priorities are not supported by this storage."
+            )
+        await self.conn.lpush(self.queue_key, data)
+
+    async def enqueue_many(self, items):
+        if any(priority for _, priority in items):
+            raise NotImplementedError(
+                "Task priorities are not supported by this storage."
+            )
+        if items:
+            await self.conn.lpush(self.queue_key, *[data for data, _ in items])
+
+    async def queue_size(self):
+        return await self.conn.llen(self.queue_key)
+
+    async def schedule_size(self):
+        return await self.conn.zcard(self.schedule_key)
+
+    def notify_key(self, key):
+        return "scrooge.notify.%s.%s" % (self.name, decode(key))
+
+    async def put_data(self, key, value):
+        await self.conn.hset(self.result_key, key, value)
+
+    async def wait_for_results(self, keys, timeout):
+        notify_keys = dict((self.notify_key(key), key) for key in keys)
+        try:
+            # A timeout of zero would block indefinitely.
+            timeout = max(timeout, 0.01)
+            res = await self.conn.blpop(list(notify_keys), timeout=timeout)
+        except (ConnectionError, RedisTimeoutError):
+            return None
+        if res is not None:
+            return notify_keys[decode(res[0])]
+
+    async def peek_data(self, key):
+        val = await self.conn.hget(self.result_key, key)
+        return EmptyData if val is None else val
+
+    async def pop_data(self, key):
+        val = await self._pop_result(keys=[self.result_key], args=[key])
+        return EmptyData if val is None else val
+
+    async def peek_many(self, keys):
+        if not keys:
+            return []
+        values = await self.conn.hmget(self.result_key, keys)
+        return [EmptyData if val is None else val for val in values]
+
+    async def pop_many(self, keys):
+        if not keys:
+            return []
+        async with self.conn.pipeline() as pipe:
+            pipe.hmget(self.result_key, keys)
+            pipe.hdel(self.result_key, *keys)
+            values, _ = await pipe.execute()
+        return [EmptyData if val is None else val for val in values]
+
+    async def delete_data(self, key):
+        return bool(await self.conn.hdel(self.result_key, key))
+
+
+class AsyncPriorityRedisStorage(AsyncRedisStorage):
+    """
+    Asynchronous counterpart to :py:class:`PriorityRedisStorage`.
+    """
+
+    priority = True
+
+    async def enqueue(self, data, priority=None):
+        priority = 0 if priority is None else -priority
+        # Prefix the message with an encoded timestamp, see RedisPriorityQueue.
+        prefix = struct.pack(">Q", int(time.time() * 1e6))
+        await self.conn.zadd(self.queue_key, {prefix + data: priority})
+
+    async def enqueue_many(self, items):
+        if not items:
+            return
+        ts = int(time.time() * 1e6)
+        mapping = {}
+        for i, (data, priority) in enumerate(items):
+            prefix = struct.pack(">Q", ts + i)
+            mapping[prefix + data] = 0 if priority is None else -priority
+        await self.conn.zadd(self.queue_key, mapping)
+
+    async def queue_size(self):
+        return await self.conn.zcard(self.queue_key)
+
+
+class AsyncScrooge(object):
+    """
+    Enqueue tasks and read their results without blocking the event loop.
+
+    Wraps a :py:class:`Scrooge` instance, whose registry and serializer are
+    used to create the messages, so that tasks are processed by the usual
+    consumer. Unless a storage is given, an :py:class:`AsyncRedisStorage` is
+    created using the connection parameters of the Scrooge instance.
+
+    Example usage:
+
+        scrooge = RedisScrooge("my-app")
+        ascrooge = AsyncScrooge(scrooge)
+
+        @scrooge.task()
+        def add(a, b):
+            return a + b
+
+        async def handler(request):
+            result = await ascrooge.enqueue(add.s(1, 2))
+            return await result.get(blocking=True, timeout=5)
+
+    NOTE: task arguments larger than the ``blob_threshold`` of the Scrooge
+    instance are written using its normal, blocking, blob storage. Large
+    results are read without blocking, unless a ``blob_storage`` was given
+    to the Scrooge instance.
+    """
+
+    def __init__(self, scrooge, storage=None, **storage_kwargs):
+        self.scrooge = scrooge
+        if storage is None:
+            storage = self.create_storage(**storage_kwargs)
+        self.storage = storage
+        self.blob_storage = self.create_blob_storage()
+
+    def create_storage(self, **storage_kwargs):
+        storage = self.scrooge.storage
+        if isinstance(storage, (RedisExpireStorage, RedisStreamStorage)):
+            raise ConfigurationError(
+                "%s is not supported by AsyncScrooge." % type(storage).__name__
+            )
+        if isinstance(storage, RedisStorage) and not storage_kwargs:
+            storage_kwargs = dict(storage.pool.connection_kwargs)
+        if isinstance(storage, RedisPriorityQueue):
+            storage_class = AsyncPriorityRedisStorage
+        else:
+            storage_class = AsyncRedisStorage
+        return storage_class(self.scrooge.name, **storage_kwargs)
+
+    def create_blob_storage(self):
+        # Blobs can only be read without blocking when they are kept in the
+        # default blob storage of a RedisStorage, otherwise return None and
+        # fall back to the Scrooge instance's blob storage.
+        if self.scrooge._blob_storage is not None:
+            return
+        if isinstance(self.scrooge.storage, RedisStorage) and isinstance(
+            self.storage, AsyncRedisStorage
+        ):
+            return self.storage.create_blob_storage()
+
+    async def close(self):
+        await self.storage.close()
+
+    async def enqueue(self, task):
+        if task.expires:
+            task.resolve_expires(self.scrooge.utc)
+        data = self.scrooge.serialize_task(task)
+        await self.storage.enqueue(data, task.priority)
+        return self._task_result(task)
+
+    async def enqueue_many(self, tasks):
+        items = []
+        for task in tasks:
+            if task.expires:
+                task.resolve_expires(self.scrooge.utc)
+            items.append((self.scrooge.serialize_task(task), task.priority))
+
+        await self.storage.enqueue_many(items)
+        return [self._task_result(task) for task in tasks]
+
+    async def map(self, task_wrapper, it, batch_size=None):
+        """
+        Enqueue a call to the task for each item of ``it``, like
+        :py:meth:`TaskWrapper.map`, returning an :py:class:`AsyncResultGroup`.
+        """
+        tasks = task_wrapper._apply(it)
+        if not batch_size:
+            batch_size = max(len(tasks), 1)
+        results = []
+        for i in range(0, len(tasks), batch_size):
+            results.extend(await self.enqueue_many(tasks[i : i + batch_size]))
+        return AsyncResultGroup(results)
+
+    def _task_result(self, task):
+        if not self.scrooge.results:
+            return
+
+        if task.on_complete:
+            current = task
+            results = []
+            while current is not None:
+                results.append(AsyncResult(self, current))
+                current = current.on_complete
+            return AsyncResultGroup(results)
+        else:
+            return AsyncResult(self, task)
+
+    async def put(self, key, data):
+        return await self.storage.put_data(key, self.scrooge.serializer.serialize(data))
+
+    async def get_raw(self, key, peek=False):
+        if peek:
+            return await self.storage.peek_data(key)
+        else:
+            return await self.storage.pop_data(key)
+
+    async def get_raw_many(self, keys, peek=False):
+        if peek:
+            return await self.storage.peek_many(keys)
+        else:
+            return await self.storage.pop_many(keys)
+
+    async def _get_blob(self, claim, peek=False):
+        if self.blob_storage is None:
+            return self.scrooge._get_blob(claim, peek)
+        if peek:
+            data = await self.blob_storage.peek_data(claim.key)
+        else:
+            data = await self.blob_storage.pop_data(claim.key)
+        if data is EmptyData:
+            raise ScroogeException("blob %s not found" % claim.key)
+        return self.scrooge.serializer.deserialize(data)
+
+    async def _deserialize(self, data, peek=False):
+        value = self.scrooge.serializer.deserialize(data)
+        if isinstance(value, ClaimCheck):
+            value = await self._get_blob(value, peek)
+        return value
+
+    async def get(self, key, peek=False):
+        data = await self.get_raw(key, peek)
+        if data is not EmptyData:
+            return await self._deserialize(data, peek)
+
+    async def delete(self, key):
+        return await self.storage.delete_data(key)
+
+    async def revoke_all(self, task_class, revoke_until=None, revoke_once=False):
+        if isinstance(task_class, TaskWrapper):
+            task_class = task_class.task_class
+        if revoke_until is not None:
+            revoke_until = normalize_time(revoke_until, utc=self.scrooge.utc)
+        key = self.scrooge._task_key(task_class, "rt")
+        await self.put(key, (revoke_until, revoke_once))
+
+    async def restore_all(self, task_class):
+        if isinstance(task_class, TaskWrapper):
+            task_class = task_class.task_class
+        return await self.delete(self.scrooge._task_key(task_class, "rt"))
+
+    async def revoke(self, task, revoke_until=None, revoke_once=False):
+        if revoke_until is not None:
+            revoke_until = normalize_time(revoke_until, utc=self.scrooge.utc)
+        await self.put(task.revoke_id, (revoke_until, revoke_once))
+
+    async def restore(self, task):
+        return await self.delete(task.revoke_id)
+
+    async def revoke_by_id(self, id, revoke_until=None, revoke_once=False):
+        return await self.revoke(Task(id=id), revoke_until, revoke_once)
+
+    async def restore_by_id(self, id):
+        return await self.restore(Task(id=id))
+
+    async def pending_count(self):
+        return await self.storage.queue_size()
+
+    async def scheduled_count(self):
+        return await self.storage.schedule_size()
+
+    async def result(
+        self,
+        id,
+        blocking=False,
+        timeout=None,
+        backoff=1.15,
+        max_delay=1.0,
+        revoke_on_timeout=False,
+        preserve=False,
+    ):
+        task_result = AsyncResult(self, Task(id=id))
+        return await task_result.get(
+            blocking=blocking,
+            timeout=timeout,
+            backoff=backoff,
+            max_delay=max_delay,
+            revoke_on_timeout=revoke_on_timeout,
+            preserve=preserve,
+        )
+
+
+class AsyncResult(object):
+    """
+    Asynchronous counterpart to :py:class:`Result`, returned when a task is
+    enqueued using :py:class:`AsyncScrooge`.
+    """
+
+    def __init__(self, ascrooge, task):
+        self.ascrooge = ascrooge
+        self.task = task
+        self.revoke_id = task.revoke_id
+        self._result = EmptyData
+
+    def __repr__(self):
+        return "<AsyncResult: task %s>" % self.id
+
+    @property
+    def id(self):
+        return self.task.id
+
+    async def _get(self, preserve=False):
+        if self._result is EmptyData:
+            data = await self.ascrooge.get_raw(self.id, peek=preserve)
+            await self._set_raw(data, preserve)
+        return self._result
+
+    async def _set_raw(self, res, preserve=False):
+        if res is not EmptyData:
+            self._result = await self.ascrooge._deserialize(res, preserve)
+
+    async def get_raw_result(
+        self,
+        blocking=False,
+        timeout=None,
+        backoff=1.15,
+        max_delay=1.0,
+        revoke_on_timeout=False,
+        preserve=False,
+    ):
+        if not blocking:
+            res = await self._get(preserve)
+            if res is not EmptyData:
+                return res
+        else:
+            start = time_clock()
+            delay = 0.1
+            storage = self.ascrooge.storage
+            while self._result is EmptyData:
+                elapsed = time_clock() - start
+                if timeout and elapsed >= timeout:
+                    if revoke_on_timeout:
+                        await self.revoke()
+                    raise ScroogeException("timed out waiting for result")
+                if delay > max_delay:
+                    delay = max_delay
+                if await self._get(preserve) is EmptyData:
+                    if storage.result_notifications:
+                        wait = max_delay
+                        if timeout:
+                            wait = min(wait, timeout - elapsed)
+                        await storage.wait_for_results([self.id], wait)
+                    else:
+                        await asyncio.sleep(delay)
+                        delay *= backoff
+
+            return self._result
+
+    async def get(
+        self,
+        blocking=False,
+        timeout=None,
+        backoff=1.15,
+        max_delay=1.0,
+        revoke_on_timeout=False,
+        preserve=False,
+    ):
+        result = await self.get_raw_result(
+            blocking, timeout, backoff, max_delay, revoke_on_timeout, preserve
+        )
+        if result is not None and isinstance(result, Error):
+            raise TaskException(result.metadata)
+        return result
+
+    async def revoke(self, revoke_once=True):
+        await self.ascrooge.revoke(self.task, revoke_once=revoke_once)
+
+    async def restore(self):
+        return await self.ascrooge.restore(self.task)
+
+    def reset(self):
+        self._result = EmptyData
+
+
+class AsyncResultGroup(object):
+    """
+    Asynchronous counterpart to :py:class:`ResultGroup`. Pending results are
+    read using a single operation, and waiting callers are woken up as soon
+    as any of them is ready.
+    """
+
+    def __init__(self, results):
+        self._results = results
+
+    async def _fetch(self, results, preserve=False):
+        pending = [r for r in results if r._result is EmptyData]
+        if pending:
+            ascrooge = pending[0].ascrooge
+            values = await ascrooge.get_raw_many([r.id for r in pending], peek=preserve)
+            for result, value in zip(pending, values):
+                await result._set_raw(value, preserve)
+        return [r for r in pending if r._result is EmptyData]
+
+    async def _wait(self, pending, delay, max_delay, remaining=None):
+        storage = pending[0].ascrooge.storage
+        notify = storage.result_notifications
+        wait = max_delay if notify else min(delay, max_delay)
+        if remaining is not None:
+            wait = min(wait, remaining)
+        if notify:
+            await storage.wait_for_results([r.id for r in pending], wait)
+        else:
+            await asyncio.sleep(wait)
+
+    async def get(
+        self,
+        blocking=False,
+        timeout=None,
+        backoff=1.15,
+        max_delay=1.0,
+        revoke_on_timeout=False,
+        preserve=False,
+    ):
+        pending = await self._fetch(self._results, preserve)
+        if blocking:
+            start = time_clock()
+            delay = 0.1
+            while pending:
+                if timeout:
+                    remaining = timeout - (time_clock() - start)
+                    if remaining <= 0:
+                        if revoke_on_timeout:
+                            for result in pending:
+                                await result.revoke()
+                        raise ScroogeException("timed out waiting for result")
+                    await self._wait(pending, delay, max_delay, remaining)
+                else:
+                    await self._wait(pending, delay, max_delay)
+                delay *= backoff
+                pending = await self._fetch(pending, preserve)
+
+        accum = []
+        for result in self._results:
+            value = None if result._result is EmptyData else result._result
+            if isinstance(value, Error):
+                raise TaskException(value.metadata)
+            accum.append(value)
+        return accum
+
+    def __getitem__(self, idx):
+        return self._results[idx]
+
+    def __iter__(self):
+        return iter(self._results)
+
+    def __len__(self):
+        return len(self._results)
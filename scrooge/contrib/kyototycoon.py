@@ -24,6 +24,7 @@ class KyotoTycoonStorage(BaseStorage):
         client=None,
         blocking=False,
         result_expire_time=None,
+        high_resolution=False,
     ):
         super(KyotoTycoonStorage, self).__init__(name)
         if client is None:
@@ -34,6 +35,12 @@ class KyotoTycoonStorage(BaseStorage):
         self.blocking = blocking
         self.expire_time = result_expire_time
 
+        # Schedule scores are integers, by default in seconds. When
+        # high_resolution is enabled they are in milliseconds instead.
+        # NOTE: changing this for an existing schedule is not supported, as
+        # tasks already in the schedule would be read at the wrong time.
+        self.high_resolution = high_resolution
+
         self.kt = client
         self._db = db
         self._queue_db = queue_db if queue_db is not None else db
@@ -63,13 +70,16 @@ class KyotoTycoonStorage(BaseStorage):
         return self.q.clear()
 
     def convert_ts(self, ts):
+        if self.high_resolution:
+            ts = time.mktime(ts.timetuple()) + (ts.microsecond * 1e-6)
+            return int(ts * 1000)
         return int(time.mktime(ts.timetuple()))
 
     def add_to_schedule(self, data, ts, utc):
         self.s.add(data, self.convert_ts(ts))
 
-    def read_schedule(self, ts):
-        return self.s.read(self.convert_ts(ts))
+    def read_schedule(self, ts, limit=None):
+        return self.s.read(self.convert_ts(ts), limit)
 
     def schedule_size(self):
         return len(self.s)
@@ -98,6 +108,19 @@ class KyotoTycoonStorage(BaseStorage):
         result = self.kt.seize(self.prefix_key(key), self._db)
         return EmptyData if result is None else result
 
+    def peek_many(self, keys):
+        pkeys = [self.prefix_key(key) for key in keys]
+        result = self.kt.get_bulk(pkeys, self._db, decode_values=False)
+        return [result.get(pkey, EmptyData) for pkey in pkeys]
+
+    def pop_many(self, keys):
+        if self.expire_time is not None:
+            return self.peek_many(keys)
+
+        values = self.peek_many(keys)
+        self.kt.remove_bulk([self.prefix_key(key) for key in keys], self._db)
+        return values
+
     def delete_data(self, key):
         return self.kt.seize(self.prefix_key(key), self._db) is not None
 
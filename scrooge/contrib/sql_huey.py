@@ -94,6 +94,16 @@ class SqlStorage(BaseStorage):
         self.check_conn()
         self.Task.create(queue=self.name, data=data, priority=priority or 0)
 
+    def enqueue_many(self, items):
+        self.check_conn()
+        rows = [
+            {"queue": self.name, "data": data, "priority": priority or 0}
+            for data, priority in items
+        ]
+        if rows:
+            with self.database.atomic():
+                self.Task.insert_many(rows).execute()
+
     def dequeue(self):
         self.check_conn()
         query = (
@@ -114,6 +124,26 @@ class SqlStorage(BaseStorage):
             if nrows == 1:
                 return task.data
 
+    def dequeue_many(self, n):
+        self.check_conn()
+        query = (
+            self.tasks(self.Task.id, self.Task.data)
+            .order_by(self.Task.priority.desc(), self.Task.id)
+            .limit(n)
+            .tuples()
+        )
+        if self.database.for_update:
+            query = query.for_update()
+
+        with self.database.atomic():
+            results = list(query)
+            if not results:
+                return []
+
+            id_list, data = zip(*results)
+            self.Task.delete().where(self.Task.id.in_(id_list)).execute()
+            return list(data)
+
     def queue_size(self):
         return self.tasks().count()
 
@@ -132,13 +162,16 @@ class SqlStorage(BaseStorage):
         self.check_conn()
         self.Schedule.create(queue=self.name, data=data, timestamp=timestamp)
 
-    def read_schedule(self, timestamp):
+    def read_schedule(self, timestamp, limit=None):
         self.check_conn()
         query = (
             self.schedule(self.Schedule.id, self.Schedule.data)
             .where(self.Schedule.timestamp <= timestamp)
+            .order_by(self.Schedule.timestamp)
             .tuples()
         )
+        if limit is not None:
+            query = query.limit(limit)
         if self.database.for_update:
             query = query.for_update()
 
@@ -152,6 +185,10 @@ class SqlStorage(BaseStorage):
 
             return list(data)
 
+    def peek_schedule(self):
+        self.check_conn()
+        return self.schedule(fn.MIN(self.Schedule.timestamp)).scalar()
+
     def schedule_size(self):
         return self.schedule().count()
 
@@ -204,6 +241,30 @@ class SqlStorage(BaseStorage):
                 )
                 return kv.value if dq.execute() == 1 else EmptyData
 
+    def peek_many(self, keys):
+        self.check_conn()
+        query = self.kv(self.KV.key, self.KV.value).where(self.KV.key.in_(keys))
+        values = {kv.key: kv.value for kv in query}
+        return [values.get(key, EmptyData) for key in keys]
+
+    def pop_many(self, keys):
+        self.check_conn()
+        query = self.kv().where(self.KV.key.in_(keys))
+        if self.database.for_update:
+            query = query.for_update()
+
+        with self.database.atomic():
+            values = {kv.key: kv.value for kv in query}
+            if values:
+                (
+                    self.KV.delete()
+                    .where(
+                        (self.KV.queue == self.name) & (self.KV.key.in_(list(values)))
+                    )
+                    .execute()
+                )
+        return [values.get(key, EmptyData) for key in keys]
+
     def has_data_for_key(self, key):
         self.check_conn()
         return self.kv().where(self.KV.key == key).exists()
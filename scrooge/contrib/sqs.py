@@ -111,7 +111,7 @@ class SqsStorage(BaseStorage):
             DelaySeconds=int(delay_seconds),
         )
 
-    def read_schedule(self, ts):
+    def read_schedule(self, ts, limit=None):
         return []
 
     def put_data(self, key, value, is_result=False):
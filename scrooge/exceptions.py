@@ -22,6 +22,12 @@ class RetryTask(Exception):
         super(RetryTask, self).__init__(msg, *args, **kwargs)
 
 
+class TaskTimeout(BaseException):
+    # Derives from BaseException, like KeyboardInterrupt, so that it is not
+    # caught by "except Exception" blocks in the task being interrupted.
+    pass
+
+
 class TaskException(Exception):
     def __init__(self, metadata=None, *args):
         self.metadata = metadata or {}
@@ -6,14 +6,31 @@ try:
     import zlib
 except ImportError:
     zlib = None
+import datetime
 import hashlib
 import hmac
 import logging
 import pickle
+import struct
 import sys
+import threading
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.block as lz4_block
+except ImportError:
+    lz4_block = None
 
 from scrooge.exceptions import ConfigurationError
-from scrooge.utils import encode
+from scrooge.registry import Message
+from scrooge.utils import encode, string_type
 
 logger = logging.getLogger("scrooge.serializer")
 
@@ -52,18 +69,185 @@ else:
         return data and data[0] == 0x1F or data[0] == 0x78
 
 
+class Codec(object):
+    """
+    Compression codec used by the :py:class:`Serializer`. Data compressed by
+    a codec is prefixed with the codec's header byte. The header bytes do not
+    overlap with the first byte of pickled or msgpack-serialized data, or with
+    the legacy gzip and zlib formats.
+    """
+
+    name = None
+    header = None
+    module = None
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compress(self, data):
+        raise NotImplementedError
+
+    def decompress(self, data):
+        raise NotImplementedError
+
+
+class GzipCodec(Codec):
+    name = "gzip"
+    header = b"\xf1"
+    module = gzip
+
+    def compress(self, data):
+        return gzip_compress(data, self.level)
+
+    def decompress(self, data):
+        return gzip_decompress(data)
+
+
+class ZlibCodec(Codec):
+    name = "zlib"
+    header = b"\xf2"
+    module = zlib
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class ZstdCodec(Codec):
+    name = "zstd"
+    header = b"\xf3"
+    module = zstandard
+
+    def __init__(self, level=6, dictionary=None):
+        super(ZstdCodec, self).__init__(level)
+        if dictionary is not None and zstandard is not None:
+            dictionary = zstandard.ZstdCompressionDict(dictionary)
+        self.dictionary = dictionary
+        self._local = threading.local()
+
+    # Compressor and decompressor instances cannot be shared between threads,
+    # and are relatively expensive to create when using a dictionary.
+    def _compressor(self):
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = zstandard.ZstdCompressor(
+                level=self.level, dict_data=self.dictionary
+            )
+            self._local.compressor = compressor
+        return compressor
+
+    def _decompressor(self):
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = zstandard.ZstdDecompressor(dict_data=self.dictionary)
+            self._local.decompressor = decompressor
+        return decompressor
+
+    def compress(self, data):
+        return self._compressor().compress(data)
+
+    def decompress(self, data):
+        return self._decompressor().decompress(data)
+
+
+class Lz4Codec(Codec):
+    name = "lz4"
+    header = b"\xf4"
+    module = lz4_block
+
+    def compress(self, data):
+        return lz4_block.compress(data)
+
+    def decompress(self, data):
+        return lz4_block.decompress(data)
+
+
+CODECS = dict(
+    (codec.name, codec) for codec in (GzipCodec, ZlibCodec, ZstdCodec, Lz4Codec)
+)
+CODEC_HEADERS = dict((codec.header, codec) for codec in CODECS.values())
+
+# Header indicating data which was not compressed, when using a codec.
+HEADER_UNCOMPRESSED = b"\xf0"
+
+# Header indicating pickled data followed by out-of-band buffers.
+HEADER_OOB = b"\xf8"
+
+
+def train_zstd_dictionary(samples, dict_size=16384):
+    """
+    Train a zstd compression dictionary from a list of sample payloads, e.g.
+    serialized task messages. The dictionary can be passed to the
+    :py:class:`Serializer` using the ``zstd_dict`` parameter, and is required
+    to read data compressed using it.
+
+    :param list samples: list of ``bytes`` to train the dictionary on.
+    :param int dict_size: maximum size of the dictionary in bytes.
+    :return: dictionary data as ``bytes``.
+    """
+    if zstandard is None:
+        raise ConfigurationError(
+            '"zstandard" python module not found, cannot train dictionary.'
+        )
+    return zstandard.train_dictionary(dict_size, samples).as_bytes()
+
+
 class Serializer(object):
+    """
+    Serializer for task messages and result data, using pickle.
+
+    :param compression: ``True`` to compress data using gzip (or zlib, if
+        ``use_zlib`` is set), or the name of a codec: "gzip", "zlib", "zstd"
+        or "lz4". Data compressed using a named codec is prefixed with a
+        header byte identifying the codec.
+    :param int compression_level: compression level.
+    :param bool use_zlib: use zlib instead of gzip when ``compression=True``.
+    :param int pickle_protocol: pickle protocol to use.
+    :param int min_compress_size: when using a named codec, data smaller than
+        the given number of bytes is not compressed.
+    :param bytes zstd_dict: dictionary for the zstd codec, see
+        :py:func:`train_zstd_dictionary`.
+    :param int oob_threshold: buffers (e.g. ``bytearray`` or numpy arrays) of
+        at least the given number of bytes are pickled out-of-band, using
+        pickle protocol 5, and appended to the pickled data as separate
+        frames. When deserializing, they are not copied out of the data.
+        Serializing still copies each buffer once, as storages expect a
+        single bytestring, so only the read side is zero-copy.
+    """
+
     def __init__(
         self,
         compression=False,
         compression_level=6,
         use_zlib=False,
         pickle_protocol=pickle.HIGHEST_PROTOCOL,
+        min_compress_size=0,
+        zstd_dict=None,
+        oob_threshold=None,
     ):
+        self.codec = None
+        if isinstance(compression, string_type):
+            self.codec = self._get_codec(compression, compression_level, zstd_dict)
+            compression = False
+
         self.comp = compression
         self.comp_level = compression_level
         self.use_zlib = use_zlib
         self.pickle_protocol = pickle_protocol or pickle.HIGHEST_PROTOCOL
+        self.min_compress_size = min_compress_size
+        self.zstd_dict = zstd_dict
+        self.oob_threshold = oob_threshold
+        if oob_threshold is not None:
+            if pickle.HIGHEST_PROTOCOL < 5:
+                raise ConfigurationError(
+                    "out-of-band buffers require pickle protocol 5 (Python 3.8+)."
+                )
+            self.pickle_protocol = max(self.pickle_protocol, 5)
+        self._decoders = {}
+        if self.codec is not None:
+            self._decoders[self.codec.header] = self.codec
         if self.comp:
             if self.use_zlib and zlib is None:
                 raise ConfigurationError(
@@ -74,15 +258,73 @@ class Serializer(object):
                     "gzip module required to enable " "compression."
                 )
 
+    def _get_codec(self, name, level=6, zstd_dict=None):
+        if name not in CODECS:
+            raise ConfigurationError('unrecognized compression codec "%s"' % name)
+        codec_class = CODECS[name]
+        if codec_class.module is None:
+            raise ConfigurationError(
+                'python module required by the "%s" codec not found.' % name
+            )
+        if codec_class is ZstdCodec:
+            return codec_class(level, zstd_dict)
+        return codec_class(level)
+
+    def _get_decoder(self, header):
+        if header not in self._decoders:
+            codec = CODEC_HEADERS[header]
+            self._decoders[header] = self._get_codec(
+                codec.name, self.comp_level, self.zstd_dict
+            )
+        return self._decoders[header]
+
     def _serialize(self, data):
-        return pickle.dumps(data, self.pickle_protocol)
+        if self.oob_threshold is None:
+            return pickle.dumps(data, self.pickle_protocol)
+
+        buffers = []
+
+        def buffer_callback(buf):
+            # Returning a false value pickles the buffer out-of-band.
+            if buf.raw().nbytes < self.oob_threshold:
+                return True
+            buffers.append(buf.raw())
+
+        data = pickle.dumps(data, self.pickle_protocol, buffer_callback=buffer_callback)
+        if not buffers:
+            return data
+
+        # Header, number of frames and the length of each frame, followed by
+        # the pickled data and each of the buffers. Storages expect a single
+        # bytestring, so the buffers are copied once here.
+        frames = [data] + buffers
+        lengths = [len(data)] + [buf.nbytes for buf in buffers]
+        header = HEADER_OOB + struct.pack(">I%sQ" % len(frames), len(frames), *lengths)
+        return b"".join([header] + frames)
 
     def _deserialize(self, data):
+        if data[:1] == HEADER_OOB:
+            view = memoryview(data)
+            (n,) = struct.unpack(">I", view[1:5])
+            offset = 5 + 8 * n
+            frames = []
+            for length in struct.unpack(">%sQ" % n, view[5:offset]):
+                frames.append(view[offset : offset + length])
+                offset += length
+            return pickle.loads(frames[0], buffers=frames[1:])
         return pickle.loads(data)
 
     def serialize(self, data):
         data = self._serialize(data)
-        if self.comp:
+        if self.codec is not None:
+            # Small payloads, or payloads that do not get any smaller, are
+            # stored uncompressed.
+            if len(data) >= self.min_compress_size:
+                compressed = self.codec.compress(data)
+                if len(compressed) < len(data):
+                    return self.codec.header + compressed
+            return HEADER_UNCOMPRESSED + data
+        elif self.comp:
             if self.use_zlib:
                 data = zlib.compress(data, self.comp_level)
             else:
@@ -90,7 +332,19 @@ class Serializer(object):
         return data
 
     def deserialize(self, data):
-        if self.comp:
+        header = bytes(data[:1])
+        if header == HEADER_UNCOMPRESSED:
+            return self._deserialize(data[1:])
+        elif header in CODEC_HEADERS:
+            data = self._get_decoder(header).decompress(data[1:])
+            return self._deserialize(data)
+        elif self.codec is not None:
+            # Data compressed using compression=True has no header.
+            if header == b"\x1f":
+                data = gzip_decompress(data)
+            elif header == b"\x78":
+                data = zlib.decompress(data)
+        elif self.comp:
             if not is_compressed(data):
                 logger.warning(
                     "compression enabled but message data does not "
@@ -103,6 +357,170 @@ class Serializer(object):
         return self._deserialize(data)
 
 
+# Extension types used by the MsgpackSerializer.
+EXT_PICKLE = 0
+EXT_DATETIME = 1
+EXT_TIMEDELTA = 2
+EXT_TUPLE = 3
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _to_microseconds(delta):
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+class MsgpackSerializer(Serializer):
+    """
+    Serializer that encodes task messages and result data using msgpack.
+
+    Task messages are encoded field-by-field, with the eta stored as integer
+    microseconds. Values that msgpack cannot represent are pickled. Serialized
+    data is prefixed with a format byte, so that pickled data written by the
+    default :py:class:`Serializer`, such as messages that were already
+    enqueued, can still be read.
+    """
+
+    format_value = b"\x01"
+    format_message = b"\x02"
+
+    def __init__(self, **kwargs):
+        if msgpack is None:
+            raise ConfigurationError(
+                '"msgpack" python module not found, cannot use the '
+                'msgpack serializer. Run "pip install msgpack" to install.'
+            )
+        super(MsgpackSerializer, self).__init__(**kwargs)
+        self._local = threading.local()
+
+    def _default(self, obj):
+        if type(obj) is tuple:
+            return msgpack.ExtType(EXT_TUPLE, self._pack(list(obj)))
+        elif type(obj) is datetime.datetime and obj.tzinfo is None:
+            data = struct.pack(">q", _to_microseconds(obj - EPOCH))
+            return msgpack.ExtType(EXT_DATETIME, data)
+        elif type(obj) is datetime.timedelta:
+            data = struct.pack(">q", _to_microseconds(obj))
+            return msgpack.ExtType(EXT_TIMEDELTA, data)
+        return msgpack.ExtType(EXT_PICKLE, pickle.dumps(obj, self.pickle_protocol))
+
+    def _ext_hook(self, code, data):
+        if code == EXT_TUPLE:
+            return tuple(self._unpack(data))
+        elif code == EXT_DATETIME:
+            us = struct.unpack(">q", data)[0]
+            return EPOCH + datetime.timedelta(microseconds=us)
+        elif code == EXT_TIMEDELTA:
+            return datetime.timedelta(microseconds=struct.unpack(">q", data)[0])
+        elif code == EXT_PICKLE:
+            return pickle.loads(data)
+        return msgpack.ExtType(code, data)
+
+    def _pack(self, data):
+        # Creating a Packer is relatively expensive, so each thread keeps a
+        # pool of idle Packers. A Packer cannot be used for nested values,
+        # e.g. tuples packed by _default(), while it is packing the outer
+        # value, so nested values take the next Packer from the pool.
+        try:
+            pool = self._local.packers
+        except AttributeError:
+            pool = self._local.packers = []
+        if pool:
+            packer = pool.pop()
+        else:
+            packer = msgpack.Packer(
+                default=self._default, use_bin_type=True, strict_types=True
+            )
+        try:
+            return packer.pack(data)
+        finally:
+            pool.append(packer)
+
+    def _unpack(self, data):
+        return msgpack.unpackb(
+            data, ext_hook=self._ext_hook, raw=False, strict_map_key=False
+        )
+
+    def _encode_time(self, value):
+        if value is None:
+            return None
+        elif type(value) is not datetime.datetime or value.tzinfo is not None:
+            raise ValueError("cannot encode %r as a timestamp" % (value,))
+        return _to_microseconds(value - EPOCH)
+
+    def _decode_time(self, value):
+        if value is not None:
+            return EPOCH + datetime.timedelta(microseconds=value)
+
+    def _encode_message(self, message):
+        if message is None:
+            return None
+        return [
+            message.id,
+            message.name,
+            self._encode_time(message.eta),
+            message.retries,
+            message.retry_delay,
+            message.priority,
+            None if message.args is None else list(message.args),
+            message.kwargs,
+            self._encode_message(message.on_complete),
+            self._encode_message(message.on_error),
+            message.expires,
+            self._encode_time(message.expires_resolved),
+        ]
+
+    def _decode_message(self, fields):
+        if fields is None:
+            return None
+        (
+            task_id,
+            name,
+            eta,
+            retries,
+            retry_delay,
+            priority,
+            args,
+            kwargs,
+            on_complete,
+            on_error,
+            expires,
+            expires_resolved,
+        ) = fields
+        return Message(
+            task_id,
+            name,
+            self._decode_time(eta),
+            retries,
+            retry_delay,
+            priority,
+            None if args is None else tuple(args),
+            kwargs,
+            self._decode_message(on_complete),
+            self._decode_message(on_error),
+            expires,
+            self._decode_time(expires_resolved),
+        )
+
+    def _serialize(self, data):
+        try:
+            if isinstance(data, Message):
+                return self.format_message + self._pack(self._encode_message(data))
+            return self.format_value + self._pack(data)
+        except (OverflowError, TypeError, ValueError):
+            # E.g. integers that do not fit in 64 bits, or timezone-aware
+            # timestamps. Pickle the whole value instead.
+            return super(MsgpackSerializer, self)._serialize(data)
+
+    def _deserialize(self, data):
+        fmt = data[:1]
+        if fmt == self.format_message:
+            return self._decode_message(self._unpack(data[1:]))
+        elif fmt == self.format_value:
+            return self._unpack(data[1:])
+        return super(MsgpackSerializer, self)._deserialize(data)
+
+
 def constant_time_compare(s1, s2):
     return hmac.compare_digest(s1, s2)
 
@@ -127,6 +545,8 @@ class SignedSerializer(Serializer):
         return message + self.separator + self._signature(message)
 
     def _unsign(self, signed):
+        if not isinstance(signed, bytes):
+            signed = bytes(signed)
         if self.separator not in signed:
             raise ValueError('Separator "%s" not found' % self.separator)
 
@@ -10,6 +10,7 @@ SIGNAL_RETRYING = "retrying"
 SIGNAL_REVOKED = "revoked"
 SIGNAL_SCHEDULED = "scheduled"
 SIGNAL_INTERRUPTED = "interrupted"
+SIGNAL_TIMEOUT = "timeout"
 
 
 class Signal(object):
@@ -1,12 +1,17 @@
 import base64
 import contextlib
+import copy
+import datetime
 import hashlib
 import heapq
 import itertools
 import json
+import mmap
 import os
 import re
 import shutil
+import socket
+import uuid
 from collections import deque
 
 try:
@@ -25,13 +30,15 @@ try:
         from redis import StrictRedis as Redis
     except ImportError:
         from redis import Redis
-    from redis.exceptions import ConnectionError
+    from redis.exceptions import ConnectionError, ResponseError
+    from redis.exceptions import TimeoutError as RedisTimeoutError
 except ImportError:
-    ConnectionPool = Redis = ConnectionError = None
+    ConnectionPool = Redis = ConnectionError = ResponseError = None
+    RedisTimeoutError = None
 
 from scrooge.constants import EmptyData
 from scrooge.exceptions import ConfigurationError
-from scrooge.utils import FileLock, text_type, to_timestamp
+from scrooge.utils import FileLock, decode, text_type, to_timestamp
 
 
 class BaseStorage(object):
@@ -41,6 +48,9 @@ class BaseStorage(object):
 
     blocking = False  # Does dequeue() block until ready, or should we poll?
     priority = True
+    result_notifications = False  # Can callers block until a result is ready?
+    schedule_notifications = False  # Can the scheduler block until a task is added?
+    checkpoint_interval = None  # Seconds between calls to checkpoint(), if any.
 
     def __init__(self, name="scrooge", **storage_kwargs):
         self.name = name
@@ -66,6 +76,34 @@ class BaseStorage(object):
         """
         raise NotImplementedError
 
+    def enqueue_many(self, items):
+        """
+        Add multiple chunks of data to the queue. Storage implementations that
+        can write several items in a single operation should override this
+        method, the default implementation simply calls :py:meth:`enqueue`
+        for each item.
+
+        :param items: List of ``(data, priority)`` 2-tuples.
+        :return: No return value.
+        """
+        for data, priority in items:
+            self.enqueue(data, priority)
+
+    def enqueue_front(self, items):
+        """
+        Add multiple chunks of data to the head of the queue, so that they
+        are read before any other items of the same priority, in the order
+        given. Used to return messages that were read but not processed.
+        Storage implementations which cannot add to the head of the queue
+        raise NotImplementedError, in which case callers use
+        :py:meth:`enqueue_many` and the items are read again after the
+        rest of the queue.
+
+        :param items: List of ``(data, priority)`` 2-tuples.
+        :return: No return value.
+        """
+        raise NotImplementedError
+
     def dequeue(self):
         """
         Atomically remove data from the queue. If no data is available, no data
@@ -75,6 +113,57 @@ class BaseStorage(object):
         """
         raise NotImplementedError
 
+    def dequeue_many(self, n):
+        """
+        Atomically remove up to ``n`` items from the queue. Storage
+        implementations that can read several items in a single operation
+        should override this method, the default implementation simply calls
+        :py:meth:`dequeue` until ``n`` items are read or the queue is empty.
+
+        :param int n: Maximum number of items to read.
+        :return: List containing opaque binary task data, in queue order.
+        """
+        accum = []
+        while len(accum) < n:
+            data = self.dequeue()
+            if data is None:
+                break
+            accum.append(data)
+        return accum
+
+    def acknowledge(self, data):
+        """
+        Acknowledge that a message read from the queue has been processed.
+        Storage implementations that provide at-least-once delivery hold on to
+        dequeued messages until they are acknowledged. By default this is a
+        no-op.
+
+        :param bytes data: Task data, as returned by :py:meth:`dequeue`.
+        :return: No return value.
+        """
+        pass
+
+    def requeue_unacknowledged(self):
+        """
+        Return unacknowledged messages held by consumers that are no longer
+        running to the queue. By default this is a no-op.
+
+        :return: Number of messages returned to the queue.
+        """
+        return 0
+
+    def checkpoint(self):
+        """
+        Perform periodic maintenance, such as flushing a write-ahead log to
+        the database. If the storage sets ``checkpoint_interval``, the
+        consumer's scheduler calls this method every ``checkpoint_interval``
+        seconds, so that the work is not done by the workers. By default this
+        is a no-op.
+
+        :return: No return value.
+        """
+        pass
+
     def queue_size(self):
         """
         Return the length of the queue.
@@ -113,18 +202,63 @@ class BaseStorage(object):
         """
         raise NotImplementedError
 
-    def read_schedule(self, ts):
+    def read_schedule(self, ts, limit=None):
         """
         Read all tasks from the schedule that should be executed at or before
         the given timestamp. Once read, the tasks are removed from the
         schedule.
 
         :param datetime ts: Timestamp
+        :param int limit: Read at most this many tasks, soonest first.
         :return: List containing task data for tasks which should be executed
                  at or before the given timestamp.
         """
         raise NotImplementedError
 
+    def promote_due(self, ts, limit=None):
+        """
+        Move tasks that should be executed at or before the given timestamp
+        from the schedule directly onto the queue, without returning them to
+        the caller. This is an optional fast-path used by the scheduler, which
+        otherwise reads the tasks with :py:meth:`read_schedule` and enqueues
+        them again.
+
+        The task data is moved as-is, so storages that support task
+        priorities, which are only known once the task has been deserialized,
+        should not implement this method. No signals are sent when the task
+        is moved (``SIGNAL_SCHEDULED`` was sent when the task was added to
+        the schedule, just as when the scheduler enqueues a task itself).
+
+        :param datetime ts: Timestamp
+        :param int limit: Move at most this many tasks, soonest first.
+        :return: Number of tasks moved to the queue.
+        """
+        raise NotImplementedError
+
+    def peek_schedule(self):
+        """
+        Non-destructively read the timestamp of the task that is scheduled to
+        run soonest. Storages which cannot determine this cheaply may leave
+        this method unimplemented, in which case the scheduler polls the
+        schedule at a fixed interval.
+
+        :return: Timestamp of the earliest scheduled task, or ``None`` if the
+            schedule is empty.
+        """
+        raise NotImplementedError
+
+    def wait_for_schedule(self, timeout):
+        """
+        Block until a task has been added to the schedule, or until the
+        timeout has elapsed. Only storages that set
+        ``schedule_notifications = True`` implement this method. A task added
+        since the last call causes the next call to return immediately.
+
+        :param float timeout: Maximum number of seconds to wait.
+        :return: Boolean indicating whether a task was added.
+        """
+        raise NotImplementedError
+
     def schedule_size(self):
         """
         :return: The number of tasks currently in the schedule.
@@ -149,6 +283,19 @@ class BaseStorage(object):
         """
         raise NotImplementedError
 
+    def create_blob_storage(self):
+        """
+        Return a storage used to hold large task arguments and results, see
+        ``blob_threshold``. Storage implementations should return a storage
+        sharing this storage's connection, with its own key/value namespace,
+        so that blobs are not counted, listed or flushed along with results.
+        By default this storage is returned.
+
+        :return: A storage instance, of which only the key/value methods are
+            used.
+        """
+        return self
+
     def put_data(self, key, value, is_result=False):
         """
         Store an arbitrary key/value pair.
@@ -161,6 +308,19 @@ class BaseStorage(object):
         """
         raise NotImplementedError
 
+    def wait_for_results(self, keys, timeout):
+        """
+        Block until a task result has been stored for one of the given keys,
+        or until the timeout has elapsed. Only storages that set
+        ``result_notifications = True`` implement this method, otherwise
+        callers should poll for the result instead.
+
+        :param keys: List of keys to wait on.
+        :param float timeout: Maximum number of seconds to wait.
+        :return: Key for which a result was stored, or ``None``.
+        """
+        raise NotImplementedError
+
     def peek_data(self, key):
         """
         Non-destructively read the value at the given key, if it exists.
@@ -179,6 +339,32 @@ class BaseStorage(object):
         """
         raise NotImplementedError
 
+    def peek_many(self, keys):
+        """
+        Non-destructively read the values at the given keys. Storage
+        implementations that can read several keys in a single operation
+        should override this method, the default implementation simply calls
+        :py:meth:`peek_data` for each key.
+
+        :param keys: List of keys to read.
+        :return: List containing the value associated with each key, or
+            ``EmptyData`` for keys that do not exist.
+        """
+        return [self.peek_data(key) for key in keys]
+
+    def pop_many(self, keys):
+        """
+        Destructively read the values at the given keys. Storage
+        implementations that can read several keys in a single operation
+        should override this method, the default implementation simply calls
+        :py:meth:`pop_data` for each key.
+
+        :param keys: List of keys to read.
+        :return: List containing the value associated with each key, or
+            ``EmptyData`` for keys that do not exist.
+        """
+        return [self.pop_data(key) for key in keys]
+
     def delete_data(self, key):
         """
         Delete the value at the given key, if it exists.
@@ -261,9 +447,12 @@ class BlackHoleStorage(BaseStorage):
     def add_to_schedule(self, data, ts, utc):
         pass
 
-    def read_schedule(self, ts):
+    def read_schedule(self, ts, limit=None):
         return []
 
+    def peek_schedule(self):
+        pass
+
     def schedule_size(self):
         return 0
 
@@ -296,13 +485,19 @@ class BlackHoleStorage(BaseStorage):
 
 
 class MemoryStorage(BaseStorage):
+    result_notifications = True
+    schedule_notifications = True
+
     def __init__(self, *args, **kwargs):
         super(MemoryStorage, self).__init__(*args, **kwargs)
         self._c = 0  # Counter to ensure FIFO behavior for queue.
+        self._front = 0  # Decreasing counter for items added to the head.
         self._queue = []
         self._results = {}
         self._schedule = []
         self._lock = threading.RLock()
+        self._result_ready = threading.Condition(self._lock)
+        self._schedule_added = threading.Event()
 
     def enqueue(self, data, priority=None):
         with self._lock:
@@ -310,6 +505,18 @@ class MemoryStorage(BaseStorage):
             priority = 0 if priority is None else -priority
             heapq.heappush(self._queue, (priority, self._c, data))
 
+    def enqueue_many(self, items):
+        with self._lock:
+            for data, priority in items:
+                self.enqueue(data, priority)
+
+    def enqueue_front(self, items):
+        with self._lock:
+            for data, priority in reversed(items):
+                self._front -= 1
+                priority = 0 if priority is None else -priority
+                heapq.heappush(self._queue, (priority, self._front, data))
+
     def dequeue(self):
         try:
             _, _, data = heapq.heappop(self._queue)
@@ -318,6 +525,11 @@ class MemoryStorage(BaseStorage):
         else:
             return data
 
+    def dequeue_many(self, n):
+        with self._lock:
+            n = min(n, len(self._queue))
+            return [heapq.heappop(self._queue)[2] for _ in range(n)]
+
     def queue_size(self):
         return len(self._queue)
 
@@ -331,12 +543,14 @@ class MemoryStorage(BaseStorage):
         self._queue = []
 
     def add_to_schedule(self, data, ts, utc):
-        heapq.heappush(self._schedule, (ts, data))
+        with self._lock:
+            heapq.heappush(self._schedule, (ts, data))
+        self._schedule_added.set()
 
-    def read_schedule(self, ts):
+    def read_schedule(self, ts, limit=None):
         with self._lock:
             accum = []
-            while self._schedule:
+            while self._schedule and (limit is None or len(accum) < limit):
                 sts, data = heapq.heappop(self._schedule)
                 if sts <= ts:
                     accum.append(data)
@@ -346,6 +560,16 @@ class MemoryStorage(BaseStorage):
 
         return accum
 
+    def peek_schedule(self):
+        with self._lock:
+            if self._schedule:
+                return self._schedule[0][0]
+
+    def wait_for_schedule(self, timeout):
+        added = self._schedule_added.wait(timeout)
+        self._schedule_added.clear()
+        return added
+
     def schedule_size(self):
         return len(self._schedule)
 
@@ -358,8 +582,23 @@ class MemoryStorage(BaseStorage):
     def flush_schedule(self):
         self._schedule = []
 
+    def create_blob_storage(self):
+        return MemoryStorage(self.name)
+
     def put_data(self, key, value, is_result=False):
-        self._results[key] = value
+        with self._result_ready:
+            self._results[key] = value
+            if is_result:
+                self._result_ready.notify_all()
+
+    def wait_for_results(self, keys, timeout):
+        def ready():
+            for key in keys:
+                if key in self._results:
+                    return key
+
+        with self._result_ready:
+            return self._result_ready.wait_for(ready, timeout)
 
     def peek_data(self, key):
         return self._results.get(key, EmptyData)
@@ -382,18 +621,58 @@ class MemoryStorage(BaseStorage):
 
 # A custom lua script to pass to redis that will read tasks from the schedule
 # and atomically pop them from the sorted set and return them. It won't return
-# anything if it isn't able to remove the items it reads.
+# anything if it isn't able to remove the items it reads. If a limit is given,
+# only that many tasks are read, and they are removed in batches as unpack()
+# can only handle a limited number of values.
 SCHEDULE_POP_LUA = """\
 local unix_ts = ARGV[1]
-local res = redis.call('zrangebyscore', KEYS[1], '-inf', unix_ts)
+local res
+if ARGV[2] then
+    res = redis.call('zrangebyscore', KEYS[1], '-inf', unix_ts, 'LIMIT', 0, ARGV[2])
+    for i = 1, #res, 1000 do
+        redis.call('zrem', KEYS[1], unpack(res, i, math.min(i + 999, #res)))
+    end
+    return res
+end
+res = redis.call('zrangebyscore', KEYS[1], '-inf', unix_ts)
 if #res and redis.call('zremrangebyscore', KEYS[1], '-inf', unix_ts) == #res then
     return res
 end"""
 
+# Atomically move tasks which are due from the schedule onto the queue,
+# returning the number of tasks moved.
+SCHEDULE_PROMOTE_LUA = """\
+local unix_ts = ARGV[1]
+local res
+if ARGV[2] then
+    res = redis.call('zrangebyscore', KEYS[1], '-inf', unix_ts, 'LIMIT', 0, ARGV[2])
+else
+    res = redis.call('zrangebyscore', KEYS[1], '-inf', unix_ts)
+end
+for i = 1, #res, 1000 do
+    local j = math.min(i + 999, #res)
+    redis.call('zrem', KEYS[1], unpack(res, i, j))
+    redis.call('lpush', KEYS[2], unpack(res, i, j))
+end
+return #res"""
+
+# Atomically read and remove a value from the result hash. Redis returns nil
+# for a missing field, which is distinct from an empty value, so no separate
+# existence check is needed.
+RESULT_POP_LUA = """\
+local val = redis.call('hget', KEYS[1], ARGV[1])
+if val then
+    redis.call('hdel', KEYS[1], ARGV[1])
+end
+return val"""
+
 
 class RedisStorage(BaseStorage):
     priority = False  # Use PriorityRedisStorage instead. Requires Redis>=5.0.
     redis_client = Redis
+    result_notifications = True
+    schedule_notifications = True
+    notify_expire = 60  # Seconds a result notification is kept for waiters.
 
     def __init__(
         self,
@@ -403,6 +682,7 @@ class RedisStorage(BaseStorage):
         connection_pool=None,
         url=None,
         client_name=None,
+        notify_schedule=False,
         **connection_params
     ):
 
@@ -434,10 +714,13 @@ class RedisStorage(BaseStorage):
         self.conn = self.redis_client(connection_pool=connection_pool)
         self.connection_params = connection_params
         self._pop = self.conn.register_script(SCHEDULE_POP_LUA)
+        self._promote = self.conn.register_script(SCHEDULE_PROMOTE_LUA)
+        self._pop_result = self.conn.register_script(RESULT_POP_LUA)
 
         self.name = self.clean_name(name)
         self.queue_key = "scrooge.redis.%s" % self.name
         self.schedule_key = "scrooge.schedule.%s" % self.name
+        self.schedule_notify_key = "scrooge.schedule.notify.%s" % self.name
         self.result_key = "scrooge.results.%s" % self.name
         self.error_key = "scrooge.errors.%s" % self.name
 
@@ -446,6 +729,9 @@ class RedisStorage(BaseStorage):
 
         self.blocking = blocking
         self.read_timeout = read_timeout
+        # Push a token for wait_for_schedule() when a task is scheduled. This
+        # is enabled by the consumer when using the event-driven scheduler.
+        self.notify_schedule = notify_schedule
 
     def clean_name(self, name):
         return re.sub("[^a-z0-9]", "", name)
@@ -460,6 +746,25 @@ class RedisStorage(BaseStorage):
             )
         self.conn.lpush(self.queue_key, data)
 
+    def enqueue_many(self, items):
+        if any(priority for _, priority in items):
+            raise NotImplementedError(
+                "Task priorities are not supported by " "this storage."
+            )
+        if items:
+            # LPUSH with multiple values pushes them in order, so the first
+            # item will be the first one popped by the consumer.
+            self.conn.lpush(self.queue_key, *[data for data, _ in items])
+
+    def enqueue_front(self, items):
+        if any(priority for _, priority in items):
+            raise NotImplementedError(
+                "Task priorities are not supported by " "this storage."
+            )
+        if items:
+            # Items are popped from the right, so push them there in reverse.
+            self.conn.rpush(self.queue_key, *[data for data, _ in reversed(items)])
+
     def dequeue(self):
         if self.blocking:
             try:
@@ -471,6 +776,17 @@ class RedisStorage(BaseStorage):
         else:
             return self.conn.rpop(self.queue_key)
 
+    def dequeue_many(self, n):
+        # RPOP with a count requires Redis >= 6.2. When the queue is empty and
+        # we are in blocking mode, block for the first available item.
+        items = self.conn.rpop(self.queue_key, n)
+        if items:
+            return items
+        elif self.blocking:
+            data = self.dequeue()
+            return [data] if data is not None else []
+        return []
+
     def queue_size(self):
         return self.conn.llen(self.queue_key)
 
@@ -482,15 +798,57 @@ class RedisStorage(BaseStorage):
         self.conn.delete(self.queue_key)
 
     def add_to_schedule(self, data, ts, utc):
-        self.conn.zadd(self.schedule_key, {data: self.convert_ts(ts)})
+        if not self.notify_schedule:
+            self.conn.zadd(self.schedule_key, {data: self.convert_ts(ts)})
+            return
 
-    def read_schedule(self, ts):
-        unix_ts = self.convert_ts(ts)
+        # Wake up a scheduler waiting in wait_for_schedule(). At most one token
+        # is kept, as the scheduler re-reads the schedule when woken.
+        pipe = self.conn.pipeline()
+        pipe.zadd(self.schedule_key, {data: self.convert_ts(ts)})
+        pipe.lpush(self.schedule_notify_key, 1)
+        pipe.ltrim(self.schedule_notify_key, 0, 0)
+        pipe.expire(self.schedule_notify_key, self.notify_expire)
+        pipe.execute()
+
+    def read_schedule(self, ts, limit=None):
+        args = [self.convert_ts(ts)]
+        if limit is not None:
+            args.append(limit)
         # invoke the redis lua script that will atomically pop off
         # all the tasks older than the given timestamp
-        tasks = self._pop(keys=[self.schedule_key], args=[unix_ts])
+        tasks = self._pop(keys=[self.schedule_key], args=args)
         return [] if tasks is None else tasks
 
+    def promote_due(self, ts, limit=None):
+        args = [self.convert_ts(ts)]
+        if limit is not None:
+            args.append(limit)
+        return self._promote(keys=[self.schedule_key, self.queue_key], args=args)
+
+    def peek_schedule(self):
+        res = self.conn.zrange(self.schedule_key, 0, 0, withscores=True)
+        if res:
+            return datetime.datetime.fromtimestamp(res[0][1])
+
+    def _block_timeout(self, timeout):
+        # Block for less than the socket timeout of the connection, if one is
+        # set, so the read does not time out before Redis replies.
+        socket_timeout = self.pool.connection_kwargs.get("socket_timeout")
+        if socket_timeout:
+            timeout = min(timeout, socket_timeout * 0.8)
+        # A timeout of zero would block indefinitely.
+        return max(timeout, 0.01)
+
+    def wait_for_schedule(self, timeout):
+        try:
+            res = self.conn.blpop(
+                self.schedule_notify_key, timeout=self._block_timeout(timeout)
+            )
+        except (ConnectionError, RedisTimeoutError):
+            return False
+        return res is not None
+
     def schedule_size(self):
         return self.conn.zcard(self.schedule_key)
 
@@ -499,25 +857,68 @@ class RedisStorage(BaseStorage):
         return self.conn.zrange(self.schedule_key, 0, limit, withscores=False)
 
     def flush_schedule(self):
-        self.conn.delete(self.schedule_key)
+        self.conn.delete(self.schedule_key, self.schedule_notify_key)
+
+    def create_blob_storage(self):
+        storage = copy.copy(self)
+        storage.result_key = "scrooge.blobs.%s" % self.name
+        storage.result_notifications = False  # Nothing waits for blobs.
+        return storage
+
+    def notify_key(self, key):
+        return "scrooge.notify.%s.%s" % (self.name, decode(key))
+
+    def _notify(self, pipe, key):
+        # When a task result is stored, push a token onto a short-lived list
+        # that clients waiting on the result can block on.
+        if not self.result_notifications:
+            return
+        notify_key = self.notify_key(key)
+        pipe.lpush(notify_key, 1)
+        pipe.expire(notify_key, self.notify_expire)
 
     def put_data(self, key, value, is_result=False):
-        self.conn.hset(self.result_key, key, value)
+        if is_result:
+            pipe = self.conn.pipeline()
+            pipe.hset(self.result_key, key, value)
+            self._notify(pipe, key)
+            pipe.execute()
+        else:
+            self.conn.hset(self.result_key, key, value)
+
+    def wait_for_results(self, keys, timeout):
+        notify_keys = dict((self.notify_key(key), key) for key in keys)
+        try:
+            res = self.conn.blpop(
+                list(notify_keys), timeout=self._block_timeout(timeout)
+            )
+        except (ConnectionError, RedisTimeoutError):
+            return None
+        if res is not None:
+            return notify_keys[decode(res[0])]
 
     def peek_data(self, key):
-        pipe = self.conn.pipeline()
-        pipe.hexists(self.result_key, key)
-        pipe.hget(self.result_key, key)
-        exists, val = pipe.execute()
-        return EmptyData if not exists else val
+        val = self.conn.hget(self.result_key, key)
+        return EmptyData if val is None else val
 
     def pop_data(self, key):
+        val = self._pop_result(keys=[self.result_key], args=[key])
+        return EmptyData if val is None else val
+
+    def peek_many(self, keys):
+        if not keys:
+            return []
+        values = self.conn.hmget(self.result_key, keys)
+        return [EmptyData if val is None else val for val in values]
+
+    def pop_many(self, keys):
+        if not keys:
+            return []
         pipe = self.conn.pipeline()
-        pipe.hexists(self.result_key, key)
-        pipe.hget(self.result_key, key)
-        pipe.hdel(self.result_key, key)
-        exists, val, n = pipe.execute()
-        return EmptyData if not exists else val
+        pipe.hmget(self.result_key, keys)
+        pipe.hdel(self.result_key, *keys)
+        values, _ = pipe.execute()
+        return [EmptyData if val is None else val for val in values]
 
     def has_data_for_key(self, key):
         return self.conn.hexists(self.result_key, key)
@@ -531,8 +932,333 @@ class RedisStorage(BaseStorage):
     def result_items(self):
         return self.conn.hgetall(self.result_key)
 
+    def _flush_notifications(self):
+        if not self.result_notifications:
+            return
+        keys = list(self.conn.scan_iter(match=self.notify_key("*")))
+        if keys:
+            self.conn.delete(*keys)
+
     def flush_results(self):
         self.conn.delete(self.result_key)
+        self._flush_notifications()
+
+
+# Requeue the in-flight messages of an owner whose heartbeat has expired. The
+# heartbeat is checked here, so that an owner refreshing its heartbeat at the
+# same time does not have its messages requeued.
+REQUEUE_LUA = """\
+if redis.call('exists', KEYS[4]) == 1 then
+    return 0
+end
+local n = 0
+local msg = redis.call('lpop', KEYS[1])
+while msg do
+    redis.call('rpush', KEYS[2], msg)
+    n = n + 1
+    msg = redis.call('lpop', KEYS[1])
+end
+redis.call('srem', KEYS[3], ARGV[1])
+return n"""
+
+
+class ReliableRedisStorage(RedisStorage):
+    """
+    Redis storage providing at-least-once delivery. Requires Redis >= 6.2.
+
+    Messages are atomically moved from the queue to an in-flight list owned by
+    the consumer process which read them, and are removed from that list once
+    they are acknowledged. While a process owns an in-flight list it refreshes
+    a heartbeat key in a background thread. If the process is killed before
+    acknowledging its messages, the heartbeat expires and the scheduler will
+    return the messages to the queue.
+    """
+
+    def __init__(self, name="scrooge", heartbeat_timeout=30, *args, **kwargs):
+        super(ReliableRedisStorage, self).__init__(name, *args, **kwargs)
+        self.heartbeat_timeout = heartbeat_timeout
+        self.owners_key = "scrooge.owners.%s" % self.name
+        self._requeue = self.conn.register_script(REQUEUE_LUA)
+        self._owner = self._owner_pid = None
+        self._heartbeat_stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def inflight_key(self, owner):
+        return "scrooge.inflight.%s.%s" % (self.name, owner)
+
+    def heartbeat_key(self, owner):
+        return "scrooge.heartbeat.%s.%s" % (self.name, owner)
+
+    @property
+    def owner(self):
+        # Each process gets its own in-flight list, so that messages held by
+        # a worker process are recovered if that process alone is killed.
+        if self._owner_pid != os.getpid():
+            with self._lock:
+                if self._owner_pid != os.getpid():
+                    self._register_owner()
+        return self._owner
+
+    def _register_owner(self):
+        owner = "%s:%s:%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+        pipe = self.conn.pipeline()
+        pipe.set(self.heartbeat_key(owner), 1, ex=self.heartbeat_timeout)
+        pipe.sadd(self.owners_key, owner)
+        pipe.execute()
+
+        self._owner, self._owner_pid = owner, os.getpid()
+        self._heartbeat_stop = threading.Event()
+        t = threading.Thread(
+            target=self._heartbeat,
+            args=(owner, self._heartbeat_stop),
+            name="scrooge-heartbeat",
+        )
+        t.daemon = True
+        t.start()
+
+    def _heartbeat(self, owner, stop):
+        key = self.heartbeat_key(owner)
+        while not stop.wait(self.heartbeat_timeout / 3.0):
+            # Also re-add the owner, in case it was removed after missing a
+            # heartbeat, so that its later in-flight messages are recoverable.
+            pipe = self.conn.pipeline()
+            pipe.set(key, 1, ex=self.heartbeat_timeout)
+            pipe.sadd(self.owners_key, owner)
+            try:
+                pipe.execute()
+            except ConnectionError:
+                pass
+
+    def close(self):
+        self._heartbeat_stop.set()
+
+    def dequeue(self):
+        inflight = self.inflight_key(self.owner)
+        if self.blocking:
+            try:
+                return self.conn.blmove(
+                    self.queue_key, inflight, self.read_timeout, "RIGHT", "LEFT"
+                )
+            except ConnectionError:
+                return None
+        else:
+            return self.conn.lmove(self.queue_key, inflight, "RIGHT", "LEFT")
+
+    def dequeue_many(self, n):
+        inflight = self.inflight_key(self.owner)
+        pipe = self.conn.pipeline()
+        for _ in range(n):
+            pipe.lmove(self.queue_key, inflight, "RIGHT", "LEFT")
+        items = [data for data in pipe.execute() if data is not None]
+        if items or not self.blocking:
+            return items
+        data = self.dequeue()
+        return [data] if data is not None else []
+
+    def acknowledge(self, data):
+        self.conn.lrem(self.inflight_key(self.owner), 1, data)
+
+    def requeue_unacknowledged(self):
+        owners = list(self.conn.smembers(self.owners_key))
+        if not owners:
+            return 0
+
+        owners = [owner.decode("utf8") for owner in owners]
+        alive = self.conn.mget([self.heartbeat_key(owner) for owner in owners])
+        n = 0
+        for owner, heartbeat in zip(owners, alive):
+            if heartbeat is None:
+                keys = [
+                    self.inflight_key(owner),
+                    self.queue_key,
+                    self.owners_key,
+                    self.heartbeat_key(owner),
+                ]
+                n += self._requeue(keys=keys, args=[owner])
+        return n
+
+    def inflight_items(self):
+        """
+        :return: List of messages that have been read, but not acknowledged,
+            by any consumer process.
+        """
+        accum = []
+        for owner in self.conn.smembers(self.owners_key):
+            key = self.inflight_key(owner.decode("utf8"))
+            accum.extend(self.conn.lrange(key, 0, -1)[::-1])
+        return accum
+
+    def flush_queue(self):
+        owners = self.conn.smembers(self.owners_key)
+        keys = [self.inflight_key(owner.decode("utf8")) for owner in owners]
+        self.conn.delete(self.queue_key, *keys)
+
+
+class RedisStreamStorage(RedisStorage):
+    """
+    Redis storage using a stream and consumer group for the queue. Requires
+    Redis >= 6.2.
+
+    Messages are read with ``XREADGROUP`` and remain pending until they are
+    acknowledged, at which point they are removed from the stream. Messages
+    that have been pending for longer than ``visibility_timeout`` seconds are
+    assumed to belong to a consumer that has died, and are put back on the
+    queue by the scheduler. The visibility timeout should therefore be longer
+    than the longest-running task.
+
+    If ``max_length`` is given, the stream is trimmed to approximately that
+    many entries when new messages are added. Note that trimming discards the
+    oldest entries, whether or not they have been processed.
+    """
+
+    def __init__(
+        self, name="scrooge", visibility_timeout=300, max_length=None, *args, **kwargs
+    ):
+        super(RedisStreamStorage, self).__init__(name, *args, **kwargs)
+        self.visibility_timeout = visibility_timeout
+        self.max_length = max_length
+        self.stream_key = "scrooge.stream.%s" % self.name
+        self.group = "scrooge"
+        self._pending = {}  # Maps message data to stream IDs, for acks.
+        self._consumer = self._consumer_pid = None
+        self._lock = threading.Lock()
+        self.create_group()
+
+    def create_group(self):
+        try:
+            self.conn.xgroup_create(self.stream_key, self.group, "0", mkstream=True)
+        except ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    @property
+    def consumer(self):
+        if self._consumer_pid != os.getpid():
+            self._consumer_pid = os.getpid()
+            self._consumer = "%s:%s" % (socket.gethostname(), os.getpid())
+            self._pending = {}
+        return self._consumer
+
+    def enqueue(self, data, priority=None):
+        if priority:
+            raise NotImplementedError(
+                "Task priorities are not supported by " "this storage."
+            )
+        self.conn.xadd(self.stream_key, {"data": data}, maxlen=self.max_length)
+
+    def promote_due(self, ts, limit=None):
+        # Tasks are added to a stream rather than a list.
+        raise NotImplementedError
+
+    def enqueue_many(self, items):
+        if any(priority for _, priority in items):
+            raise NotImplementedError(
+                "Task priorities are not supported by " "this storage."
+            )
+        pipe = self.conn.pipeline()
+        for data, _ in items:
+            pipe.xadd(self.stream_key, {"data": data}, maxlen=self.max_length)
+        pipe.execute()
+
+    def enqueue_front(self, items):
+        # Entries can only be appended to a stream.
+        raise NotImplementedError
+
+    def _read(self, n):
+        block = int(self.read_timeout * 1000) if self.blocking else None
+        try:
+            res = self.conn.xreadgroup(
+                self.group, self.consumer, {self.stream_key: ">"}, n, block
+            )
+        except ConnectionError:
+            return []
+
+        accum = []
+        with self._lock:
+            for _, messages in res or ():
+                for message_id, fields in messages:
+                    data = fields[b"data"]
+                    self._pending.setdefault(data, []).append(message_id)
+                    accum.append(data)
+        return accum
+
+    def dequeue(self):
+        items = self._read(1)
+        if items:
+            return items[0]
+
+    def dequeue_many(self, n):
+        return self._read(n)
+
+    def acknowledge(self, data):
+        with self._lock:
+            ids = self._pending.get(data)
+            if not ids:
+                return
+            message_id = ids.pop(0)
+            if not ids:
+                del self._pending[data]
+
+        pipe = self.conn.pipeline()
+        pipe.xack(self.stream_key, self.group, message_id)
+        pipe.xdel(self.stream_key, message_id)
+        pipe.execute()
+
+    def requeue_unacknowledged(self):
+        n = 0
+        start = "0-0"
+        min_idle = int(self.visibility_timeout * 1000)
+        while True:
+            res = self.conn.xautoclaim(
+                self.stream_key, self.group, self.consumer, min_idle, start, 100
+            )
+            start, messages = res[0], res[1]
+            if messages:
+                # Add a copy of each message to the end of the stream, and
+                # remove the original.
+                pipe = self.conn.pipeline()
+                for message_id, fields in messages:
+                    if fields:
+                        pipe.xadd(self.stream_key, {"data": fields[b"data"]})
+                        n += 1
+                    pipe.xack(self.stream_key, self.group, message_id)
+                    pipe.xdel(self.stream_key, message_id)
+                pipe.execute()
+                self._forget([message_id for message_id, _ in messages])
+            if start in (b"0-0", "0-0"):
+                return n
+
+    def _forget(self, message_ids):
+        # Discard any references we hold to messages that were requeued.
+        message_ids = set(message_ids)
+        with self._lock:
+            for data, ids in list(self._pending.items()):
+                ids = [i for i in ids if i not in message_ids]
+                if ids:
+                    self._pending[data] = ids
+                else:
+                    del self._pending[data]
+
+    def _group_info(self):
+        for group in self.conn.xinfo_groups(self.stream_key):
+            if group["name"] in (self.group, self.group.encode("utf8")):
+                return group
+
+    def queue_size(self):
+        group = self._group_info()
+        return self.conn.xlen(self.stream_key) - (group["pending"] if group else 0)
+
+    def enqueued_items(self, limit=None):
+        group = self._group_info()
+        start = "(%s" % group["last-delivered-id"].decode("utf8") if group else "-"
+        messages = self.conn.xrange(self.stream_key, start, "+", limit)
+        return [fields[b"data"] for _, fields in messages]
+
+    def flush_queue(self):
+        self.conn.delete(self.stream_key)
+        self.create_group()
+        with self._lock:
+            self._pending = {}
 
 
 class RedisExpireStorage(RedisStorage):
@@ -543,30 +1269,47 @@ class RedisExpireStorage(RedisStorage):
         super(RedisExpireStorage, self).__init__(name, *args, **kwargs)
 
         self._expire_time = expire_time
+        self._set_result_prefix(b"scrooge.r.%s." % self.name.encode("utf8"))
 
-        self.result_prefix = rp = b"scrooge.r.%s." % self.name.encode("utf8")
+    def _set_result_prefix(self, prefix):
+        self.result_prefix = prefix
         encode = lambda s: s if isinstance(s, bytes) else s.encode("utf8")
-        self.result_key = lambda k: rp + encode(k)
+        self.result_key = lambda k: prefix + encode(k)
+
+    def create_blob_storage(self):
+        # Blobs stored with is_result=True, i.e. task results, expire along
+        # with the results themselves.
+        storage = copy.copy(self)
+        storage._set_result_prefix(b"scrooge.b.%s." % self.name.encode("utf8"))
+        storage.result_notifications = False
+        return storage
 
     def put_data(self, key, value, is_result=False):
         if is_result:
             # We only want to expire task result data. If we are storing an
             # important metadata like a revocation key, we need to preserve it.
-            self.conn.setex(self.result_key(key), self._expire_time, value)
+            pipe = self.conn.pipeline()
+            pipe.setex(self.result_key(key), self._expire_time, value)
+            self._notify(pipe, key)
+            pipe.execute()
         else:
             self.conn.set(self.result_key(key), value)
 
     def peek_data(self, key):
-        pipe = self.conn.pipeline()
-        pipe.exists(self.result_key(key))
-        pipe.get(self.result_key(key))
-        exists, val = pipe.execute()
-        return EmptyData if not exists else val
+        val = self.conn.get(self.result_key(key))
+        return EmptyData if val is None else val
+
+    def peek_many(self, keys):
+        if not keys:
+            return []
+        values = self.conn.mget([self.result_key(key) for key in keys])
+        return [EmptyData if val is None else val for val in values]
 
     # Here we explicitly prevent result items from being removed by using the
     # same implementation for "pop" (get and delete) as we do for "peek"
     # (non-destructive read).
     pop_data = peek_data
+    pop_many = peek_many
 
     def delete_data(self, key):
         return self.conn.delete(self.result_key(key))
@@ -596,11 +1339,16 @@ class RedisExpireStorage(RedisStorage):
         keys = list(self._result_keys())
         if keys:
             self.conn.delete(*keys)
+        self._flush_notifications()
 
 
 class RedisPriorityQueue(object):
     priority = True
 
+    def promote_due(self, ts, limit=None):
+        # The priority is only known once the task has been deserialized.
+        raise NotImplementedError
+
     def enqueue(self, data, priority=None):
         priority = 0 if priority is None else -priority
         # Prefix the message with an encoded timestamp to ensure that messages
@@ -611,6 +1359,35 @@ class RedisPriorityQueue(object):
         prefix = struct.pack(">Q", int(time.time() * 1e6))
         self.conn.zadd(self.queue_key, {prefix + data: priority})
 
+    def enqueue_many(self, items):
+        if not items:
+            return
+        # Use consecutive timestamp prefixes so the items retain their relative
+        # ordering and identical messages are not collapsed into one member.
+        ts = int(time.time() * 1e6)
+        mapping = {}
+        for i, (data, priority) in enumerate(items):
+            prefix = struct.pack(">Q", ts + i)
+            mapping[prefix + data] = 0 if priority is None else -priority
+        self.conn.zadd(self.queue_key, mapping)
+
+    @property
+    def front_key(self):
+        return "scrooge.front.%s" % self.name
+
+    def enqueue_front(self, items):
+        if not items:
+            return
+        # Prefixes counting down from 2**48, taken from a counter, sort before
+        # the timestamp prefixes of the items already in the queue, and before
+        # the items added to the head of the queue previously.
+        start = (1 << 48) - self.conn.incrby(self.front_key, len(items))
+        mapping = {}
+        for i, (data, priority) in enumerate(items):
+            prefix = struct.pack(">Q", start + i)
+            mapping[prefix + data] = 0 if priority is None else -priority
+        self.conn.zadd(self.queue_key, mapping)
+
     def dequeue(self):
         if self.blocking:
             try:
@@ -630,6 +1407,15 @@ class RedisPriorityQueue(object):
             if items:
                 return items[0][0][8:]  # [(prefix+data, score)].
 
+    def dequeue_many(self, n):
+        items = self.conn.zpopmin(self.queue_key, count=n)
+        if items:
+            return [item[8:] for item, _ in items]
+        elif self.blocking:
+            data = self.dequeue()
+            return [data] if data is not None else []
+        return []
+
     def queue_size(self):
         return self.conn.zcard(self.queue_key)
 
@@ -637,6 +1423,9 @@ class RedisPriorityQueue(object):
         items = self.conn.zrange(self.queue_key, 0, limit or -1)
         return [item[8:] for item in items]  # Unprefix the data.
 
+    def flush_queue(self):
+        self.conn.delete(self.queue_key, self.front_key)
+
 
 class PriorityRedisStorage(RedisPriorityQueue, RedisStorage):
     pass
@@ -721,7 +1510,18 @@ class BaseSqlStorage(BaseStorage):
                 curs.execute(sql)
 
     def sql(self, query, params=None, commit=False, results=False):
-        with self.db(commit=commit) as curs:
+        if not commit:
+            # Single statements outside of a transaction do not need the
+            # bookkeeping done by db().
+            curs = self.conn.execute(query, params or ())
+            try:
+                if results:
+                    return curs.fetchall()
+            finally:
+                curs.close()
+            return
+
+        with self.db(commit=True) as curs:
             curs.execute(query, params or ())
             if results:
                 return curs.fetchall()
@@ -729,6 +1529,8 @@ class BaseSqlStorage(BaseStorage):
 
 class SqliteStorage(BaseSqlStorage):
     begin_sql = "begin exclusive"
+    # DELETE ... RETURNING is supported by Sqlite 3.35.0 and newer.
+    returning = sqlite3 is not None and sqlite3.sqlite_version_info >= (3, 35, 0)
     table_kv = (
         "create table if not exists kv ("
         "queue text not null, key text not null, value blob not null, "
@@ -762,6 +1564,9 @@ class SqliteStorage(BaseSqlStorage):
         journal_mode="wal",
         timeout=5,
         strict_fifo=False,
+        mmap_size=None,
+        wal_autocheckpoint=None,
+        checkpoint_interval=None,
         **kwargs
     ):
         self.filename = filename
@@ -769,6 +1574,17 @@ class SqliteStorage(BaseSqlStorage):
         self._fsync = fsync
         self._journal_mode = journal_mode
         self._timeout = timeout  # Busy timeout in seconds, default is 5.
+        self._mmap_size = mmap_size  # Bytes of the database to memory-map.
+
+        # Sqlite checkpoints the WAL when a write leaves it larger than
+        # wal_autocheckpoint pages (default 1000), which stalls that writer.
+        # Setting checkpoint_interval lets the consumer checkpoint in the
+        # background instead, typically along with wal_autocheckpoint=0.
+        self._wal_autocheckpoint = wal_autocheckpoint
+        self.checkpoint_interval = checkpoint_interval
+
+        # Keep the compiled form of the statements used by the storage.
+        kwargs.setdefault("cached_statements", 256)
         self._conn_kwargs = kwargs
 
         # By default Sqlite may reuse rowids when rows are removed. This means
@@ -793,8 +1609,16 @@ class SqliteStorage(BaseSqlStorage):
         if self._cache_mb:
             conn.execute("pragma cache_size=%s" % (-1000 * self._cache_mb))
         conn.execute("pragma synchronous=%s" % (2 if self._fsync else 0))
+        if self._mmap_size is not None:
+            conn.execute("pragma mmap_size=%d" % self._mmap_size)
+        if self._wal_autocheckpoint is not None:
+            conn.execute("pragma wal_autocheckpoint=%d" % self._wal_autocheckpoint)
         return conn
 
+    def checkpoint(self):
+        if self._journal_mode.lower() == "wal":
+            self.sql("pragma wal_checkpoint(PASSIVE)", results=True)
+
     def enqueue(self, data, priority=None):
         self.sql(
             "insert into task (queue, data, priority) values (?, ?, ?)",
@@ -802,7 +1626,44 @@ class SqliteStorage(BaseSqlStorage):
             commit=True,
         )
 
+    def enqueue_many(self, items):
+        with self.db(commit=True) as curs:
+            curs.executemany(
+                "insert into task (queue, data, priority) values (?, ?, ?)",
+                [(self.name, to_blob(data), priority or 0) for data, priority in items],
+            )
+
+    def enqueue_front(self, items):
+        if not items:
+            return
+        # Tasks are read in order of id within a priority, so give the items
+        # ids below the lowest one in use.
+        with self.db(commit=True) as curs:
+            curs.execute("select coalesce(min(id), 1) from task")
+            start = min(curs.fetchone()[0], 1) - len(items)
+            curs.executemany(
+                "insert into task (id, queue, data, priority) values (?, ?, ?, ?)",
+                [
+                    (start + i, self.name, to_blob(data), priority or 0)
+                    for i, (data, priority) in enumerate(items)
+                ],
+            )
+
     def dequeue(self):
+        if self.returning:
+            # A single statement is atomic, so no explicit transaction is
+            # needed and the write lock is only held while it runs.
+            rows = self.sql(
+                "delete from task where id = ("
+                "select id from task where queue = ? "
+                "order by priority desc, id limit 1) returning data",
+                (self.name,),
+                results=True,
+            )
+            if rows:
+                return to_bytes(rows[0][0])
+            return
+
         with self.db(commit=True) as curs:
             curs.execute(
                 "select id, data from task where queue = ? "
@@ -816,6 +1677,36 @@ class SqliteStorage(BaseSqlStorage):
                 if curs.rowcount == 1:
                     return to_bytes(data)
 
+    def dequeue_many(self, n):
+        if self.returning:
+            # Rows produced by RETURNING are in an arbitrary order, so we sort
+            # them ourselves.
+            rows = self.sql(
+                "delete from task where id in ("
+                "select id from task where queue = ? "
+                "order by priority desc, id limit ?) "
+                "returning id, priority, data",
+                (self.name, n),
+                results=True,
+            )
+            rows.sort(key=lambda r: (-r[1], r[0]))
+            return [to_bytes(data) for _, _, data in rows]
+
+        with self.db(commit=True) as curs:
+            curs.execute(
+                "select id, priority, data from task where queue = ? "
+                "order by priority desc, id limit ?",
+                (self.name, n),
+            )
+            rows = curs.fetchall()
+            if rows:
+                plist = ",".join("?" * len(rows))
+                curs.execute(
+                    "delete from task where id IN (%s)" % plist,
+                    [tid for tid, _, _ in rows],
+                )
+            return [to_bytes(data) for _, _, data in rows]
+
     def queue_size(self):
         return self.sql(
             "select count(id) from task where queue=?", (self.name,), results=True
@@ -841,13 +1732,33 @@ class SqliteStorage(BaseSqlStorage):
             commit=True,
         )
 
-    def read_schedule(self, ts):
-        with self.db(commit=True) as curs:
+    def read_schedule(self, ts, limit=None):
+        if self.returning:
+            sql = (
+                "delete from schedule where id in ("
+                "select id from schedule where queue = ? and timestamp <= ? "
+                "order by timestamp%s) returning timestamp, id, data"
+            )
             params = (self.name, to_timestamp(ts))
-            curs.execute(
-                "select id, data from schedule where " "queue = ? and timestamp <= ?",
-                params,
+            if limit is not None:
+                sql %= " limit ?"
+                params += (limit,)
+            else:
+                sql %= ""
+            rows = self.sql(sql, params, results=True)
+            rows.sort(key=lambda r: (r[0], r[1]))
+            return [to_bytes(data) for _, _, data in rows]
+
+        with self.db(commit=True) as curs:
+            sql = (
+                "select id, data from schedule where queue = ? and timestamp <= ? "
+                "order by timestamp"
             )
+            params = (self.name, to_timestamp(ts))
+            if limit is not None:
+                sql += " limit ?"
+                params += (limit,)
+            curs.execute(sql, params)
             id_list, data = [], []
             for task_id, task_data in curs.fetchall():
                 id_list.append(task_id)
@@ -857,6 +1768,15 @@ class SqliteStorage(BaseSqlStorage):
                 curs.execute("delete from schedule where id IN (%s)" % plist, id_list)
             return data
 
+    def peek_schedule(self):
+        ts = self.sql(
+            "select min(timestamp) from schedule where queue=?",
+            (self.name,),
+            results=True,
+        )[0][0]
+        if ts is not None:
+            return datetime.datetime.fromtimestamp(ts)
+
     def schedule_size(self):
         return self.sql(
             "select count(id) from schedule where queue=?", (self.name,), results=True
@@ -874,6 +1794,12 @@ class SqliteStorage(BaseSqlStorage):
     def flush_schedule(self):
         self.sql("delete from schedule where queue = ?", (self.name,), True)
 
+    def create_blob_storage(self):
+        # Key/value data is stored per queue name.
+        storage = copy.copy(self)
+        storage.name = "%s.blobs" % self.name
+        return storage
+
     def put_data(self, key, value, is_result=False):
         self.sql(
             "insert or replace into kv (queue, key, value) " "values (?, ?, ?)",
@@ -901,6 +1827,32 @@ class SqliteStorage(BaseSqlStorage):
                     return to_bytes(result[0])
             return EmptyData
 
+    def _read_many(self, curs, keys, delete=False):
+        # Keep the number of bound parameters well below SQLite's limit.
+        values = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            plist = ",".join("?" * len(chunk))
+            params = [self.name] + list(chunk)
+            curs.execute(
+                "select key, value from kv where queue = ? and key IN (%s)" % plist,
+                params,
+            )
+            values.update((k, to_bytes(v)) for k, v in curs.fetchall())
+            if delete:
+                curs.execute(
+                    "delete from kv where queue = ? and key IN (%s)" % plist, params
+                )
+        return [values.get(key, EmptyData) for key in keys]
+
+    def peek_many(self, keys):
+        with self.db() as curs:
+            return self._read_many(curs, keys)
+
+    def pop_many(self, keys):
+        with self.db(commit=True) as curs:
+            return self._read_many(curs, keys, delete=True)
+
     def has_data_for_key(self, key):
         return bool(
             self.sql(
@@ -944,11 +1896,22 @@ class FileStorage(BaseStorage):
     This storage implementation should NOT be used in production as it utilizes
     exclusive locks around all file-system operations. This is done to prevent
     race-conditions when reading from the file-system.
+
+    Files of at least ``mmap_threshold`` bytes are memory-mapped rather than
+    read, and returned as a (copy-on-write) ``memoryview``.
     """
 
     MAX_PRIORITY = 0xFFFF
 
-    def __init__(self, name, path, levels=2, use_thread_lock=False, **storage_kwargs):
+    def __init__(
+        self,
+        name,
+        path,
+        levels=2,
+        use_thread_lock=False,
+        mmap_threshold=None,
+        **storage_kwargs
+    ):
         super(FileStorage, self).__init__(name, **storage_kwargs)
 
         self.path = path
@@ -961,6 +1924,7 @@ class FileStorage(BaseStorage):
         self.schedule_path = os.path.join(self.path, "schedule")
         self.result_path = os.path.join(self.path, "results")
         self.levels = levels
+        self.mmap_threshold = mmap_threshold
 
         if use_thread_lock:
             self.lock = threading.Lock()
@@ -968,6 +1932,15 @@ class FileStorage(BaseStorage):
             self.lock_file = os.path.join(self.path, ".lock")
             self.lock = FileLock(self.lock_file)
 
+    def _read(self, fh):
+        if self.mmap_threshold is not None:
+            size = os.fstat(fh.fileno()).st_size
+            if size and size >= self.mmap_threshold:
+                # The mapping remains valid after the file is removed.
+                buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_COPY)
+                return memoryview(buf)
+        return fh.read()
+
     def _flush_dir(self, path):
         if os.path.exists(path):
             shutil.rmtree(path)
@@ -1016,10 +1989,22 @@ class FileStorage(BaseStorage):
             os.rename(filename, tmp_dest)
 
             with open(tmp_dest, "rb") as fh:
-                data = fh.read()
+                data = self._read(fh)
             os.unlink(tmp_dest)
         return data
 
+    def dequeue_many(self, n):
+        with self.lock:
+            accum = []
+            for basename in self._get_sorted_filenames(self.queue_path)[:n]:
+                filename = os.path.join(self.queue_path, basename)
+                tmp_dest = filename + ".tmp"
+                os.rename(filename, tmp_dest)
+                with open(tmp_dest, "rb") as fh:
+                    accum.append(self._read(fh))
+                os.unlink(tmp_dest)
+        return accum
+
     def queue_size(self):
         return len(self._get_sorted_filenames(self.queue_path))
 
@@ -1053,12 +2038,12 @@ class FileStorage(BaseStorage):
             with open(filename, "wb") as fh:
                 fh.write(data)
 
-    def read_schedule(self, ts):
+    def read_schedule(self, ts, limit=None):
         with self.lock:
             prefix = self._timestamp_to_prefix(ts)
             accum = []
             for basename in self._get_sorted_filenames(self.schedule_path):
-                if basename[:12] > prefix:
+                if basename[:12] > prefix or len(accum) == limit:
                     break
                 filename = os.path.join(self.schedule_path, basename)
                 new_filename = filename + ".tmp"
@@ -1068,11 +2053,16 @@ class FileStorage(BaseStorage):
             tasks = []
             for filename in accum:
                 with open(filename, "rb") as fh:
-                    tasks.append(fh.read())
+                    tasks.append(self._read(fh))
                     os.unlink(filename)
 
         return tasks
 
+    def peek_schedule(self):
+        filenames = self._get_sorted_filenames(self.schedule_path)
+        if filenames:
+            return datetime.datetime.fromtimestamp(int(filenames[0][:12], 16) / 1000.0)
+
     def schedule_size(self):
         return len(self._get_sorted_filenames(self.schedule_path))
 
@@ -1095,6 +2085,11 @@ class FileStorage(BaseStorage):
         prefix_filename = itertools.chain(prefix, (checksum,))
         return os.path.join(self.result_path, *prefix_filename)
 
+    def create_blob_storage(self):
+        storage = copy.copy(self)
+        storage.result_path = os.path.join(self.path, "blobs")
+        return storage
+
     def put_data(self, key, value, is_result=False):
         if isinstance(key, text_type):
             key = key.encode("utf8")
@@ -1125,7 +2120,7 @@ class FileStorage(BaseStorage):
             return EmptyData
 
         with open(filename, "rb") as fh:
-            _, value = self._unpack_result(fh.read())
+            _, value = self._unpack_result(self._read(fh))
 
         # If file is corrupt or has been tampered with, return EmptyData.
         return value if value is not None else EmptyData
@@ -1138,7 +2133,7 @@ class FileStorage(BaseStorage):
                 return EmptyData
 
             with open(filename, "rb") as fh:
-                _, value = self._unpack_result(fh.read())
+                _, value = self._unpack_result(self._read(fh))
 
             os.unlink(filename)
 
@@ -1,3 +1,5 @@
+import sys
+
 from scrooge.tests.test_api import *
 from scrooge.tests.test_consumer import *
 from scrooge.tests.test_crontab import *
@@ -12,3 +14,6 @@ from scrooge.tests.test_sql_scrooge import *
 from scrooge.tests.test_storage import *
 from scrooge.tests.test_utils import *
 from scrooge.tests.test_wrappers import *
+
+if sys.version_info >= (3, 5):
+    from scrooge.tests.test_asyncio import *
@@ -1,10 +1,13 @@
 import datetime
 import inspect
+import threading
+import time
 
 from scrooge.api import (
     MemoryScrooge,
     PeriodicTask,
     Result,
+    ResultGroup,
     Task,
     TaskWrapper,
     _unsupported,
@@ -15,11 +18,15 @@ from scrooge.exceptions import (
     CancelExecution,
     ConfigurationError,
     RetryTask,
+    ScroogeException,
     TaskException,
     TaskLockedException,
 )
 from scrooge.serializer import SignedSerializer
+from scrooge.signals import SIGNAL_ERROR, SIGNAL_TIMEOUT
+from scrooge.storage import MemoryStorage
 from scrooge.tests.base import BaseTestCase
+from scrooge.utils import Error
 
 
 class TestError(Exception):
@@ -384,6 +391,78 @@ class TestQueue(BaseTestCase):
         self.assertEqual(len(self.scrooge), 0)
         self.assertEqual(self.scrooge.result_count(), 0)
 
+    def test_revoke_check_single_read(self):
+        @self.scrooge.task()
+        def task_a(n):
+            return n + 1
+
+        calls = []
+        get_raw_many = self.scrooge.get_raw_many
+
+        def counting_get_raw_many(keys, peek=False):
+            calls.append(list(keys))
+            return get_raw_many(keys, peek)
+
+        self.scrooge.get_raw_many = counting_get_raw_many
+
+        # The task's revoke key and the class-level key are read together.
+        r1, r2 = task_a(1), task_a(2)
+        self.assertEqual(self.execute_next(), 2)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0][0], r1.task.revoke_id)
+
+        # Revoking the instance does not consume the class-level revocation.
+        r2.revoke()
+        task_a.revoke(revoke_once=True)
+        self.assertTrue(self.execute_next() is None)
+        self.assertTrue(task_a.is_revoked())
+        self.assertTrue(self.scrooge.get(r2.task.revoke_id, peek=True) is None)
+
+    def test_revoke_cache(self):
+        scrooge = MemoryScrooge(utc=False, revoke_cache_timeout=60)
+        other = MemoryScrooge(utc=False)
+        other.storage = scrooge.storage  # Simulate a separate process.
+
+        @scrooge.task()
+        def task_a(n):
+            return n + 1
+
+        def execute_next():
+            return scrooge.execute(scrooge.dequeue())
+
+        task_a(1)
+        self.assertEqual(execute_next(), 2)
+
+        # Class-level revocations from another process are not seen until the
+        # cached state expires. The task instance's key is still read.
+        other.revoke_all(task_a.task_class)
+        task_a(2)
+        self.assertEqual(execute_next(), 3)
+        r = task_a(3)
+        other.revoke(r.task)
+        self.assertTrue(execute_next() is None)
+
+        task_a(4)
+        scrooge._revoke_cache.clear()
+        self.assertTrue(execute_next() is None)
+
+        # Revoking or restoring in the current process invalidates the cache.
+        task_a.restore()
+        task_a(5)
+        self.assertEqual(execute_next(), 6)
+        task_a.revoke()
+        task_a(6)
+        self.assertTrue(execute_next() is None)
+        task_a.restore()
+
+        # Revoke-once state is never cached.
+        task_a.revoke(revoke_once=True)
+        task_a(7)
+        self.assertTrue(execute_next() is None)
+        self.assertEqual(scrooge._revoke_cache, {})
+        task_a(8)
+        self.assertEqual(execute_next(), 9)
+
     def test_revoke_periodic(self):
         state = [0]
 
@@ -1548,6 +1627,213 @@ class TestScroogeAPIs(BaseTestCase):
         self.scrooge.serializer = SignedSerializer(secret="test secret")
         self.test_serialize_deserialize()
 
+    def test_enqueue_many(self):
+        @self.scrooge.task()
+        def task_a(n):
+            return n + 1
+
+        rg = task_a.map(range(5), batch_size=2)
+        self.assertEqual(len(rg), 5)
+        self.assertEqual(len(self.scrooge), 5)
+        for _ in range(5):
+            self.execute_next()
+        self.assertEqual(rg.get(), [1, 2, 3, 4, 5])
+        self.assertEqual(len(task_a.map([])), 0)
+
+        # Tasks with an eta are added to the schedule when dequeued, exactly
+        # as they would be if enqueued individually.
+        now = datetime.datetime.now()
+        t1 = task_a.s(10, eta=now + datetime.timedelta(seconds=60))
+        t2 = task_a.s(20)
+        r1, r2 = self.scrooge.enqueue_many([t1, t2])
+        self.assertEqual(len(self.scrooge), 2)
+        self.assertTrue(self.execute_next() is None)
+        self.assertEqual(self.execute_next(), 21)
+        self.assertEqual(self.scrooge.scheduled_count(), 1)
+        self.assertEqual(r2.get(), 21)
+        self.assertTrue(r1.get() is None)
+
+    def test_blocking_result_notification(self):
+        @self.scrooge.task()
+        def task_a(n):
+            return n + 1
+
+        r1, r2, r3 = [task_a(i) for i in range(3)]
+        t = threading.Timer(0.1, self.execute_next)
+        t.start()
+
+        # The result is available as soon as the task is executed, rather
+        # than at the next polling interval.
+        start = time.time()
+        self.assertEqual(r1.get(blocking=True, timeout=5, max_delay=5), 1)
+        self.assertTrue(time.time() - start < 1)
+        t.join()
+
+        rg = ResultGroup([r2, r3])
+        t = threading.Timer(0.1, lambda: [self.execute_next() for _ in range(2)])
+        t.start()
+        start = time.time()
+        self.assertEqual(list(rg.as_completed(max_delay=5)), [2, 3])
+        self.assertTrue(time.time() - start < 1)
+        t.join()
+
+    def test_result_group_bulk_fetch(self):
+        @self.scrooge.task()
+        def task_a(n):
+            return n + 1
+
+        calls = []
+        get_raw_many = self.scrooge.get_raw_many
+
+        def counting_get_raw_many(keys, peek=False):
+            calls.append(list(keys))
+            return get_raw_many(keys, peek)
+
+        self.scrooge.get_raw_many = counting_get_raw_many
+
+        rg = task_a.map(range(4))
+        self.assertEqual(rg.get(), [None] * 4)
+        self.assertEqual(len(calls), 1)
+
+        self.execute_next()
+        self.execute_next()
+        self.assertEqual(rg.get(preserve=True), [1, 2, None, None])
+        self.assertEqual(self.scrooge.result_count(), 2)
+
+        # Results that have already been read are not fetched again.
+        self.execute_next()
+        self.execute_next()
+        calls = []
+        self.assertEqual(rg.get(), [1, 2, 3, 4])
+        self.assertEqual(calls, [[r.id for r in rg][2:]])
+
+        rg = task_a.map([1, 2])
+        self.assertRaises(ScroogeException, rg.get, blocking=True, timeout=0.1)
+        self.execute_next()
+        r1, r2 = rg
+        self.scrooge.put_result(r2.id, Error({"error": "ValueError()"}))
+        self.assertRaises(TaskException, rg.get)
+        self.assertEqual(r1.get(), 2)
+
+        rg = task_a.map([1, 2])
+        self.assertRaises(
+            ScroogeException, rg.get, blocking=True, timeout=0.1, revoke_on_timeout=True
+        )
+        self.assertTrue(all(r.is_revoked() for r in rg))
+
+    def test_blob_storage(self):
+        blobs = MemoryStorage("blobs")
+        scrooge = MemoryScrooge(utc=False, blob_threshold=256, blob_storage=blobs)
+
+        @scrooge.task()
+        def task_a(s, n=1):
+            return s * n
+
+        def execute_next():
+            return scrooge.execute(scrooge.dequeue())
+
+        # Small arguments and results are stored as usual.
+        r = task_a("x", 2)
+        self.assertEqual(execute_next(), "xx")
+        self.assertEqual(blobs.result_store_size(), 0)
+        self.assertEqual(r(), "xx")
+
+        # Large arguments are written to the blob storage, and only a
+        # reference is enqueued. Once the task has run, the arguments are
+        # removed, and the large result is written to the blob storage.
+        r = task_a("x" * 1024, n=2)
+        data = scrooge.storage.enqueued_items()[0]
+        self.assertTrue(len(data) < 256)
+        self.assertEqual(blobs.result_store_size(), 1)
+        self.assertEqual(execute_next(), "x" * 2048)
+        self.assertEqual(blobs.result_store_size(), 1)
+        self.assertTrue(len(scrooge.storage.peek_data(r.id)) < 256)
+
+        # The blob is removed when the result is read.
+        self.assertEqual(r(preserve=True), "x" * 2048)
+        r.reset()
+        self.assertEqual(blobs.result_store_size(), 1)
+        self.assertEqual(r(), "x" * 2048)
+        self.assertEqual(blobs.result_store_size(), 0)
+        self.assertEqual(scrooge.result_count(), 0)
+
+        # Arguments of revoked tasks are removed without being read.
+        r = task_a("x" * 1024)
+        r.revoke()
+        self.assertTrue(execute_next() is None)
+        self.assertEqual(blobs.result_store_size(), 0)
+
+        # Tasks added to the schedule keep their arguments.
+        eta = datetime.datetime.now() + datetime.timedelta(seconds=60)
+        r = task_a.schedule(("x" * 1024,), eta=eta)
+        self.assertTrue(execute_next() is None)
+        self.assertEqual(scrooge.scheduled_count(), 1)
+        self.assertEqual(blobs.result_store_size(), 1)
+        task = scrooge.read_schedule(eta)[0]
+        self.assertEqual(scrooge.execute(task, eta), "x" * 1024)
+        self.assertEqual(blobs.result_store_size(), 1)  # The result.
+
+    def test_handle_timeout(self):
+        state = []
+
+        @self.scrooge.task(retries=1)
+        def task_a(s):
+            return s
+
+        @self.scrooge.signal(SIGNAL_TIMEOUT)
+        def on_timeout(signal, task):
+            state.append(task.id)
+
+        # The task is retried, then fails with a TaskTimeout.
+        r = task_a("x")
+        self.scrooge.handle_timeout(self.scrooge.dequeue())
+        task = self.scrooge.dequeue()
+        self.assertEqual((task.id, task.retries), (r.id, 0))
+
+        self.scrooge.handle_timeout(task)
+        self.assertEqual(state, [r.id, r.id])
+        self.assertEqual(len(self.scrooge), 0)
+        with self.assertRaises(TaskException) as exc:
+            r.get()
+        self.assertTrue("TaskTimeout" in exc.exception.metadata["error"])
+
+    def test_default_blob_storage(self):
+        scrooge = MemoryScrooge(utc=False, blob_threshold=256)
+        blobs = scrooge.blob_storage
+        self.assertFalse(blobs is scrooge.storage)
+
+        @scrooge.task()
+        def task_a(s):
+            return len(s)
+
+        errors = []
+
+        @scrooge.signal(SIGNAL_ERROR)
+        def on_error(signal, task, exc=None):
+            errors.append(task.id)
+
+        # The arguments are not counted as results, nor are they removed when
+        # the results are flushed.
+        r = task_a("x" * 1024)
+        self.assertEqual(blobs.result_store_size(), 1)
+        self.assertEqual(scrooge.result_count(), 0)
+        scrooge.storage.flush_results()
+        self.assertEqual(blobs.result_store_size(), 1)
+        self.assertEqual(scrooge.execute(scrooge.dequeue()), 1024)
+        self.assertEqual(r(), 1024)
+        self.assertEqual(blobs.result_store_size(), 0)
+
+        # If the arguments are missing the task fails, and is not retried.
+        r = task_a.s("x" * 1024)
+        r.retries = 1
+        r = scrooge.enqueue(r)
+        blobs.flush_results()
+        self.assertTrue(scrooge.execute(scrooge.dequeue()) is None)
+        self.assertEqual(errors, [r.id])
+        self.assertRaises(TaskException, r.get)
+        self.assertEqual(scrooge.pending_count(), 0)
+        self.assertEqual(scrooge.scheduled_count(), 0)
+
     def test_put_get(self):
         tests = (
             "v1",
@@ -0,0 +1,303 @@
+import asyncio
+import threading
+
+from scrooge import PriorityRedisScrooge, RedisScrooge
+from scrooge.consumer_options import ConsumerConfig
+from scrooge.contrib.asyncio import (
+    AsyncioWorker,
+    AsyncPriorityRedisStorage,
+    AsyncResultGroup,
+    AsyncScrooge,
+    aexecute,
+)
+from scrooge.exceptions import ScroogeException, TaskException
+from scrooge.storage import MemoryStorage
+from scrooge.tests.base import BaseTestCase
+from scrooge.utils import time_clock
+
+
+class TestAsyncioWorker(BaseTestCase):
+    def test_aexecute(self):
+        @self.scrooge.task()
+        async def task_a(n):
+            await asyncio.sleep(0)
+            return n + 1
+
+        @self.scrooge.task()
+        def task_b(n):
+            return n * 2
+
+        r1 = task_a(1)
+        r2 = task_b(2)
+        loop = asyncio.new_event_loop()
+        try:
+            for _ in range(2):
+                task = self.scrooge.dequeue()
+                loop.run_until_complete(aexecute(self.scrooge, task))
+        finally:
+            loop.close()
+
+        self.assertEqual(r1.get(), 2)
+        self.assertEqual(r2.get(), 4)
+
+    def test_aexecute_timeout(self):
+        state = []
+
+        @self.scrooge.task(timeout=0.1)
+        async def task_a():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                state.append("cancelled")
+                raise
+
+        r = task_a()
+        loop = asyncio.new_event_loop()
+        try:
+            task = self.scrooge.dequeue()
+            loop.run_until_complete(aexecute(self.scrooge, task))
+            loop.run_until_complete(asyncio.sleep(0))
+        finally:
+            loop.close()
+
+        self.assertEqual(state, ["cancelled"])
+        with self.assertRaises(TaskException) as exc:
+            r.get()
+        self.assertTrue("TaskTimeout" in exc.exception.metadata["error"])
+
+    def test_concurrency_limit(self):
+        running = []
+        state = []
+
+        @self.scrooge.task()
+        async def task_a(n):
+            running.append(n)
+            state.append(len(running))
+            await asyncio.sleep(0.05)
+            running.remove(n)
+
+        for i in range(5):
+            task_a(i)
+
+        consumer = self.consumer(
+            workers=1, worker_type="asyncio", prefetch=5, concurrency=2
+        )
+        worker, _ = consumer.worker_threads[0]
+        self.assertTrue(isinstance(worker, AsyncioWorker))
+        worker.initialize()
+
+        # Two tasks are started, and the rest remain in the queue until one of
+        # them has finished.
+        worker.loop()
+        self.assertEqual(len(worker._pending), 2)
+        self.assertEqual(len(self.scrooge), 3)
+        worker.loop()
+        self.assertTrue(len(worker._pending) < 2)
+        self.assertEqual(len(self.scrooge), 3)
+
+        # Tasks still running when the worker shuts down are finished.
+        while len(self.scrooge):
+            worker.loop()
+        worker.shutdown()
+        self.assertEqual(len(state), 5)
+        self.assertEqual(max(state), 2)
+        self.assertEqual(running, [])
+        self.assertEqual(len(worker._pending), 0)
+
+    def test_consumer_asyncio(self):
+        @self.scrooge.task()
+        async def task_a(n):
+            await asyncio.sleep(0.2)
+            return n
+
+        @self.scrooge.task()
+        async def task_e():
+            raise ValueError("uh-oh")
+
+        with self.consumer_context(workers=1, worker_type="asyncio"):
+            start = time_clock()
+            results = [task_a(i) for i in range(20)]
+            values = [r.get(blocking=True, timeout=2) for r in results]
+            self.assertEqual(values, list(range(20)))
+            self.assertTrue(time_clock() - start < 2)
+
+            re = task_e()
+            self.assertRaises(TaskException, re.get, blocking=True, timeout=2)
+
+    def test_config(self):
+        cfg = ConsumerConfig(worker_type="asyncio", concurrency=500)
+        cfg.validate()
+        consumer = self.scrooge.create_consumer(**cfg.values)
+        self.assertEqual(consumer.concurrency, 500)
+        worker, _ = consumer.worker_threads[0]
+        self.assertEqual(worker.concurrency, 500)
+
+        cfg = ConsumerConfig(concurrency=0)
+        self.assertRaises(ValueError, cfg.validate)
+
+
+class TestAsyncScrooge(BaseTestCase):
+    def get_scrooge(self):
+        return RedisScrooge(utc=False)
+
+    def tearDown(self):
+        super(TestAsyncScrooge, self).tearDown()
+        self.scrooge.flush()
+
+    def run_async(self, fn):
+        async def run():
+            ascrooge = AsyncScrooge(self.scrooge)
+            try:
+                return await fn(ascrooge)
+            finally:
+                await ascrooge.close()
+
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(run())
+        finally:
+            loop.close()
+
+    def execute_later(self, n=1, delay=0.1):
+        def execute():
+            for _ in range(n):
+                self.execute_next()
+
+        t = threading.Timer(delay, execute)
+        t.start()
+        return t
+
+    def test_enqueue_result(self):
+        @self.scrooge.task()
+        def add(a, b):
+            return a + b
+
+        async def test(ascrooge):
+            r1 = await ascrooge.enqueue(add.s(1, 2))
+            r2 = await ascrooge.enqueue(add.s(3, 4))
+            self.assertEqual(await ascrooge.pending_count(), 2)
+            self.assertTrue(await r1.get() is None)
+
+            # Tasks are processed by the regular consumer.
+            self.execute_next()
+            self.assertEqual(await r1.get(), 3)
+            self.assertEqual(await ascrooge.result(r2.id), None)
+
+            t = self.execute_later()
+            self.assertEqual(await ascrooge.result(r2.id, blocking=True), 7)
+            t.join()
+
+            r3 = await ascrooge.enqueue(add.s(1, None))
+            self.execute_next()
+            with self.assertRaises(TaskException):
+                await r3.get()
+
+            r4 = await ascrooge.enqueue(add.s(0, 0))
+            with self.assertRaises(ScroogeException):
+                await r4.get(blocking=True, timeout=0.1)
+            self.assertEqual(await ascrooge.pending_count(), 1)
+
+        self.run_async(test)
+
+    def test_result_group(self):
+        @self.scrooge.task()
+        def add(a, b):
+            return a + b
+
+        async def test(ascrooge):
+            rg = await ascrooge.map(add, [(i, i) for i in range(5)])
+            self.assertTrue(isinstance(rg, AsyncResultGroup))
+            self.assertEqual(await ascrooge.pending_count(), 5)
+
+            t = self.execute_later(5)
+            values = await rg.get(blocking=True, timeout=2)
+            self.assertEqual(values, [0, 2, 4, 6, 8])
+            t.join()
+
+            # Pipelines return a group containing a result for each task.
+            pipe = add.s(1, 2).then(add, 3)
+            rg = await ascrooge.enqueue(pipe)
+            self.execute_next()
+            self.execute_next()
+            self.assertEqual(await rg.get(), [3, 6])
+
+        self.run_async(test)
+
+    def test_blobs(self):
+        self.scrooge = RedisScrooge(utc=False, blob_threshold=256)
+
+        @self.scrooge.task()
+        def task_a(s, n=1):
+            return s * n
+
+        def get_blob(*args, **kwargs):
+            raise AssertionError("blocking read of blob")
+
+        async def test(ascrooge):
+            blobs = self.scrooge.blob_storage
+            self.assertEqual(ascrooge.blob_storage.result_key, blobs.result_key)
+            r1 = await ascrooge.enqueue(task_a.s("x" * 1024))
+            r2 = await ascrooge.enqueue(task_a.s("y" * 1024, 2))
+            self.execute_next()
+            self.execute_next()
+            self.scrooge._get_blob = get_blob
+            self.assertEqual(blobs.result_store_size(), 2)
+            self.assertEqual(await r1.get(preserve=True), "x" * 1024)
+            self.assertEqual(blobs.result_store_size(), 2)
+            r1.reset()
+            self.assertEqual(await ascrooge.result(r1.id), "x" * 1024)
+            self.assertEqual(await AsyncResultGroup([r2]).get(), ["y" * 2048])
+            self.assertEqual(blobs.result_store_size(), 0)
+
+        self.run_async(test)
+
+        # Blobs written to a different storage are read using the Scrooge
+        # instance.
+        self.scrooge = RedisScrooge(
+            utc=False, blob_threshold=256, blob_storage=MemoryStorage("blobs")
+        )
+        self.assertTrue(AsyncScrooge(self.scrooge).blob_storage is None)
+
+    def test_revoke(self):
+        @self.scrooge.task()
+        def add(a, b):
+            return a + b
+
+        async def test(ascrooge):
+            r1 = await ascrooge.enqueue(add.s(1, 2))
+            r2 = await ascrooge.enqueue(add.s(3, 4))
+            await r1.revoke(revoke_once=False)
+            self.assertTrue(self.scrooge.is_revoked(r1.id))
+            self.assertFalse(self.scrooge.is_revoked(r2.id))
+            self.execute_next()
+            self.execute_next()
+            self.assertTrue(await r1.get() is None)
+            self.assertEqual(await r2.get(), 7)
+
+            self.assertTrue(await r1.restore())
+            self.assertFalse(self.scrooge.is_revoked(r1.id))
+
+            await ascrooge.revoke_all(add)
+            self.assertTrue(self.scrooge.is_revoked(add))
+            self.assertTrue(await ascrooge.restore_all(add))
+            self.assertFalse(self.scrooge.is_revoked(add))
+
+        self.run_async(test)
+
+    def test_priority(self):
+        self.scrooge = PriorityRedisScrooge(utc=False)
+
+        @self.scrooge.task()
+        def task_a(n):
+            return n
+
+        async def test(ascrooge):
+            self.assertTrue(isinstance(ascrooge.storage, AsyncPriorityRedisStorage))
+            await ascrooge.enqueue(task_a.s(1, priority=1))
+            await ascrooge.enqueue_many(
+                [task_a.s(2), task_a.s(3, priority=3), task_a.s(4, priority=2)]
+            )
+            self.assertEqual(await ascrooge.pending_count(), 4)
+
+        self.run_async(test)
+        self.assertEqual([self.execute_next() for _ in range(4)], [3, 4, 1, 2])
@@ -1,11 +1,14 @@
 import datetime
+import threading
 import time
 
 from scrooge.api import crontab
-from scrooge.consumer import Consumer, Scheduler
+from scrooge.consumer import AlarmTimeout, Consumer, Scheduler
 from scrooge.consumer_options import ConsumerConfig
+from scrooge.exceptions import TaskException, TaskTimeout
+from scrooge.signals import SIGNAL_TIMEOUT
 from scrooge.tests.base import BaseTestCase
-from scrooge.utils import time_clock
+from scrooge.utils import get_rss, time_clock
 
 
 class TestConsumer(Consumer):
@@ -112,6 +115,513 @@ class TestConsumerIntegration(BaseTestCase):
         self.work_on_tasks(consumer, 1)
         self.assertEqual(state, ["p1", "p2", "p1"])  # No change, not executed.
 
+    def test_consumer_periodic_heap(self):
+        state = []
+
+        @self.scrooge.periodic_task(crontab(minute="*/15"))
+        def task_p1():
+            state.append("p1")
+
+        @self.scrooge.periodic_task(lambda dt: dt.minute % 20 == 0)
+        def task_p2():
+            state.append("p2")
+
+        consumer = self.consumer(workers=1)
+        scheduler = consumer._create_scheduler()
+        start = datetime.datetime(2000, 1, 1, 0, 0, 30)
+        for i in range(61):
+            now = start + datetime.timedelta(minutes=i)
+            for task in scheduler.read_periodic(now):
+                state.append((now.minute, task.name))
+
+        self.assertEqual(
+            state,
+            [
+                (0, "task_p1"),
+                (0, "task_p2"),
+                (15, "task_p1"),
+                (20, "task_p2"),
+                (30, "task_p1"),
+                (40, "task_p2"),
+                (45, "task_p1"),
+                (0, "task_p1"),
+                (0, "task_p2"),
+            ],
+        )
+
+        # Registering a new periodic task is picked up, and missed runs are
+        # not enqueued late.
+        @self.scrooge.periodic_task(crontab(minute="*"))
+        def task_p3():
+            state.append("p3")
+
+        now = datetime.datetime(2000, 1, 1, 1, 5)
+        tasks = scheduler.read_periodic(now)
+        self.assertEqual([t.name for t in tasks], ["task_p3"])
+
+        # Going back in time is handled as well.
+        tasks = scheduler.read_periodic(start)
+        self.assertEqual([t.name for t in tasks], ["task_p1", "task_p2", "task_p3"])
+
+    def test_event_scheduler(self):
+        state = []
+
+        @self.scrooge.task()
+        def task_a(n):
+            return n + 1
+
+        @self.scrooge.periodic_task(crontab(minute="*/10"))
+        def task_p():
+            state.append("p")
+
+        consumer = self.consumer(workers=1, event_scheduler=True)
+        scheduler = consumer._create_scheduler()
+        self.assertTrue(scheduler.event_driven)
+        scheduler.max_wait_seconds = scheduler.requeue_check_seconds = 3600
+
+        # The periodic task is enqueued and the scheduler sleeps until the
+        # next time it is due.
+        now = datetime.datetime(2000, 1, 1, 0, 0, 30)
+        self.assertEqual(scheduler.process_events(now), 570)
+        self.assertEqual(len(self.scrooge), 1)
+        self.scrooge.flush()
+
+        # Sleep until the scheduled task is due.
+        eta = now + datetime.timedelta(seconds=2.5)
+        task_a.schedule((1,), eta=eta)
+        self.work_on_tasks(consumer, 1, now)  # Moves task to the schedule.
+        self.assertEqual(scheduler.process_events(now), 2.5)
+        self.assertEqual(self.scrooge.scheduled_count(), 1)
+
+        self.assertEqual(scheduler.process_events(eta), 567.5)
+        self.assertEqual(len(self.scrooge), 1)
+        self.assertEqual(self.scrooge.scheduled_count(), 0)
+
+        # Adding a task to the schedule wakes up the scheduler.
+        if self.scrooge.storage.schedule_notifications:
+            self.assertTrue(self.scrooge.storage.wait_for_schedule(0.01))
+            task_a.schedule((2,), eta=eta)
+            task = self.scrooge.dequeue()
+            t = threading.Timer(0.1, self.scrooge.add_schedule, (task,))
+            t.start()
+            start = time_clock()
+            scheduler.wait(5)
+            self.assertTrue(time_clock() - start < 1)
+            t.join()
+
+        # Without periodic tasks, the scheduler sleeps for at most the maximum
+        # wait time.
+        scheduler.periodic = False
+        scheduler.max_wait_seconds = 5
+        self.scrooge.flush()
+        self.assertEqual(scheduler.process_events(now), 5)
+
+    def test_scheduler_chunks(self):
+        @self.scrooge.task()
+        def task_a(n):
+            return n
+
+        now = datetime.datetime.now()
+        for i in range(25):
+            self.scrooge.add_schedule(task_a.s(i, eta=now))
+
+        consumer = self.consumer(workers=1)
+        scheduler = consumer._create_scheduler()
+        scheduler.schedule_chunk_size = scheduler._chunk_size = 10
+
+        reads = []
+        read_schedule = self.scrooge.read_schedule
+
+        def tracked_read(timestamp=None, limit=None):
+            tasks = read_schedule(timestamp, limit)
+            reads.append((limit, len(tasks)))
+            return tasks
+
+        self.scrooge.read_schedule = tracked_read
+        scheduler.enqueue_scheduled_tasks(now)
+        self.assertEqual(reads, [(10, 10), (10, 10), (10, 5)])
+        self.assertEqual(len(self.scrooge), 25)
+        self.assertEqual(self.scrooge.scheduled_count(), 0)
+        queued = [t.args[0] for t in self.scrooge.pending()]
+        self.assertEqual(sorted(queued), list(range(25)))
+
+        # When a chunk takes longer than the budget, the chunk size shrinks.
+        scheduler.schedule_chunk_budget = -1
+        scheduler.enqueue_scheduled_tasks(now)
+        self.assertEqual(scheduler._chunk_size, 5)
+
+    def test_worker_prefetch(self):
+        state = []
+
+        @self.scrooge.task()
+        def task_a(n):
+            state.append(n)
+            return n + 1
+
+        results = [task_a(i) for i in range(5)]
+        consumer = self.consumer(workers=1, prefetch=3)
+        worker, _ = consumer.worker_threads[0]
+
+        # The first loop reads three tasks and executes one of them.
+        worker.loop()
+        self.assertEqual(state, [0])
+        self.assertEqual(len(worker._buffer), 2)
+        self.assertEqual(len(self.scrooge), 2)
+
+        worker.loop()
+        worker.loop()
+        self.assertEqual(state, [0, 1, 2])
+        self.assertEqual(len(worker._buffer), 0)
+
+        # Prefetched tasks that were not executed are returned to the queue
+        # when the worker shuts down.
+        worker.loop()
+        self.assertEqual(state, [0, 1, 2, 3])
+        self.assertEqual(len(self.scrooge), 0)
+        worker.shutdown()
+        self.assertEqual(len(worker._buffer), 0)
+        self.assertEqual(len(self.scrooge), 1)
+
+        task = self.scrooge.dequeue()
+        self.assertEqual(task.id, results[4].id)
+        self.assertEqual(self.scrooge.execute(task), 5)
+        self.assertEqual([r.get() for r in results], [1, 2, 3, 4, 5])
+
+    def test_worker_prefetch_requeue_order(self):
+        @self.scrooge.task()
+        def task_a(n):
+            return n
+
+        results = [task_a(i) for i in range(3)]
+        consumer = self.consumer(workers=1, prefetch=2)
+        worker, _ = consumer.worker_threads[0]
+        worker.loop()
+        worker.shutdown()
+
+        # The prefetched task is returned to the head of the queue.
+        task = self.scrooge.dequeue()
+        self.assertEqual(task.id, results[1].id)
+
+    def test_worker_max_tasks(self):
+        @self.scrooge.task()
+        def task_a(n):
+            return n + 1
+
+        results = [task_a(i) for i in range(3)]
+        consumer = self.consumer(workers=1, prefetch=3, max_tasks_per_child=2)
+        worker, _ = consumer.worker_threads[0]
+        self.assertEqual(worker.max_tasks, 2)
+
+        worker.loop()
+        self.assertFalse(worker.finished)
+        worker.loop()
+        self.assertTrue(worker.finished)
+
+        # The prefetched task is returned to the queue when the worker exits.
+        worker.shutdown()
+        self.assertEqual(len(self.scrooge), 1)
+        self.assertEqual([r.get() for r in results[:2]], [1, 2])
+
+    def test_worker_max_memory(self):
+        if get_rss() is None:
+            return
+
+        @self.scrooge.task()
+        def task_a(n):
+            return n + 1
+
+        task_a(1)
+        task_a(2)
+        consumer = self.consumer(workers=1, max_memory_per_child=1000000)
+        worker, _ = consumer.worker_threads[0]
+        worker.loop()
+        self.assertFalse(worker.finished)
+
+        # Any process uses more than 1MB.
+        worker.max_memory = 1024 * 1024
+        worker.loop()
+        self.assertTrue(worker.finished)
+
+    def test_worker_replaced(self):
+        @self.scrooge.task()
+        def task_a(n):
+            return n + 1
+
+        consumer = self.consumer(workers=1, max_tasks_per_child=1)
+        consumer.start()
+        try:
+            for i in range(3):
+                result = task_a(i)
+                self.assertEqual(result.get(blocking=True, timeout=2), i + 1)
+                worker, worker_t = consumer.worker_threads[0]
+                worker_t.join(2)
+                self.assertTrue(worker.finished)
+
+                # The worker is replaced without waiting for a health check.
+                consumer.loop()
+                new_worker, new_worker_t = consumer.worker_threads[0]
+                self.assertFalse(new_worker is worker)
+                self.assertTrue(new_worker_t.is_alive())
+        finally:
+            consumer.stop(graceful=True)
+
+    def test_task_timeout(self):
+        state = []
+
+        @self.scrooge.task(timeout=0.1, retries=1)
+        def task_a():
+            while True:
+                time.sleep(0.01)
+
+        @self.scrooge.signal(SIGNAL_TIMEOUT)
+        def on_timeout(signal, task):
+            state.append(task.id)
+
+        result = task_a()
+        consumer = self.consumer(workers=1)
+        worker, _ = consumer.worker_threads[0]
+
+        # The task times out and is retried.
+        worker.loop()
+        self.assertEqual(state, [result.id])
+        self.assertEqual(len(self.scrooge), 1)
+
+        worker.loop()
+        self.assertEqual(state, [result.id, result.id])
+        self.assertEqual(len(self.scrooge), 0)
+        with self.assertRaises(TaskException) as exc:
+            result.get()
+        self.assertTrue("TaskTimeout" in exc.exception.metadata["error"])
+
+    def test_task_timeout_not_reached(self):
+        @self.scrooge.task(timeout=1)
+        def task_a(n):
+            return n + 1
+
+        result = task_a(1)
+        consumer = self.consumer(workers=1)
+        worker, _ = consumer.worker_threads[0]
+        worker.loop()
+        self.assertEqual(result.get(), 2)
+
+        # The pending timeout does not fire after the task has finished.
+        time.sleep(1.1)
+
+    def test_alarm_timeout(self):
+        with self.assertRaises(TaskTimeout):
+            with AlarmTimeout(0.05):
+                time.sleep(1)
+
+        with AlarmTimeout(0.05):
+            pass
+        time.sleep(0.1)
+
+    def test_kill_timed_out_workers(self):
+        consumer = self.consumer(workers=1, worker_type="process")
+        consumer.start()
+        try:
+            worker, worker_t = consumer.worker_threads[0]
+            self.assertFalse(consumer.kill_timed_out_workers())
+
+            # The killed worker is replaced right away.
+            worker.deadline.value = time.time() - consumer.timeout_kill_grace - 1
+            self.assertTrue(consumer.kill_timed_out_workers())
+            self.assertFalse(worker_t.is_alive())
+            new_worker, new_worker_t = consumer.worker_threads[0]
+            self.assertFalse(new_worker_t is worker_t)
+            self.assertTrue(new_worker_t.is_alive())
+        finally:
+            consumer.stop(graceful=True)
+
+    def test_kill_timed_out_task(self):
+        state = []
+
+        @self.scrooge.task(timeout=0.1, retries=1, retry_delay=60)
+        def task_a(n):
+            while True:
+                try:
+                    time.sleep(1)
+                except BaseException:
+                    pass  # Ignore the timeout.
+
+        @self.scrooge.signal(SIGNAL_TIMEOUT)
+        def on_timeout(signal, task):
+            state.append(task.id)
+
+        result = task_a(1)
+        consumer = self.consumer(workers=1, worker_type="process")
+        consumer.timeout_kill_grace = 0.1
+        consumer.start()
+        try:
+            worker, worker_t = consumer.worker_threads[0]
+            start = time_clock()
+            while not worker.deadline.value and time_clock() - start < 2:
+                time.sleep(0.01)
+
+            # The worker process has its own copy of the in-memory queue.
+            self.scrooge.storage.flush_queue()
+            start = time_clock()
+            while not consumer.kill_timed_out_workers():
+                self.assertTrue(time_clock() - start < 2)
+                time.sleep(0.05)
+            self.assertFalse(worker_t.is_alive())
+
+            # The task timed out, and is scheduled to be retried.
+            self.assertEqual(state, [result.id])
+            self.assertEqual(self.scrooge.pending_count(), 0)
+            (task,) = self.scrooge.scheduled()
+            self.assertEqual((task.id, task.args, task.retries), (result.id, (1,), 0))
+        finally:
+            consumer.stop(graceful=True)
+
+    def test_crashed_worker_not_recycled(self):
+        consumer = self.consumer(
+            workers=1, worker_type="process", max_tasks_per_child=10
+        )
+        consumer.start()
+        try:
+            worker, worker_t = consumer.worker_threads[0]
+            consumer.environment.kill(worker_t)
+            worker_t.join()
+
+            # Workers which died are only replaced by the health check.
+            consumer.loop()
+            self.assertTrue(consumer.worker_threads[0][1] is worker_t)
+            self.assertTrue(consumer.restart_workers())
+            self.assertTrue(consumer.worker_threads[0][1].is_alive())
+        finally:
+            consumer.stop(graceful=True)
+
+    def test_crashing_worker_not_recycled(self):
+        def loop(now=None):
+            raise ValueError("crashed")
+
+        consumer = self.consumer(
+            workers=1, worker_type="process", max_tasks_per_child=10
+        )
+        worker, worker_t = consumer.worker_threads[0]
+        worker.loop = loop
+        consumer.start()
+        try:
+            # The worker process exits with an error, and is not mistaken for
+            # one which reached its limits.
+            worker_t.join(2)
+            self.assertEqual(worker_t.exitcode, 1)
+            consumer.loop()
+            self.assertTrue(consumer.worker_threads[0][1] is worker_t)
+        finally:
+            consumer.stop(graceful=True)
+
+    def test_autoscale(self):
+        event = threading.Event()
+
+        @self.scrooge.task()
+        def task_a(n):
+            event.wait(5)
+            return n
+
+        consumer = self.consumer(workers=1, max_workers=3)
+        consumer.scale_interval = consumer.scale_up_delay = 0
+        consumer.scale_down_delay = 0
+        self.assertTrue(consumer.autoscale)
+        self.assertEqual(consumer.min_workers, 1)
+
+        consumer.start()
+        try:
+            results = [task_a(i) for i in range(4)]
+            worker, _ = consumer.worker_threads[0]
+            start = time_clock()
+            while not worker.busy.value and time_clock() - start < 2:
+                time.sleep(0.01)
+
+            # Three tasks are waiting and the only worker is busy.
+            self.assertEqual(consumer.scale_workers(), 2)
+            self.assertEqual(len(consumer.worker_threads), 3)
+            self.assertEqual(consumer.scale_workers(), 0)
+
+            event.set()
+            self.assertEqual(
+                [r.get(blocking=True, timeout=2) for r in results], [0, 1, 2, 3]
+            )
+
+            # The workers are idle, retire them one at a time.
+            self.assertEqual(consumer.scale_workers(), -1)
+            self.assertEqual(consumer.scale_workers(), -1)
+            self.assertEqual(consumer.scale_workers(), 0)
+            self.assertEqual(len(consumer.worker_threads), 1)
+            self.assertEqual(len(consumer.retired_workers), 2)
+            for retired, retired_t in consumer.retired_workers:
+                retired_t.join(2)
+                self.assertTrue(retired.finished)
+            self.assertTrue(consumer.worker_threads[0][1].is_alive())
+        finally:
+            consumer.stop(graceful=True)
+
+    def test_autoscale_hysteresis(self):
+        @self.scrooge.task()
+        def task_a(n):
+            return n
+
+        consumer = self.consumer(workers=2, min_workers=1, max_workers=4)
+        consumer.scale_interval = 0
+        consumer.scale_up_delay = 60
+        self.assertEqual(len(consumer.worker_threads), 2)
+
+        # A backlog must persist before workers are added.
+        task_a(1)
+        for worker, _ in consumer.worker_threads:
+            worker.busy.value = 1
+        self.assertEqual(consumer.scale_workers(), 0)
+        self.assertFalse(consumer._backlog_since is None)
+
+        # Spare capacity must persist before a worker is retired.
+        self.scrooge.flush()
+        for worker, _ in consumer.worker_threads:
+            worker.busy.value = 0
+        self.assertEqual(consumer.scale_workers(), 0)
+        self.assertTrue(consumer._backlog_since is None)
+        self.assertFalse(consumer._idle_since is None)
+        self.assertEqual(len(consumer.worker_threads), 2)
+
+    def test_retire_idle_worker(self):
+        consumer = self.consumer(workers=3, min_workers=1, max_workers=3)
+        w1, w2, w3 = [worker for worker, _ in consumer.worker_threads]
+        w1.busy.value = w3.busy.value = 1
+
+        # The most recently added idle worker is retired.
+        consumer.retire_worker()
+        self.assertEqual(consumer.retired_workers[-1][0], w2)
+        self.assertTrue(w2.retire_flag.is_set())
+
+        # If every worker is busy, the most recently added one is retired.
+        consumer.retire_worker()
+        self.assertEqual(consumer.retired_workers[-1][0], w3)
+        self.assertEqual([w for w, _ in consumer.worker_threads], [w1])
+
+    def test_kill_timed_out_retired_worker(self):
+        @self.scrooge.task()
+        def task_a():
+            time.sleep(10)
+
+        task_a()
+        consumer = self.consumer(workers=1, max_workers=2, worker_type="process")
+        consumer.start()
+        try:
+            worker, worker_t = consumer.worker_threads[0]
+            start = time_clock()
+            while not worker.busy.value and time_clock() - start < 2:
+                time.sleep(0.01)
+            consumer.retire_worker()
+            self.assertTrue(worker_t.is_alive())
+
+            # Retired workers are killed, but not replaced.
+            worker.deadline.value = time.time() - consumer.timeout_kill_grace - 1
+            self.assertTrue(consumer.kill_timed_out_workers())
+            self.assertFalse(worker_t.is_alive())
+            self.assertEqual(consumer.worker_threads, [])
+        finally:
+            consumer.stop(graceful=True)
+
 
 class TestConsumerConfig(BaseTestCase):
     def test_default_config(self):
@@ -135,6 +645,7 @@ class TestConsumerConfig(BaseTestCase):
             check_worker_health=False,
             scheduler_interval=30,
             periodic=False,
+            prefetch=10,
         )
         cfg.validate()
         consumer = self.scrooge.create_consumer(**cfg.values)
@@ -147,6 +658,38 @@ class TestConsumerConfig(BaseTestCase):
         self.assertEqual(consumer.max_delay, 4)
         self.assertEqual(consumer.scheduler_interval, 30)
         self.assertFalse(consumer._health_check)
+        self.assertEqual(consumer.prefetch, 10)
+        self.assertFalse(consumer.autoscale)
+
+    def test_autoscale_config(self):
+        cfg = ConsumerConfig(workers=2, min_workers=1, max_workers=8)
+        cfg.validate()
+        consumer = self.scrooge.create_consumer(**cfg.values)
+        self.assertTrue(consumer.autoscale)
+        self.assertEqual(consumer.workers, 2)
+        self.assertEqual((consumer.min_workers, consumer.max_workers), (1, 8))
+        self.assertEqual(len(consumer.worker_threads), 2)
+
+    def test_schedule_chunk_config(self):
+        cfg = ConsumerConfig(schedule_chunk_size=50, schedule_chunk_budget=0.5)
+        cfg.validate()
+        consumer = self.scrooge.create_consumer(**cfg.values)
+        scheduler = consumer._create_scheduler()
+        self.assertEqual(scheduler.schedule_chunk_size, 50)
+        self.assertEqual(scheduler._chunk_size, 50)
+        self.assertEqual(scheduler.schedule_chunk_budget, 0.5)
+
+        scheduler = self.scrooge.create_consumer()._create_scheduler()
+        self.assertEqual(scheduler.schedule_chunk_size, 1000)
+        self.assertEqual(scheduler.schedule_chunk_budget, 0.1)
+
+    def test_subsecond_interval(self):
+        for interval in (0.01, 0.1, 0.25, 0.5, 1.5):
+            cfg = ConsumerConfig(scheduler_interval=interval)
+            cfg.validate()
+            consumer = self.scrooge.create_consumer(**cfg.values)
+            self.assertEqual(consumer.scheduler_interval, interval)
+            self.assertEqual(consumer._create_scheduler().interval, interval)
 
     def test_invalid_values(self):
         def assertInvalid(**kwargs):
@@ -157,3 +700,13 @@ class TestConsumerConfig(BaseTestCase):
         assertInvalid(scheduler_interval=90)
         assertInvalid(scheduler_interval=7)
         assertInvalid(scheduler_interval=45)
+        assertInvalid(scheduler_interval=0.7)
+        assertInvalid(scheduler_interval=0.001)
+        assertInvalid(prefetch=0)
+        assertInvalid(max_tasks_per_child=0)
+        assertInvalid(max_memory_per_child=0)
+        assertInvalid(min_workers=0)
+        assertInvalid(workers=2, min_workers=3)
+        assertInvalid(min_workers=4, max_workers=2)
+        assertInvalid(schedule_chunk_size=0)
+        assertInvalid(schedule_chunk_budget=0)
@@ -124,3 +124,82 @@ class TestCrontab(unittest.TestCase):
         invalid = ("abc", "*abc", "a-b", "1-c", "0x9")
         for i in invalid:
             self.assertRaises(ValueError, crontab, minute=i, strict=True)
+
+    def assertNextAfter(self, validate, start, minutes):
+        # Compare against checking every minute.
+        one_minute = datetime.timedelta(minutes=1)
+        expected = start.replace(second=0, microsecond=0) + one_minute
+        for _ in range(minutes):
+            while not validate(expected):
+                expected += one_minute
+            self.assertEqual(validate.next_after(start), expected)
+            start = expected
+            expected += one_minute
+
+    def test_crontab_next_after(self):
+        start = datetime.datetime(2011, 1, 1, 0, 0, 30)
+        self.assertNextAfter(crontab(minute="*/10"), start, 50)
+        self.assertNextAfter(crontab(minute="5", hour="*/6"), start, 20)
+        self.assertNextAfter(crontab(day="1,15", hour="0", minute="0"), start, 12)
+        self.assertNextAfter(crontab(day_of_week="0", hour="12"), start, 10)
+        self.assertNextAfter(
+            crontab(
+                month="1,5",
+                day="1,4,7",
+                day_of_week="0,6",
+                hour="*/4",
+                minute="1-5,10-15,50",
+            ),
+            start,
+            100,
+        )
+
+        # Seconds are ignored and the result is strictly after the timestamp.
+        validate = crontab(minute="0", hour="0")
+        dt = datetime.datetime(2011, 1, 1, 0, 0, 59)
+        self.assertEqual(validate.next_after(dt), datetime.datetime(2011, 1, 2))
+
+        # End of month and year.
+        validate = crontab(day="31", hour="23", minute="59")
+        dt = datetime.datetime(2011, 11, 30)
+        self.assertEqual(
+            validate.next_after(dt), datetime.datetime(2011, 12, 31, 23, 59)
+        )
+        self.assertEqual(
+            validate.next_after(datetime.datetime(2011, 12, 31, 23, 59)),
+            datetime.datetime(2012, 1, 31, 23, 59),
+        )
+
+        # Leap day.
+        validate = crontab(month="2", day="29", hour="0", minute="0")
+        self.assertEqual(
+            validate.next_after(datetime.datetime(2013, 1, 1)),
+            datetime.datetime(2016, 2, 29),
+        )
+
+        # Skipping ahead from a day the following month does not have.
+        validate = crontab(month="3", day="1", hour="0", minute="0")
+        self.assertEqual(
+            validate.next_after(datetime.datetime(2024, 1, 31, 12, 0)),
+            datetime.datetime(2024, 3, 1),
+        )
+        self.assertEqual(
+            validate.next_after(datetime.datetime(2024, 2, 29, 12, 0)),
+            datetime.datetime(2024, 3, 1),
+        )
+        validate = crontab(month="4", day="1", hour="0", minute="0")
+        self.assertEqual(
+            validate.next_after(datetime.datetime(2023, 12, 31, 12, 0)),
+            datetime.datetime(2024, 4, 1),
+        )
+        self.assertNextAfter(
+            crontab(month="2,3", hour="0", minute="0"),
+            datetime.datetime(2024, 1, 31, 12, 0),
+            40,
+        )
+
+    def test_crontab_next_after_never(self):
+        self.assertTrue(
+            crontab(month="2", day="30").next_after(datetime.datetime(2011, 1, 1))
+            is None
+        )
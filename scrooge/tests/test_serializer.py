@@ -2,6 +2,8 @@ try:
     import gzip
 except ImportError:
     gzip = None
+import datetime
+import pickle
 import unittest
 
 try:
@@ -9,7 +11,20 @@ try:
 except ImportError:
     zlib = None
 
-from scrooge.serializer import Serializer
+from scrooge.api import MemoryScrooge
+from scrooge.exceptions import ConfigurationError
+from scrooge.registry import Message
+from scrooge.serializer import (
+    HEADER_OOB,
+    HEADER_UNCOMPRESSED,
+    MsgpackSerializer,
+    Serializer,
+    SignedSerializer,
+    lz4_block,
+    msgpack,
+    train_zstd_dictionary,
+    zstandard,
+)
 from scrooge.tests.base import BaseTestCase
 
 
@@ -46,3 +61,177 @@ class TestSerializer(BaseTestCase):
             scomp = Serializer(compression=True, use_zlib=use_zlib)
             for item in self.data:
                 self.assertEqual(scomp.deserialize(s.serialize(item)), item)
+
+    def _test_codec(self, codec, **kwargs):
+        s = Serializer(compression=codec, **kwargs)
+        self._test_serializer(s)
+
+        # Small payloads are stored uncompressed, with a header.
+        data = s.serialize(b"a" * 1024)
+        self.assertEqual(data[:1], s.codec.header)
+        self.assertTrue(len(data) < 1024)
+        s.min_compress_size = 2048
+        data = s.serialize(b"a" * 1024)
+        self.assertEqual(data[:1], HEADER_UNCOMPRESSED)
+        self.assertEqual(s.deserialize(data), b"a" * 1024)
+
+        # Any serializer can read data compressed with a codec, and data
+        # compressed with the codec can still be read.
+        for other in (Serializer(), Serializer(compression=True)):
+            data = s.serialize(b"a" * 4096)
+            self.assertEqual(other.deserialize(data), b"a" * 4096)
+            self.assertEqual(s.deserialize(other.serialize(b"a" * 4096)), b"a" * 4096)
+
+    def test_codec_gzip(self):
+        self._test_codec("gzip")
+
+    def test_codec_zlib(self):
+        self._test_codec("zlib")
+
+    @unittest.skipIf(zstandard is None, "zstandard module not installed")
+    def test_codec_zstd(self):
+        self._test_codec("zstd")
+
+    @unittest.skipIf(lz4_block is None, "lz4 module not installed")
+    def test_codec_lz4(self):
+        self._test_codec("lz4")
+
+    def test_codec_unknown(self):
+        self.assertRaises(ConfigurationError, Serializer, compression="xz")
+
+    @unittest.skipIf(zstandard is None, "zstandard module not installed")
+    def test_zstd_dictionary(self):
+        s = Serializer()
+        samples = [
+            s.serialize({"id": "task-%08d" % i, "name": "app.tasks.process"})
+            for i in range(1000)
+        ]
+        zstd_dict = train_zstd_dictionary(samples, 1024)
+        sd = Serializer(compression="zstd", zstd_dict=zstd_dict)
+        sz = Serializer(compression="zstd")
+
+        value = {"id": "task-00001234", "name": "app.tasks.process"}
+        data = sd.serialize(value)
+        self.assertTrue(len(data) < len(sz.serialize(value)))
+        self.assertEqual(sd.deserialize(data), value)
+        self.assertEqual(sd.deserialize(sz.serialize(value)), value)
+
+    @unittest.skipIf(pickle.HIGHEST_PROTOCOL < 5, "pickle protocol 5 required")
+    def test_out_of_band(self):
+        s = Serializer(oob_threshold=1024)
+        self._test_serializer(s)
+
+        # Only buffers which support out-of-band pickling, e.g. numpy arrays,
+        # are written as separate frames.
+        value = {
+            "small": pickle.PickleBuffer(b"a" * 16),
+            "large": pickle.PickleBuffer(b"b" * 4096),
+        }
+        expected = {"small": b"a" * 16, "large": b"b" * 4096}
+        data = s.serialize(value)
+        self.assertEqual(data[:1], HEADER_OOB)
+        self.assertEqual(s.deserialize(data), expected)
+        self.assertEqual(Serializer().deserialize(data), expected)
+
+        # Out-of-band buffers are not copied when deserializing.
+        data = s.serialize([pickle.PickleBuffer(b"c" * 4096)])
+        (buf,) = s.deserialize(data)
+        self.assertTrue(buf.obj is data)
+        self.assertEqual(buf, b"c" * 4096)
+
+        # Data with no large buffers is regular pickled data.
+        data = s.serialize(pickle.PickleBuffer(b"a" * 16))
+        self.assertEqual(data[:1], b"\x80")
+        self.assertEqual(Serializer().deserialize(data), b"a" * 16)
+
+        # Works along with compression and signing, and from a memoryview.
+        for s in (
+            Serializer(oob_threshold=1024, compression="zlib"),
+            SignedSerializer(secret="s3cr3t", oob_threshold=1024),
+        ):
+            data = s.serialize(value)
+            self.assertEqual(s.deserialize(data), expected)
+            self.assertEqual(s.deserialize(memoryview(data)), expected)
+
+
+@unittest.skipIf(msgpack is None, "msgpack module not installed")
+class TestMsgpackSerializer(TestSerializer):
+    data = TestSerializer.data + [
+        (1, "a", (2.0, b"b")),
+        {1: [None, True], "k": set("abc")},
+        datetime.datetime(2000, 1, 2, 3, 4, 5, 6789),
+        datetime.timedelta(days=-1, seconds=30),
+        2**70,
+    ]
+
+    def test_serializer(self):
+        self._test_serializer(MsgpackSerializer())
+
+    @unittest.skipIf(gzip is None, "gzip module not installed")
+    def test_serializer_gzip(self):
+        self._test_serializer(MsgpackSerializer(compression=True))
+
+    @unittest.skipIf(zlib is None, "zlib module not installed")
+    def test_serializer_zlib(self):
+        self._test_serializer(MsgpackSerializer(compression=True, use_zlib=True))
+
+    def test_message(self):
+        s = MsgpackSerializer()
+        now = datetime.datetime(2000, 1, 2, 3, 4, 5, 6789)
+        on_error = Message("t2", "m.task_b", args=(), kwargs={"k": [1, (2,)]})
+        message = Message(
+            "t1",
+            "m.task_a",
+            now,
+            2,
+            10,
+            None,
+            (1, "two", {"three": 3}),
+            {},
+            None,
+            on_error,
+            datetime.timedelta(seconds=60),
+            now,
+        )
+        data = s.serialize(message)
+        self.assertEqual(data[:1], s.format_message)
+        self.assertTrue(len(data) < len(Serializer().serialize(message)))
+
+        result = s.deserialize(data)
+        self.assertTrue(isinstance(result, Message))
+        self.assertTrue(isinstance(result.on_error, Message))
+        self.assertEqual(result, message)
+
+    def test_packers_reused(self):
+        s = MsgpackSerializer()
+        value = [(1, (2, (3,))), (4,), {"k": (5, 6)}]
+        data = s.serialize(value)
+        packers = set(s._local.packers)
+        self.assertEqual(len(packers), 4)  # One for each level of nesting.
+
+        # Packing the same structure again creates no new Packers.
+        self.assertEqual(s.serialize(value), data)
+        self.assertEqual(set(s._local.packers), packers)
+        self.assertEqual(s.deserialize(data), value)
+
+    def test_pickle_compatibility(self):
+        # Data serialized with the default serializer can still be read.
+        message = Message("t1", "m.task_a", args=(1, 2), kwargs={})
+        s = MsgpackSerializer()
+        for item in self.data + [message]:
+            self.assertEqual(s.deserialize(Serializer().serialize(item)), item)
+
+    def test_scrooge_integration(self):
+        scrooge = MemoryScrooge(serializer=MsgpackSerializer(), utc=False)
+
+        @scrooge.task()
+        def add(a, b):
+            return (a + b, datetime.datetime(2000, 1, 1))
+
+        eta = datetime.datetime.now() - datetime.timedelta(seconds=1)
+        r = add.schedule((1, 2), eta=eta)
+        task = scrooge.dequeue()
+        self.assertEqual(task.args, (1, 2))
+        self.assertEqual(task.eta, eta)
+        scrooge.execute(task)
+        self.assertEqual(r(), (3, datetime.datetime(2000, 1, 1)))
@@ -4,6 +4,7 @@ import itertools
 import os
 import shutil
 import threading
+import time
 import unittest
 
 try:
@@ -19,13 +20,20 @@ from scrooge.api import (
     PriorityRedisScrooge,
     RedisExpireScrooge,
     RedisScrooge,
+    RedisStreamScrooge,
+    ReliableRedisScrooge,
     Scrooge,
     SqliteScrooge,
 )
 from scrooge.constants import EmptyData
 from scrooge.consumer import Consumer
-from scrooge.exceptions import ConfigurationError
-from scrooge.storage import FileStorage, MemoryStorage, RedisExpireStorage
+from scrooge.exceptions import ConfigurationError, ScroogeException
+from scrooge.storage import (
+    FileStorage,
+    MemoryStorage,
+    RedisExpireStorage,
+    RedisStorage,
+)
 from scrooge.tests.base import TRAVIS, BaseTestCase
 
 
@@ -61,6 +69,80 @@ class StorageTests(object):
         self.s.flush_queue()
         self.assertEqual(self.s.queue_size(), 0)
 
+    def test_enqueue_many(self):
+        self.s.enqueue(b"item-0")
+        self.s.enqueue_many([(b"item-%d" % i, None) for i in range(1, 4)])
+        self.s.enqueue_many([])
+        self.assertEqual(self.s.queue_size(), 4)
+        self.assertEqual(
+            self.s.enqueued_items(), [b"item-0", b"item-1", b"item-2", b"item-3"]
+        )
+        self.assertEqual(
+            [self.s.dequeue() for _ in range(4)],
+            [b"item-0", b"item-1", b"item-2", b"item-3"],
+        )
+        self.assertTrue(self.s.dequeue() is None)
+
+        # Identical messages are stored as separate items.
+        self.s.enqueue_many([(b"dupe", None), (b"dupe", None)])
+        self.assertEqual(self.s.queue_size(), 2)
+
+        if not self.s.priority:
+            return
+
+        self.s.flush_queue()
+        self.s.enqueue_many([(b"p0", None), (b"p2", 2), (b"p1", 1), (b"p0-2", 0)])
+        self.assertEqual(
+            [self.s.dequeue() for _ in range(4)], [b"p2", b"p1", b"p0", b"p0-2"]
+        )
+
+    def test_enqueue_front(self):
+        self.s.enqueue_many([(b"item-%d" % i, None) for i in range(3)])
+        try:
+            self.s.enqueue_front([(b"front-0", None), (b"front-1", None)])
+        except NotImplementedError:
+            return
+        self.s.enqueue_front([])
+        self.assertEqual(self.s.queue_size(), 5)
+        self.assertEqual(
+            self.s.dequeue_many(5),
+            [b"front-0", b"front-1", b"item-0", b"item-1", b"item-2"],
+        )
+
+        # Items added to the head of an empty queue come before later ones.
+        self.s.enqueue_front([(b"front-2", None)])
+        self.s.enqueue_front([(b"front-3", None)])
+        self.s.enqueue(b"item-3")
+        self.assertEqual(
+            [self.s.dequeue() for _ in range(3)], [b"front-3", b"front-2", b"item-3"]
+        )
+
+        if not self.s.priority:
+            return
+
+        self.s.enqueue_many([(b"p0", None), (b"p2", 2)])
+        self.s.enqueue_front([(b"f1", 1), (b"f0", None)])
+        self.assertEqual(self.s.dequeue_many(4), [b"p2", b"f1", b"f0", b"p0"])
+
+    def test_dequeue_many(self):
+        self.assertEqual(self.s.dequeue_many(3), [])
+        for i in range(5):
+            self.s.enqueue(b"item-%d" % i)
+
+        self.assertEqual(self.s.dequeue_many(2), [b"item-0", b"item-1"])
+        self.assertEqual(self.s.queue_size(), 3)
+        self.assertEqual(self.s.dequeue_many(10), [b"item-2", b"item-3", b"item-4"])
+        self.assertEqual(self.s.queue_size(), 0)
+        self.assertEqual(self.s.dequeue_many(3), [])
+
+        if not self.s.priority:
+            return
+
+        for i, priority in enumerate((None, 2, 1, 2)):
+            self.s.enqueue(b"p%d" % i, priority)
+        self.assertEqual(self.s.dequeue_many(3), [b"p1", b"p3", b"p2"])
+        self.assertEqual(self.s.dequeue_many(3), [b"p0"])
+
     def test_schedule_methods(self):
         timestamp = datetime.datetime(2000, 1, 2, 3, 4, 5)
         second = datetime.timedelta(seconds=1)
@@ -87,6 +169,69 @@ class StorageTests(object):
         self.assertEqual(self.s.schedule_size(), 0)
         self.assertEqual(self.s.read_schedule(datetime.datetime.now()), [])
 
+    def test_read_schedule_limit(self):
+        timestamp = datetime.datetime(2000, 1, 2, 3, 4, 5)
+        for i in range(5):
+            ts = timestamp + datetime.timedelta(seconds=i)
+            self.s.add_to_schedule(b"t%d" % i, ts, False)
+
+        later = timestamp + datetime.timedelta(seconds=3)
+        self.assertEqual(self.s.read_schedule(later, 2), [b"t0", b"t1"])
+        self.assertEqual(self.s.schedule_size(), 3)
+        self.assertEqual(self.s.read_schedule(later, 2), [b"t2", b"t3"])
+        self.assertEqual(self.s.read_schedule(later, 2), [])
+        self.assertEqual(self.s.scheduled_items(), [b"t4"])
+
+    def test_schedule_subsecond(self):
+        timestamp = datetime.datetime(2000, 1, 2, 3, 4, 5)
+        ms = datetime.timedelta(milliseconds=1)
+        self.s.add_to_schedule(b"p50", timestamp + 50 * ms, False)
+        self.s.add_to_schedule(b"p200", timestamp + 200 * ms, False)
+
+        self.assertEqual(self.s.read_schedule(timestamp + 49 * ms), [])
+        self.assertEqual(self.s.read_schedule(timestamp + 50 * ms), [b"p50"])
+        self.assertEqual(self.s.read_schedule(timestamp + 199 * ms), [])
+        self.assertEqual(self.s.read_schedule(timestamp + 200 * ms), [b"p200"])
+
+    def test_peek_schedule(self):
+        self.assertTrue(self.s.peek_schedule() is None)
+
+        timestamp = datetime.datetime(2000, 1, 2, 3, 4, 5, 250000)
+        self.s.add_to_schedule(b"p1", timestamp, False)
+        self.s.add_to_schedule(b"p0", timestamp - datetime.timedelta(days=1), False)
+        self.assertEqual(self.s.peek_schedule(), timestamp - datetime.timedelta(days=1))
+
+        self.s.read_schedule(timestamp - datetime.timedelta(seconds=1))
+        self.assertEqual(self.s.peek_schedule(), timestamp)
+        self.assertEqual(self.s.schedule_size(), 1)
+
+    def test_schedule_notifications(self):
+        if not self.s.schedule_notifications:
+            raise unittest.SkipTest("schedule notification support required")
+
+        self.assertFalse(self.s.wait_for_schedule(0.01))
+        timestamp = datetime.datetime(2000, 1, 2, 3, 4, 5)
+
+        # Redis storages only notify the scheduler when asked to.
+        if hasattr(self.s, "notify_schedule"):
+            self.assertFalse(self.s.notify_schedule)
+            self.s.add_to_schedule(b"p0", timestamp, False)
+            self.assertFalse(self.s.wait_for_schedule(0.01))
+            self.assertEqual(self.s.schedule_size(), 1)
+            self.s.notify_schedule = True
+
+        # A task added while no-one is waiting is picked up by the next wait.
+        self.s.add_to_schedule(b"p0", timestamp, False)
+        self.assertTrue(self.s.wait_for_schedule(0.01))
+        self.assertFalse(self.s.wait_for_schedule(0.01))
+
+        t = threading.Timer(0.1, self.s.add_to_schedule, (b"p1", timestamp, False))
+        t.start()
+        start = time.time()
+        self.assertTrue(self.s.wait_for_schedule(5))
+        self.assertTrue(time.time() - start < 1)
+        t.join()
+
     def test_result_store_methods(self):
         # Put and peek at data. Verify missing keys return EmptyData sentinel.
         self.s.put_data(b"k1", b"v1")
@@ -131,6 +276,59 @@ class StorageTests(object):
         self.assertEqual(self.s.result_store_size(), 0)
         self.assertEqual(self.s.result_items(), {})
 
+    def test_blob_storage(self):
+        b = self.s.create_blob_storage()
+        if b is self.s:
+            return
+
+        # Blobs are kept apart from the results, and are not removed when the
+        # results are flushed.
+        self.s.put_data(b"k1", b"v1", is_result=True)
+        b.put_data(b"k1", b"b1")
+        self.assertEqual(self.s.result_store_size(), 1)
+        self.assertEqual(b.result_store_size(), 1)
+        self.assertEqual(self.s.peek_data(b"k1"), b"v1")
+        self.assertEqual(b.peek_data(b"k1"), b"b1")
+
+        self.s.flush_results()
+        self.assertEqual(self.s.result_store_size(), 0)
+        self.assertEqual(b.pop_data(b"k1"), b"b1")
+        b.put_data(b"k2", b"b2")
+        b.flush_results()
+        self.assertEqual(b.result_store_size(), 0)
+
+    def test_peek_pop_many(self):
+        self.assertEqual(self.s.peek_many([]), [])
+        self.assertEqual(self.s.pop_many([]), [])
+
+        self.s.put_data(b"k1", b"v1")
+        self.s.put_data(b"k2", b"v2", is_result=True)
+        keys = [b"k2", b"kx", b"k1"]
+        self.assertEqual(self.s.peek_many(keys), [b"v2", EmptyData, b"v1"])
+        self.assertEqual(self.s.pop_many(keys), [b"v2", EmptyData, b"v1"])
+        if self.destructive_reads:
+            self.assertEqual(self.s.pop_many(keys), [EmptyData] * 3)
+            self.assertEqual(self.s.result_store_size(), 0)
+        else:
+            self.assertEqual(self.s.pop_many(keys), [b"v2", EmptyData, b"v1"])
+
+    def test_result_notifications(self):
+        if not self.s.result_notifications:
+            raise unittest.SkipTest("result notification support required")
+
+        self.assertTrue(self.s.wait_for_results([b"k1"], 0.01) is None)
+
+        # Metadata does not trigger a notification.
+        self.s.put_data(b"k1", b"v1")
+        self.assertTrue(self.s.wait_for_results([b"k2"], 0.01) is None)
+
+        t = threading.Timer(0.1, self.s.put_data, (b"k2", b"v2", True))
+        t.start()
+        start = time.time()
+        self.assertEqual(self.s.wait_for_results([b"k3", b"k2"], 5), b"k2")
+        self.assertTrue(time.time() - start < 1)
+        t.join()
+
     def test_priority(self):
         if not self.s.priority:
             raise unittest.SkipTest("priority support required")
@@ -154,6 +352,50 @@ class StorageTests(object):
         ]
         self.assertEqual([self.s.dequeue() for _ in range(10)], expected)
 
+    def test_promote_due(self):
+        timestamp = datetime.datetime(2000, 1, 2, 3, 4, 5)
+        try:
+            self.s.promote_due(timestamp)
+        except NotImplementedError:
+            raise unittest.SkipTest("storage does not implement promote_due")
+
+        for i in range(4):
+            ts = timestamp + datetime.timedelta(seconds=i)
+            self.s.add_to_schedule(b"t%d" % i, ts, False)
+
+        later = timestamp + datetime.timedelta(seconds=2)
+        self.assertEqual(self.s.promote_due(later, 2), 2)
+        self.assertEqual(self.s.promote_due(later), 1)
+        self.assertEqual(self.s.promote_due(later), 0)
+        self.assertEqual(self.s.scheduled_items(), [b"t3"])
+        self.assertEqual(self.s.enqueued_items(), [b"t0", b"t1", b"t2"])
+        self.assertEqual(self.s.dequeue(), b"t0")
+
+        # The scheduler uses the fast-path, without deserializing the tasks.
+        @self.scrooge.task()
+        def task_a(n):
+            return n + 1
+
+        self.s.flush_all()
+        for i in range(3):
+            eta = timestamp + datetime.timedelta(seconds=i)
+            self.scrooge.add_schedule(task_a.s(i, eta=eta))
+
+        def read_schedule(*args):
+            raise AssertionError("read_schedule() should not be called.")
+
+        self.scrooge.read_schedule = read_schedule
+        scheduler = self.consumer(workers=1)._create_scheduler()
+        scheduler.enqueue_scheduled_tasks(later)
+        self.assertEqual(self.scrooge.scheduled_count(), 0)
+        self.assertEqual([t.args for t in self.scrooge.pending()], [(0,), (1,), (2,)])
+
+        # The scheduler uses the current time when none is given.
+        self.scrooge.add_schedule(task_a.s(3, eta=timestamp))
+        scheduler.enqueue_scheduled_tasks(None)
+        self.assertEqual(self.scrooge.scheduled_count(), 0)
+        self.assertEqual(len(self.scrooge), 4)
+
     def test_consumer_integration(self):
         @self.scrooge.task()
         def task_a(n):
@@ -178,10 +420,86 @@ class TestMemoryStorage(StorageTests, BaseTestCase):
         return MemoryScrooge(utc=False)
 
 
+def count_round_trips(storage, fn, *args):
+    # Number of requests made to the Redis server while running fn(). Each
+    # command or pipeline checks a connection out of the pool.
+    pool = storage.conn.connection_pool
+    get_connection = pool.get_connection
+    calls = []
+
+    def counting_get_connection(*a, **k):
+        calls.append(a)
+        return get_connection(*a, **k)
+
+    pool.get_connection = counting_get_connection
+    try:
+        fn(*args)
+    finally:
+        del pool.get_connection
+    return len(calls)
+
+
 class TestRedisStorage(StorageTests, BaseTestCase):
     def get_scrooge(self):
         return RedisScrooge(utc=False)
 
+    def test_result_command_count(self):
+        # Reading or popping a result is a single request. Make sure the pop
+        # script is loaded first.
+        self.s.pop_data(b"k0")
+        self.s.put_data(b"k1", b"")
+        for method in (self.s.peek_data, self.s.pop_data):
+            self.assertEqual(count_round_trips(self.s, method, b"k1"), 1)
+            self.assertEqual(count_round_trips(self.s, method, b"kx"), 1)
+        self.assertTrue(self.s.pop_data(b"k1") is EmptyData)
+
+        self.s.put_data(b"k1", b"")
+        self.assertEqual(self.s.peek_data(b"k1"), b"")
+        self.assertEqual(self.s.pop_data(b"k1"), b"")
+        self.assertTrue(self.s.peek_data(b"k1") is EmptyData)
+
+    def test_notify_schedule(self):
+        # The scheduler is only notified when the event-driven scheduler is
+        # used.
+        timestamp = datetime.datetime(2000, 1, 2, 3, 4, 5)
+        add = self.s.add_to_schedule
+        add(b"p0", timestamp, False)
+        self.assertFalse(self.s.conn.exists(self.s.schedule_notify_key))
+
+        Consumer(self.scrooge, workers=1)
+        self.assertFalse(self.s.notify_schedule)
+        Consumer(self.scrooge, workers=1, event_scheduler=True)
+        self.assertTrue(self.s.notify_schedule)
+        add(b"p1", timestamp, False)
+        self.assertTrue(self.s.conn.exists(self.s.schedule_notify_key))
+
+    def test_socket_timeout(self):
+        # Blocking reads are shorter than the socket timeout.
+        storage = RedisStorage(socket_timeout=0.2)
+        self.assertAlmostEqual(storage._block_timeout(5), 0.16)
+        self.assertEqual(storage._block_timeout(0.1), 0.1)
+        self.assertTrue(storage.wait_for_results([b"k1"], 1) is None)
+        self.assertFalse(storage.wait_for_schedule(1))
+
+        scrooge = RedisScrooge(utc=False, socket_timeout=0.2)
+
+        @scrooge.task()
+        def task_a(n):
+            return n
+
+        r = task_a(1)
+        with self.assertRaises(ScroogeException):
+            r.get(blocking=True, timeout=0.5)
+        rg = task_a.map([2, 3])
+        with self.assertRaises(ScroogeException):
+            rg.get(blocking=True, timeout=0.5)
+
+        t = threading.Timer(0.3, lambda: scrooge.execute(scrooge.dequeue()))
+        t.start()
+        self.assertEqual(r.get(blocking=True, timeout=2), 1)
+        t.join()
+        scrooge.flush()
+
     def test_conflicting_init_args(self):
         options = {
             "host": "localhost",
@@ -207,6 +525,14 @@ class TestRedisExpireStorage(StorageTests, BaseTestCase):
     def get_scrooge(self):
         return RedisExpireScrooge(expire_time=3600, utc=False, blocking=False)
 
+    def test_result_command_count(self):
+        self.s.put_data(b"k1", b"")
+        for method in (self.s.peek_data, self.s.pop_data):
+            self.assertEqual(count_round_trips(self.s, method, b"k1"), 1)
+            self.assertEqual(count_round_trips(self.s, method, b"kx"), 1)
+        self.assertEqual(self.s.pop_data(b"k1"), b"")
+        self.assertTrue(self.s.pop_data(b"kx") is EmptyData)
+
     def test_expire_results(self):
         self.s.put_data(b"k1", b"v1")
         self.s.put_data(b"k2", b"v2", is_result=True)
@@ -219,6 +545,15 @@ class TestRedisExpireStorage(StorageTests, BaseTestCase):
         self.assertEqual(conn.ttl(self.s.result_key(b"k1")), -1)
         self.assertEqual(conn.ttl(self.s.result_key(b"k2")), 3600)
 
+        # Blobs only expire if they hold a result.
+        b = self.s.create_blob_storage()
+        b.put_data(b"k1", b"v1")
+        b.put_data(b"k2", b"v2", is_result=True)
+        self.assertEqual(conn.ttl(b.result_key(b"k1")), -1)
+        self.assertEqual(conn.ttl(b.result_key(b"k2")), 3600)
+        self.assertEqual(self.s.peek_data(b"k1"), b"v1")
+        b.flush_results()
+
         # Non-existant keys return -2. See redis docs for TTL command.
         self.assertEqual(conn.ttl(self.s.result_key(b"k3")), -2)
 
@@ -270,8 +605,112 @@ class TestRedisExpireStorage(StorageTests, BaseTestCase):
         self.assertEqual(self.scrooge.result_count(), 2)  # r1 and r3 still there.
 
 
-def get_redis_version():
-    return int(Redis().info()["redis_version"].split(".", 1)[0])
+def get_redis_version(full=False):
+    version = Redis().info()["redis_version"]
+    if full:
+        return tuple(int(i) for i in version.split("."))
+    return int(version.split(".", 1)[0])
+
+
+@unittest.skipIf(get_redis_version(True) < (6, 2), "Requires Redis >= 6.2")
+class TestReliableRedisStorage(StorageTests, BaseTestCase):
+    def get_scrooge(self):
+        return ReliableRedisScrooge(utc=False, heartbeat_timeout=1)
+
+    def tearDown(self):
+        super(TestReliableRedisStorage, self).tearDown()
+        self.s.close()
+
+    def test_acknowledge(self):
+        @self.scrooge.task()
+        def task_a(n):
+            return n + 1
+
+        r1 = task_a(1)
+        r2 = task_a.schedule((2,), delay=60)
+        task = self.scrooge.dequeue()
+        self.assertEqual(len(self.scrooge), 1)
+        self.assertEqual(len(self.s.inflight_items()), 1)
+
+        # Executing the task acknowledges the message.
+        self.assertEqual(self.scrooge.execute(task), 2)
+        self.assertEqual(self.s.inflight_items(), [])
+        self.assertEqual(r1.get(), 2)
+
+        # Adding a task to the schedule also acknowledges the message.
+        self.assertTrue(self.execute_next() is None)
+        self.assertEqual(self.s.inflight_items(), [])
+        self.assertEqual(self.scrooge.scheduled_count(), 1)
+
+        # Messages held by a live consumer are not requeued.
+        task_a(3)
+        task = self.scrooge.dequeue()
+        self.assertEqual(self.scrooge.requeue_unacknowledged(), 0)
+        self.assertEqual(len(self.s.inflight_items()), 1)
+
+    def test_worker_killed(self):
+        pid = os.getpid()
+
+        @self.scrooge.task()
+        def task_a(n):
+            if os.getpid() != pid:
+                # Get killed before finishing the task in the worker process.
+                time.sleep(60)
+            return n + 1
+
+        r = task_a(1)
+        consumer = self.consumer(workers=1, worker_type="process")
+        worker, worker_t = consumer.worker_threads[0]
+        worker_t.start()
+        for _ in range(100):
+            if self.s.inflight_items():
+                break
+            time.sleep(0.05)
+
+        worker_t.kill()
+        worker_t.join()
+        consumer.stop_flag.set()
+        self.assertEqual(len(self.scrooge), 0)
+        self.assertEqual(len(self.s.inflight_items()), 1)
+
+        # Until the heartbeat of the killed process expires, the message is
+        # considered to be in-flight.
+        self.assertEqual(self.scrooge.requeue_unacknowledged(), 0)
+        time.sleep(1.1)
+        self.assertEqual(self.scrooge.requeue_unacknowledged(), 1)
+        self.assertEqual(self.s.inflight_items(), [])
+        self.assertEqual(len(self.scrooge), 1)
+
+        self.assertEqual(self.execute_next(), 2)
+        self.assertEqual(r.get(), 2)
+        self.assertEqual(self.s.inflight_items(), [])
+
+    def test_heartbeat(self):
+        self.scrooge.enqueue(self.scrooge.task()(lambda: None).s())
+        self.s.dequeue()
+        owner = self.s.owner
+        heartbeat_key = self.s.heartbeat_key(owner)
+
+        # The heartbeat is checked atomically with requeueing the messages.
+        keys = [
+            self.s.inflight_key(owner),
+            self.s.queue_key,
+            self.s.owners_key,
+            heartbeat_key,
+        ]
+        self.assertEqual(self.s._requeue(keys=keys, args=[owner]), 0)
+        self.assertEqual(len(self.s.inflight_items()), 1)
+
+        # An owner which missed a heartbeat is registered again by the next.
+        self.s.conn.delete(heartbeat_key)
+        self.assertEqual(self.scrooge.requeue_unacknowledged(), 1)
+        self.assertFalse(self.s.conn.sismember(self.s.owners_key, owner))
+        time.sleep(0.5)
+        self.assertTrue(self.s.conn.sismember(self.s.owners_key, owner))
+        self.assertTrue(self.s.conn.exists(heartbeat_key))
+
+        self.s.dequeue()
+        self.assertEqual(len(self.s.inflight_items()), 1)
 
 
 @unittest.skipIf(get_redis_version() < 5, "Requires Redis >= 5.0")
@@ -279,6 +718,24 @@ class TestPriorityRedisStorage(TestRedisStorage):
     def get_scrooge(self):
         return PriorityRedisScrooge(utc=False)
 
+    def test_enqueue_front_time(self):
+        # Items are added to the head of the queue regardless of the time.
+        orig_time = time.time
+        time.time = lambda: (1 << 51) / 1e6 + 1
+        try:
+            self.s.enqueue(b"item-0")
+            self.s.enqueue_front([(b"front-0", None)])
+            self.s.enqueue_front([(b"front-1", None), (b"front-2", 1)])
+        finally:
+            time.time = orig_time
+        self.assertEqual(
+            self.s.dequeue_many(4), [b"front-2", b"front-1", b"front-0", b"item-0"]
+        )
+
+        self.s.enqueue_front([(b"front-3", None)])
+        self.s.flush_queue()
+        self.assertEqual(self.s.conn.exists(self.s.front_key), 0)
+
 
 @unittest.skipIf(get_redis_version() < 5, "Requires Redis >= 5.0")
 class TestPriorityRedisStorageNotBlocking(TestRedisStorage):
@@ -286,6 +743,47 @@ class TestPriorityRedisStorageNotBlocking(TestRedisStorage):
         return PriorityRedisScrooge(utc=False, blocking=False)
 
 
+@unittest.skipIf(get_redis_version(True) < (6, 2), "Requires Redis >= 6.2")
+class TestRedisStreamStorage(StorageTests, BaseTestCase):
+    def get_scrooge(self):
+        return RedisStreamScrooge(utc=False, visibility_timeout=0.2)
+
+    def test_acknowledge(self):
+        @self.scrooge.task()
+        def task_a(n):
+            return n + 1
+
+        r1 = task_a(1)
+        r2 = task_a(2)
+        task = self.scrooge.dequeue()
+        self.assertEqual(len(self.scrooge), 1)
+        self.assertEqual(self.s.conn.xlen(self.s.stream_key), 2)
+
+        # Acknowledged messages are removed from the stream.
+        self.assertEqual(self.scrooge.execute(task), 2)
+        self.assertEqual(self.s.conn.xlen(self.s.stream_key), 1)
+        self.assertEqual(r1.get(), 2)
+
+        # The unacknowledged message is requeued once the visibility timeout
+        # has elapsed.
+        task = self.scrooge.dequeue()
+        self.assertEqual(len(self.scrooge), 0)
+        self.assertEqual(self.scrooge.requeue_unacknowledged(), 0)
+        time.sleep(0.3)
+        self.assertEqual(self.scrooge.requeue_unacknowledged(), 1)
+        self.assertEqual(len(self.scrooge), 1)
+        self.assertEqual(self.s.conn.xlen(self.s.stream_key), 1)
+
+        self.assertEqual(self.execute_next(), 3)
+        self.assertEqual(r2.get(), 3)
+        self.assertEqual(self.s.conn.xlen(self.s.stream_key), 0)
+
+    def test_max_length(self):
+        self.s.max_length = 10
+        self.s.enqueue_many([(b"item-%d" % i, None) for i in range(1000)])
+        self.assertTrue(self.s.queue_size() < 1000)
+
+
 class TestSqliteStorage(StorageTests, BaseTestCase):
     def tearDown(self):
         super(TestSqliteStorage, self).tearDown()
@@ -300,6 +798,61 @@ class TestSqliteStorage(StorageTests, BaseTestCase):
         curs = self.s.conn.execute("pragma busy_timeout")
         self.assertEqual(curs.fetchone(), (3000,))
 
+    def test_connection_tuning(self):
+        self.assertEqual(
+            self.s.conn.execute("pragma wal_autocheckpoint").fetchone(), (1000,)
+        )
+        self.assertTrue(self.s.checkpoint_interval is None)
+
+        scrooge = SqliteScrooge(
+            filename="scrooge_storage.db",
+            mmap_size=1 << 20,
+            wal_autocheckpoint=0,
+            checkpoint_interval=5,
+        )
+        storage = scrooge.storage
+        self.assertEqual(
+            storage.conn.execute("pragma mmap_size").fetchone(), (1 << 20,)
+        )
+        self.assertEqual(
+            storage.conn.execute("pragma wal_autocheckpoint").fetchone(), (0,)
+        )
+
+        # With automatic checkpoints disabled, the scheduler performs them.
+        storage.enqueue_many([(b"x" * 1024, None) for _ in range(100)])
+        checkpoints = []
+        storage.checkpoint = lambda: checkpoints.append(1)
+        scheduler = Consumer(scrooge, workers=1)._create_scheduler()
+        scheduler.checkpoint()
+        scheduler.checkpoint()  # Not due yet.
+        self.assertEqual(len(checkpoints), 1)
+        del storage.checkpoint
+
+        storage.checkpoint()
+        self.assertEqual(storage.dequeue(), b"x" * 1024)
+        storage.close()
+
+    def test_sql(self):
+        # Statements run outside of a transaction are executed exactly once.
+        self.s.sql(
+            "insert into task (queue, data, priority) values (?, ?, ?)",
+            (self.s.name, b"item-1", 0),
+        )
+        self.assertEqual(self.s.queue_size(), 1)
+        self.assertEqual(
+            self.s.sql("select data from task", results=True), [(b"item-1",)]
+        )
+        self.s.sql("delete from task where queue=?", (self.s.name,), commit=True)
+        self.assertEqual(self.s.queue_size(), 0)
+
+
+class TestSqliteStorageNoReturning(TestSqliteStorage):
+    # Exercise the code-path used for Sqlite versions without RETURNING.
+    def get_scrooge(self):
+        scrooge = super(TestSqliteStorageNoReturning, self).get_scrooge()
+        scrooge.storage.returning = False
+        return scrooge
+
 
 class TestFileStorageMethods(StorageTests, BaseTestCase):
     path = "/tmp/test-scrooge-storage"
@@ -405,3 +958,32 @@ class TestFileStorageMethods(StorageTests, BaseTestCase):
     @unittest.skipIf(TRAVIS, "skipping test that is flaky on travis-ci")
     def test_consumer_integration(self):
         return super(TestFileStorageMethods, self).test_consumer_integration()
+
+
+class TestFileStorageMmap(TestFileStorageMethods):
+    def get_scrooge(self):
+        return Scrooge(
+            "test-file-storage",
+            storage_class=FileStorage,
+            path=self.path,
+            levels=2,
+            use_thread_lock=True,
+            mmap_threshold=64,
+        )
+
+    def test_mmap(self):
+        self.s.enqueue(b"a" * 32)
+        self.s.enqueue(b"b" * 1024)
+        data = self.s.dequeue()
+        self.assertEqual(data, b"a" * 32)
+        self.assertTrue(isinstance(data, bytes))
+        data = self.s.dequeue()
+        self.assertTrue(isinstance(data, memoryview))
+        self.assertEqual(data, b"b" * 1024)
+        self.assertEqual(self.s.queue_size(), 0)
+
+        self.s.put_data(b"k1", b"c" * 1024)
+        data = self.s.pop_data(b"k1")
+        self.assertTrue(isinstance(data, memoryview))
+        self.assertEqual(data, b"c" * 1024)
+        self.assertFalse(self.s.has_data_for_key(b"k1"))
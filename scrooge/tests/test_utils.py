@@ -3,7 +3,7 @@ import os
 import time
 import unittest
 
-from scrooge.utils import UTC, normalize_time, reraise_as
+from scrooge.utils import UTC, get_rss, normalize_time, reraise_as
 
 
 class MyException(Exception):
@@ -27,6 +27,17 @@ class TestReraiseAs(unittest.TestCase):
             raise AssertionError("MyException not raised as expected.")
 
 
+class TestGetRSS(unittest.TestCase):
+    def test_get_rss(self):
+        if not os.path.exists("/proc/self/statm"):
+            self.assertTrue(get_rss() is None)
+            return
+
+        rss = get_rss()
+        data = b"x" * (32 * 1024 * 1024)
+        self.assertTrue(get_rss() >= rss + len(data) // 2)
+
+
 class FakePacific(datetime.tzinfo):
     def utcoffset(self, dt):
         return datetime.timedelta(hours=-8)
@@ -22,6 +22,9 @@ else:
 
 Error = namedtuple("Error", ("metadata",))
 
+# Reference to a payload written to the blob storage, see Scrooge.blob_storage.
+ClaimCheck = namedtuple("ClaimCheck", ("key",))
+
 
 class UTC(datetime.tzinfo):
     zero = datetime.timedelta(0)
@@ -121,7 +124,7 @@ if sys.version_info[0] == 2:
     text_type = unicode
 
     def to_timestamp(dt):
-        return time.mktime(dt.timetuple())
+        return time.mktime(dt.timetuple()) + (dt.microsecond * 1e-6)
 
 else:
     string_type = (bytes, str)
@@ -131,6 +134,30 @@ else:
         return dt.timestamp()
 
 
+def is_factor_of_minute(interval):
+    """
+    Return whether the given number of seconds divides evenly into a minute,
+    allowing for intervals such as 0.1 which are not exact in floating-point.
+    """
+    if interval <= 0:
+        return False
+    n = 60.0 / interval
+    return abs(n - round(n)) < 1e-6
+
+
+def get_rss():
+    """
+    Return the resident set size of the current process in bytes, read from
+    /proc/self/statm, or None if it is not available on this platform.
+    """
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, EnvironmentError, IndexError, ValueError):
+        return None
+
+
 def encode(s):
     if isinstance(s, bytes):
         return s
@@ -8,6 +8,9 @@ with open(os.path.join(os.path.dirname(__file__), "README.rst")) as fh:
 extras_require = {
     "backends": ["redis>=3.0.0"],
     "redis": ["redis>=3.0.0"],
+    "msgpack": ["msgpack>=1.0.0"],
+    "zstd": ["zstandard"],
+    "lz4": ["lz4"],
 }
 
 setup(